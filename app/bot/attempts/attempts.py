@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import NamedTuple
+
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+import app.infrastructure.database.db as db_func
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_BUFFER_BATCH_SIZE = 200
+ATTEMPT_BUFFER_FLUSH_INTERVAL = 2.0
+
+
+class AttemptAnswer(NamedTuple):
+    attempt_id: int
+    question_id: int
+    answer_id: int | None
+    is_right: bool
+    answered_at: datetime
+
+
+class AttemptAnswerBuffer:
+    """
+    Буфер ответов студентов на вопросы тестов.
+    Ответы пишутся в attempt_answers пачками: по таймеру, при заполнении буфера
+    и при остановке бота, а не отдельным запросом на каждое нажатие кнопки.
+
+    Буфер живёт в памяти одного процесса: при нескольких воркерах попытку может завершить
+    воркер, который не видит ответы, ещё лежащие в буфере другого, и балл посчитается без них
+    (сами ответы в завершённую попытку уже не попадут). Поэтому буферизация ответов
+    рассчитана на один процесс бота.
+    """
+
+    def __init__(
+            self,
+            pool: AsyncConnectionPool,
+            batch_size: int = ATTEMPT_BUFFER_BATCH_SIZE,
+            flush_interval: float = ATTEMPT_BUFFER_FLUSH_INTERVAL
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: list[AttemptAnswer] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="attempt-answer-buffer")
+        logger.info("Attempt answer buffer started (batch_size=%d, interval=%.1fs)",
+                    self.batch_size, self.flush_interval)
+
+    def add(self, answer: AttemptAnswer) -> None:
+        self._pending.append(answer)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def drain_attempt(self, attempt_id: int, connection: AsyncConnection | None = None) -> list[AttemptAnswer]:
+        """
+        Забирает из буфера ответы одной попытки, чтобы хендлер записал их в своей транзакции.
+        Дожидается текущей фоновой записи, поэтому после возврата все остальные ответы
+        этой попытки уже закоммичены. Если транзакция connection откатится, ответы
+        вернутся в буфер.
+        """
+        async with self._flush_lock:
+            drained = [a for a in self._pending if a.attempt_id == attempt_id]
+            if not drained:
+                return drained
+            self._pending = [a for a in self._pending if a.attempt_id != attempt_id]
+
+        call_after_rollback = getattr(connection, "call_after_rollback", None)
+        if call_after_rollback is not None:
+            call_after_rollback(lambda: self._requeue(drained))
+        return drained
+
+    def _requeue(self, answers: list[AttemptAnswer]) -> None:
+        logger.warning("Transaction rolled back, requeued %d attempt answers", len(answers))
+        self._pending[:0] = answers
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, []
+            try:
+                async with self.pool.connection() as connection:
+                    async with connection.transaction():
+                        await db_func.add_attempt_answers(connection, answers=batch)
+            except Exception:
+                logger.exception("Failed to flush %d attempt answers, requeued", len(batch))
+                self._pending[:0] = batch
+                return
+
+        logger.debug("Flushed %d attempt answers", len(batch))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+        if self._pending:
+            logger.warning("Attempt answer buffer stopped with %d unsaved answers", len(self._pending))
+        logger.info("Attempt answer buffer stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Unexpected error in attempt answer buffer")
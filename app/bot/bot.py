@@ -3,26 +3,77 @@ import logging
 import psycopg_pool
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
 
+from app.bot.attempts.attempts import AttemptAnswerBuffer
+from app.bot.broadcast.broadcast import Broadcaster
+from app.bot.export.export import SubmissionExporter
+from app.bot.file_gc.file_gc import OrphanedFileCollector
 from app.bot.handlers.admin import admin_router
 from app.bot.handlers.others import others_router
 from app.bot.handlers.user import user_router
+from app.bot.middlewares.bot_api import BotApiMetricsMiddleware
+from app.bot.middlewares.callback_answer import CallbackAnswerGuard, CallbackAnswerMiddleware
 from app.bot.middlewares.database import DataBaseMiddleware
+from app.bot.middlewares.fsm import BufferedFSMMiddleware
+from app.bot.middlewares.metrics import TimedMiddleware, setup_handler_metrics
+from app.bot.middlewares.profiler import setup_query_profiler
+from app.bot.metrics.server import start_metrics_server, track_pool, track_stats
+from app.bot.middlewares.outbox import OutboxMiddleware
+from app.bot.outbox.outbox import OutboxSender
+from app.bot.scheduler.scheduler import DelayedScheduler
+from app.bot.submissions.submissions import SubmissionDownloader
+from app.bot.throttling.throttling import ThrottledSession
+from app.bot.webhook.webhook import run_webhook
 from app.bot.middlewares.shadow_ban import ShadowBanMiddleware
 from app.infrastructure.database.connection import get_psql_pool
+from app.infrastructure.storage.memory import BoundedMemoryStorage
+from app.infrastructure.storage.postgres import PostgresStorage
 from config.config import Config
 
 logger = logging.getLogger(__name__)
 
-async def main(config: Config) -> None:
-    logger.info("Starting bot...")
+def create_storage(config: Config, db_pool: psycopg_pool.AsyncConnectionPool) -> BaseStorage:
+    if config.fsm.storage == "postgres":
+        storage = PostgresStorage(db_pool, cache_ttl=config.fsm.cache_ttl)
+    else:
+        storage = BoundedMemoryStorage(
+            session_ttl=config.fsm.session_ttl,
+            memory_budget=config.fsm.memory_budget
+        )
+        storage.start()
+    logger.info("Using %s FSM storage", config.fsm.storage)
+
+    return storage
 
-    storage = MemoryStorage()
+def setup_dispatcher(config: Config, storage: BaseStorage, outbox_sender: OutboxSender) -> Dispatcher:
+    """Диспетчер со всеми роутерами и middleware бота. Используется также нагрузочным стендом loadtest."""
+    # FSMContextMiddleware регистрируем сами: он читает raw_state ещё до хендлера,
+    # и это чтение должно идти через соединение апдейта из DataBaseMiddleware.
+    dp = Dispatcher(storage=storage, disable_fsm=True)
 
-    bot = Bot(token=config.bot.token,default=DefaultBotProperties(parse_mode=ParseMode.HTML),)
-    dp = Dispatcher(storage=storage)
+    logger.info("Including routers...")
+    dp.include_routers(admin_router, user_router, others_router)
+
+    logger.info("Including middlewares...")
+    dp.update.outer_middleware(OutboxMiddleware(outbox_sender))
+    dp.update.outer_middleware(TimedMiddleware(DataBaseMiddleware(
+        repeat_limit=config.db.query_repeat_limit,
+        strict=config.db.strict_queries
+    )))
+    dp.update.outer_middleware(CallbackAnswerMiddleware())
+    dp.update.outer_middleware(dp.fsm)
+    dp.update.middleware(BufferedFSMMiddleware())
+    dp.update.middleware(TimedMiddleware(ShadowBanMiddleware()))
+    setup_handler_metrics(dp)
+    setup_query_profiler(dp)
+
+    return dp
+
+async def main(config: Config) -> None:
+    logger.info("Starting bot...")
 
     db_pool: psycopg_pool.AsyncConnectionPool = await get_psql_pool(
         name=config.db.name,
@@ -32,20 +83,74 @@ async def main(config: Config) -> None:
         password=config.db.password,
     )
 
-    logger.info("Including routers...")
-    dp.include_routers(admin_router, user_router, others_router)
+    storage = create_storage(config, db_pool)
 
-    logger.info("Including middlewares...")
-    dp.update.middleware(DataBaseMiddleware())
-    dp.update.middleware(ShadowBanMiddleware())
+    session = ThrottledSession()
+    if config.bot.api_url:
+        session.api = TelegramAPIServer.from_base(config.bot.api_url)
+    session.middleware(BotApiMetricsMiddleware())
+    session.middleware(CallbackAnswerGuard())
 
+    bot = Bot(token=config.bot.token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML),)
+
+    outbox_sender = OutboxSender()
+    outbox_sender.start(bot)
+
+    dp = setup_dispatcher(config, storage, outbox_sender)
+
+    attempt_buffer = AttemptAnswerBuffer(db_pool)
+    attempt_buffer.start()
+
+    broadcaster = Broadcaster(db_pool)
+    broadcaster.start(bot)
+
+    scheduler = DelayedScheduler()
+    scheduler.start(bot)
+
+    file_collector = OrphanedFileCollector(db_pool)
+    file_collector.start()
+
+    submission_downloader = SubmissionDownloader(db_pool)
+    submission_downloader.start(bot)
+
+    submission_exporter = SubmissionExporter()
+
+    track_pool(db_pool)
+    track_stats("fsm_storage", "FSM storage sessions and cache state", storage.stats)
+    track_stats("bot_send_scheduler", "Outgoing Bot API throttling state", session.scheduler.stats)
+
+    dp.workflow_data.update(
+        db_pool=db_pool,
+        attempt_buffer=attempt_buffer,
+        broadcaster=broadcaster,
+        scheduler=scheduler,
+        submission_downloader=submission_downloader,
+        submission_exporter=submission_exporter,
+        admin_ids=config.bot.super_admin_ids
+    )
+
+    metrics_runner = None
     try:
-        await dp.start_polling(
-            bot, db_pool=db_pool,
-            admin_ids=config.bot.super_admin_ids
-        )
+        if config.metrics:
+            metrics_runner = await start_metrics_server(config.metrics)
+
+        if config.bot.mode == "webhook":
+            await run_webhook(dp, bot, config.webhook)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     except Exception as e:
         logger.exception(e)
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await submission_exporter.close()
+        await submission_downloader.stop()
+        await file_collector.stop()
+        await scheduler.stop()
+        await broadcaster.stop()
+        await outbox_sender.stop()
+        await attempt_buffer.stop()
+        await storage.close()
         await db_pool.close()
         logger.info("Connection to Postgres closed")
\ No newline at end of file
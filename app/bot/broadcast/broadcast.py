@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+import app.infrastructure.database.db as db_func
+from app.bot.throttling.throttling import bulk_priority
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BATCH_SIZE = 100
+BROADCAST_CONCURRENCY = 30
+BROADCAST_PROGRESS_INTERVAL = 3.0
+# Аренда рассылки продлевается на каждом чекпоинте; по её истечении рассылку подхватит другой воркер.
+BROADCAST_LEASE = 60.0
+
+
+class BroadcastLeaseLost(Exception):
+    """Рассылку перехватил другой воркер: аренда истекла до очередного чекпоинта."""
+
+
+class Broadcaster:
+    """
+    Рассылка объявлений всем студентам.
+    Получатели читаются пачками по users.id, после каждой пачки прогресс сохраняется
+    в таблицу broadcasts, поэтому после перезапуска рассылка продолжается с места остановки.
+    Перед отправкой воркер захватывает рассылку в аренду (claimed_by/lease_until), так что
+    при нескольких воркерах каждую рассылку ведёт один из них; аренду упавшего воркера
+    подхватывают остальные. Отправка помечена как массовая (bulk_priority) и не берёт
+    резерв общего ведра Bot API, оставленный для ответов пользователям.
+    """
+
+    def __init__(
+            self,
+            pool: AsyncConnectionPool,
+            batch_size: int = BROADCAST_BATCH_SIZE,
+            concurrency: int = BROADCAST_CONCURRENCY,
+            lease: float = BROADCAST_LEASE
+    ):
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size and concurrency must be >= 1")
+
+        self.pool = pool
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._bot: Bot | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._task = asyncio.create_task(self._run(), name="broadcaster")
+        self._wakeup.set()
+        logger.info("Broadcaster started")
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def announce(self, connection: AsyncConnection, *, text: str, admin_chat_id: int | None = None) -> None:
+        """
+        Ставит рассылку в очередь в транзакции хендлера; отправка начнётся после коммита.
+        """
+        await db_func.add_broadcast(connection, text=text, admin_chat_id=admin_chat_id)
+
+        call_after_commit = getattr(connection, "call_after_commit", None)
+        if call_after_commit is not None:
+            call_after_commit(self.wake)
+        else:
+            self.wake()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.info("Broadcaster stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Без пробуждений всё равно заглядываем раз в аренду: вдруг воркер с рассылкой упал.
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.lease)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                while True:
+                    async with self.pool.connection() as connection:
+                        broadcast = await db_func.claim_broadcast(connection, owner=self.owner, lease=self.lease)
+                    if broadcast is None:
+                        break
+
+                    try:
+                        await self._deliver(broadcast)
+                    except BroadcastLeaseLost:
+                        logger.warning("Broadcast %s was taken over by another worker", broadcast["id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Broadcast run failed, retrying in 30s")
+                await asyncio.sleep(30)
+                self._wakeup.set()
+
+    async def _checkpoint(self, connection: AsyncConnection, broadcast_id: int, **fields: Any) -> None:
+        if not await db_func.update_broadcast_progress(
+                connection, broadcast_id=broadcast_id, owner=self.owner, lease=self.lease, **fields
+        ):
+            raise BroadcastLeaseLost(broadcast_id)
+
+    async def _deliver(self, broadcast: dict[str, Any]) -> None:
+        broadcast_id = broadcast["id"]
+        last_user_id = broadcast["last_user_id"]
+        counters = {key: broadcast[key] for key in ("sent", "blocked", "failed")}
+        total = broadcast["total"]
+
+        if total is None:
+            async with self.pool.connection() as connection:
+                total = await db_func.count_broadcast_recipients(connection, after_user_id=last_user_id)
+                await self._checkpoint(connection, broadcast_id, total=total)
+
+        progress_message_id = broadcast["progress_message_id"]
+        if progress_message_id is None and broadcast["admin_chat_id"]:
+            try:
+                msg = await self._bot.send_message(broadcast["admin_chat_id"], self._progress_text(total, counters))
+                progress_message_id = msg.message_id
+                async with self.pool.connection() as connection:
+                    await self._checkpoint(connection, broadcast_id, progress_message_id=progress_message_id)
+            except TelegramAPIError:
+                logger.warning("Failed to send progress message for broadcast %s", broadcast_id)
+
+        logger.info("Broadcast %s started from user_id>%s, %s recipients", broadcast_id, last_user_id, total)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reported_at = time.monotonic()
+
+        while True:
+            async with self.pool.connection() as connection:
+                recipients = await db_func.get_broadcast_recipients(
+                    connection, after_user_id=last_user_id, limit=self.batch_size
+                )
+            if not recipients:
+                break
+
+            results = await asyncio.gather(*(
+                self._send(semaphore, r["telegram_id"], broadcast["text"]) for r in recipients
+            ))
+
+            blocked_ids = [r["telegram_id"] for r, result in zip(recipients, results) if result == "blocked"]
+            batch = {key: results.count(key) for key in ("sent", "blocked", "failed")}
+            last_user_id = recipients[-1]["id"]
+
+            async with self.pool.connection() as connection:
+                async with connection.transaction():
+                    await db_func.mark_users_not_alive(connection, telegram_ids=blocked_ids)
+                    await self._checkpoint(connection, broadcast_id, last_user_id=last_user_id, **batch)
+
+            for key, value in batch.items():
+                counters[key] += value
+
+            if time.monotonic() - reported_at >= BROADCAST_PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                await self._report(broadcast, progress_message_id, total, counters)
+
+        async with self.pool.connection() as connection:
+            await self._checkpoint(connection, broadcast_id, finished=True)
+
+        await self._report(broadcast, progress_message_id, total, counters, finished=True)
+        logger.info("Broadcast %s finished: %s", broadcast_id, counters)
+
+    async def _send(self, semaphore: asyncio.Semaphore, chat_id: int, text: str) -> str:
+        async with semaphore:
+            try:
+                with bulk_priority():
+                    await self._bot.send_message(chat_id, text)
+                return "sent"
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramBadRequest as e:
+                if "chat not found" in e.message.lower():
+                    return "blocked"
+                logger.warning("Broadcast message to %s rejected: %s", chat_id, e.message)
+                return "failed"
+            except TelegramAPIError:
+                logger.exception("Broadcast message to %s failed", chat_id)
+                return "failed"
+
+    @staticmethod
+    def _progress_text(total: int, counters: dict[str, int], finished: bool = False) -> str:
+        done = sum(counters.values())
+        return (
+            f"{'Рассылка завершена' if finished else 'Рассылка'}: {done}/{total}\n"
+            f"Доставлено: {counters['sent']}\n"
+            f"Заблокировали бота: {counters['blocked']}\n"
+            f"Ошибок: {counters['failed']}"
+        )
+
+    async def _report(
+            self,
+            broadcast: dict[str, Any],
+            progress_message_id: int | None,
+            total: int,
+            counters: dict[str, int],
+            finished: bool = False
+    ) -> None:
+        if progress_message_id is None:
+            return
+
+        try:
+            await self._bot.edit_message_text(
+                text=self._progress_text(total, counters, finished),
+                chat_id=broadcast["admin_chat_id"],
+                message_id=progress_message_id
+            )
+        except TelegramAPIError:
+            logger.debug("Failed to update progress message for broadcast %s", broadcast["id"], exc_info=True)
@@ -13,4 +13,19 @@ class FileType(str, Enum):
 
 class SubmissionStatus(str, Enum):
     UPLOADED = 'uploaded',
-    GRADED = 'graded'
\ No newline at end of file
+    GRADED = 'graded'
+
+class SeekDirection(str, Enum):
+    FIRST = 'first'
+    NEXT = 'next'
+    PREV = 'prev'
+    CURRENT = 'current'
+    NEAREST = 'nearest'
+
+class SendPriority(str, Enum):
+    INTERACTIVE = 'interactive'
+    BULK = 'bulk'
+
+class BotMessageSlot(str, Enum):
+    INSTRUCTION = 'instruction'
+    SYSTEM = 'system'
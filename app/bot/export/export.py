@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import mimetypes
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import FSInputFile
+
+logger = logging.getLogger(__name__)
+
+# Лимит Bot API на отправку файла — 50 МБ, оставляем запас на заголовки ZIP и multipart.
+EXPORT_PART_LIMIT = 48 * 1024 * 1024
+EXPORT_WORKERS = 1
+# Сколько имён пропущенных файлов перечислять в итоговом сообщении.
+EXPORT_LISTED_NAMES = 20
+_ZIP_ENTRY_OVERHEAD = 512
+
+
+def _write_zip_parts(
+        entries: list[tuple[str, str]],
+        out_dir: str,
+        part_limit: int
+) -> tuple[list[str], int, list[str]]:
+    """
+    Выполняется в отдельном процессе. Пишет файлы в ZIP-архивы, начиная новую часть,
+    когда следующий файл может не уместиться в part_limit. zipfile читает файл кусками,
+    так что в памяти никогда не бывает целого файла. Файлы, которые не влезут в part_limit
+    даже поодиночке, пропускаются: такую часть Bot API всё равно не примет.
+    Возвращает пути частей, число ненайденных файлов и имена слишком больших.
+    """
+    parts: list[str] = []
+    skipped = 0
+    oversized: list[str] = []
+    archive: zipfile.ZipFile | None = None
+    used = 0
+
+    try:
+        for source, arcname in entries:
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                skipped += 1
+                continue
+
+            # Deflate может немного увеличить уже сжатые данные (PDF, docx).
+            budget = size + size // 1000 + _ZIP_ENTRY_OVERHEAD
+            if budget > part_limit:
+                oversized.append(arcname)
+                continue
+
+            if archive is None or (used and used + budget > part_limit):
+                if archive is not None:
+                    archive.close()
+                path = os.path.join(out_dir, f"part{len(parts) + 1}.zip")
+                archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+                parts.append(path)
+                used = 0
+
+            archive.write(source, arcname)
+            used += budget
+    finally:
+        if archive is not None:
+            archive.close()
+
+    return parts, skipped, oversized
+
+
+def _safe_name(value: str | None) -> str:
+    return re.sub(r"[^\w.-]+", "_", value or "").strip("_") or "unknown"
+
+
+def _arcname(submission: dict[str, Any], taken: set[str]) -> str:
+    stamp = submission["submitted_at"].strftime("%Y%m%d-%H%M")
+    ext = mimetypes.guess_extension(submission["mime_type"] or "") or ".bin"
+    stem = f"{_safe_name(submission['surname'])}_{_safe_name(submission['name'])}_{stamp}"
+
+    name, n = f"{stem}{ext}", 1
+    while name in taken:
+        n += 1
+        name = f"{stem}_{n}{ext}"
+    taken.add(name)
+    return name
+
+
+class SubmissionExporter:
+    """
+    Выгрузка сдач лабораторной одним или несколькими ZIP-архивами.
+    Архивы собираются в пуле процессов и отправляются админу из фоновой задачи,
+    поэтому хендлер сразу возвращается, а цикл событий не занят сжатием.
+    """
+
+    def __init__(self, workers: int = EXPORT_WORKERS, part_limit: int = EXPORT_PART_LIMIT):
+        self.part_limit = part_limit
+        # spawn, а не fork: форк процесса с работающим циклом событий, сессией aiohttp и пулом psycopg
+        # копирует их состояние в дочерний процесс. Воркер стартует с чистого интерпретатора.
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._tasks: set[asyncio.Task] = set()
+
+    def start_export(self, bot: Bot, chat_id: int, lab_name: str, submissions: list[dict[str, Any]]) -> None:
+        task = asyncio.create_task(self._export(bot, chat_id, lab_name, submissions), name=f"export-{chat_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Submission exporter closed")
+
+    async def _export(self, bot: Bot, chat_id: int, lab_name: str, submissions: list[dict[str, Any]]) -> None:
+        taken: set[str] = set()
+        entries = [
+            (s["path"], _arcname(s, taken))
+            for s in submissions if s["sha256"] is not None and s["path"]
+        ]
+        pending = len(submissions) - len(entries)
+
+        out_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="lab_export_")
+        try:
+            loop = asyncio.get_running_loop()
+            parts, skipped, oversized = await loop.run_in_executor(
+                self._executor, _write_zip_parts, entries, out_dir, self.part_limit
+            )
+
+            base_name = _safe_name(lab_name)
+            failed_parts: list[int] = []
+            for i, part in enumerate(parts, start=1):
+                filename = f"{base_name}.zip" if len(parts) == 1 else f"{base_name}_part{i}.zip"
+                try:
+                    await bot.send_document(
+                        chat_id,
+                        FSInputFile(part, filename=filename),
+                        caption=f"Сдачи «{lab_name}», часть {i}/{len(parts)}"
+                    )
+                except TelegramAPIError:
+                    logger.exception("Failed to send part %d/%d of lab '%s' export", i, len(parts), lab_name)
+                    failed_parts.append(i)
+
+            exported = len(entries) - skipped - len(oversized)
+            text = f"Выгрузка «{lab_name}» завершена: {exported} файлов."
+            if pending or skipped:
+                text += f"\nЕщё не загружены на сервер: {pending + skipped}."
+            if oversized:
+                names = ", ".join(oversized[:EXPORT_LISTED_NAMES]) + ("…" if len(oversized) > EXPORT_LISTED_NAMES else "")
+                text += (f"\nСлишком большие для отправки (больше {self.part_limit // (1024 * 1024)} МБ): "
+                         f"{len(oversized)} — {names}.")
+            if failed_parts:
+                text += f"\nНе удалось отправить части: {', '.join(map(str, failed_parts))} из {len(parts)}."
+            await bot.send_message(chat_id, text)
+            logger.info("Exported %d submissions of lab '%s' in %d parts (%d failed, %d oversized)",
+                        exported, lab_name, len(parts), len(failed_parts), len(oversized))
+        except Exception:
+            logger.exception("Export of lab '%s' failed", lab_name)
+            try:
+                await bot.send_message(chat_id, f"Не удалось выгрузить сдачи «{lab_name}».")
+            except TelegramAPIError:
+                pass
+        finally:
+            await asyncio.to_thread(shutil.rmtree, out_dir, True)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any
+
+from psycopg_pool import AsyncConnectionPool
+
+import app.infrastructure.database.db as db_func
+
+logger = logging.getLogger(__name__)
+
+FILE_GC_INTERVAL = 60 * 60.0
+FILE_GC_BATCH_SIZE = 500
+MEDIA_ROOT = "media"
+
+
+class OrphanedFileCollector:
+    """
+    Периодически удаляет записи files, на которые больше ничего не ссылается
+    (после удаления лекций и лабораторных и замены файлов), вместе с локальными копиями в media/.
+    Каждая пачка удаляется в своей короткой транзакции, файлы с диска стираются после коммита.
+    """
+
+    def __init__(
+            self,
+            pool: AsyncConnectionPool,
+            interval: float = FILE_GC_INTERVAL,
+            batch_size: int = FILE_GC_BATCH_SIZE,
+            media_root: str = MEDIA_ROOT
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+
+        self.pool = pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.media_root = Path(media_root).resolve()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="orphaned-file-collector")
+        logger.info("Orphaned file collector started (interval=%.0fs, batch_size=%d)",
+                    self.interval, self.batch_size)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.info("Orphaned file collector stopped")
+
+    async def collect(self) -> dict[str, int]:
+        stats = {"rows": 0, "local_files": 0, "bytes": 0}
+
+        while True:
+            async with self.pool.connection() as connection:
+                deleted = await db_func.delete_orphaned_files(connection, limit=self.batch_size)
+
+            stats["rows"] += len(deleted)
+            stats["bytes"] += sum(f["file_size"] or 0 for f in deleted)
+
+            paths = [f["path"] for f in deleted if f["path"] and not f["path_shared"]]
+            if paths:
+                stats["local_files"] += await asyncio.to_thread(self._remove_local_files, paths)
+
+            if len(deleted) < self.batch_size:
+                break
+
+        if stats["rows"]:
+            logger.info("File GC reclaimed %d rows, %d local files, %d bytes",
+                        stats["rows"], stats["local_files"], stats["bytes"])
+        return stats
+
+    def _remove_local_files(self, paths: list[Any]) -> int:
+        removed = 0
+        for path in paths:
+            local_path = Path(path).resolve()
+            if not local_path.is_relative_to(self.media_root) or not local_path.is_file():
+                continue
+
+            try:
+                local_path.unlink()
+                removed += 1
+            except OSError:
+                logger.warning("Failed to remove orphaned file %s", local_path, exc_info=True)
+        return removed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.collect()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Orphaned file collection failed")
+            await asyncio.sleep(self.interval)
@@ -5,10 +5,8 @@ from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
 from psycopg import AsyncConnection
 
-from typing import Union
-import app.infrastructure.database.db as db_func
 from app.bot.enums.enums import UserRole
-from app.infrastructure.database.db import get_user_role
+from app.infrastructure.database.db import get_user_identity
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +30,14 @@ class UserRoleFilter(BaseFilter):
             logger.warning("No user found in event: %s", event)
             return False
 
-        role = await get_user_role(conn, telegram_id=user.id)
+        identity = await get_user_identity(conn, telegram_id=user.id)
 
-        if role is None:
+        if identity is None:
             logger.info("User %s not found in database", user.id)
             return False
 
+        role = identity.role
+
         has_access = role in self.roles
         logger.debug("User %s has role=%s, access=%s", user.id, role, has_access)
 
@@ -45,7 +45,7 @@ class UserRoleFilter(BaseFilter):
 
 class IsBanned(BaseFilter):
     async def __call__(self, message: Message, conn: AsyncConnection) -> bool:
-        user = await db_func.get_user(conn, telegram_id=message.from_user.id)
-        if not user:
+        identity = await get_user_identity(conn, telegram_id=message.from_user.id)
+        if identity is None:
             return False
-        return user.get("is_banned")
\ No newline at end of file
+        return identity.is_banned
\ No newline at end of file
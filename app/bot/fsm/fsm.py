@@ -0,0 +1,78 @@
+import logging
+from typing import Any
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+_UNSET: Any = object()
+
+
+class BufferedFSMContext(FSMContext):
+    """
+    FSMContext в рамках одного апдейта: данные читаются из хранилища один раз,
+    все изменения копятся в памяти и записываются в flush(): одним set_state_and_data,
+    если хранилище его поддерживает и изменились и state, и data, иначе set_state/set_data.
+    """
+
+    def __init__(self, storage: BaseStorage, key: StorageKey, state: str | None = _UNSET):
+        super().__init__(storage=storage, key=key)
+        self._state: str | None = state
+        self._data: dict[str, Any] | None = None
+        self._state_dirty = False
+        self._data_dirty = False
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+        return self._data
+
+    async def set_state(self, state: StateType = None) -> None:
+        self._state = state.state if isinstance(state, State) else state
+        self._state_dirty = True
+
+    async def get_state(self) -> str | None:
+        if self._state is _UNSET:
+            self._state = await self.storage.get_state(key=self.key)
+        return self._state
+
+    async def set_data(self, data: dict[str, Any]) -> None:
+        self._data = data.copy()
+        self._data_dirty = True
+
+    async def get_data(self) -> dict[str, Any]:
+        return (await self._load_data()).copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        return (await self._load_data()).get(key, default)
+
+    async def update_data(self, data: dict[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+
+        current = await self._load_data()
+        current.update(kwargs)
+        self._data_dirty = True
+
+        return current.copy()
+
+    @property
+    def dirty(self) -> bool:
+        return self._state_dirty or self._data_dirty
+
+    async def flush(self) -> None:
+        set_state_and_data = getattr(self.storage, "set_state_and_data", None)
+        if self._state_dirty and self._data_dirty and set_state_and_data is not None:
+            await set_state_and_data(key=self.key, state=self._state, data=self._data)
+            self._state_dirty = self._data_dirty = False
+            return
+
+        if self._state_dirty:
+            await self.storage.set_state(key=self.key, state=self._state)
+            self._state_dirty = False
+
+        if self._data_dirty:
+            await self.storage.set_data(key=self.key, data=self._data)
+            self._data_dirty = False
@@ -1,17 +1,18 @@
-import asyncio
 import logging
 
-from aiogram import Router, F, Bot
+from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from psycopg import AsyncConnection
 from aiogram.fsm.context import FSMContext
 import app.infrastructure.database.db as db_func
 import app.bot.keyboards.keyboards as keyb
-from app.bot.enums.enums import UserRole
+from app.bot.enums.enums import UserRole, SeekDirection
+from app.bot.outbox.outbox import Outbox
+from app.bot.scheduler.scheduler import DelayedScheduler
 
 logger = logging.getLogger(__name__)
 
-admin_main_router = Router()
+admin_main_router = Router(name="admin_main")
 
 def make_user_text(user: dict) -> str:
     return (
@@ -42,46 +43,36 @@ async def check_student_activity(message: Message):
 @admin_main_router.callback_query(F.data == "ban_user_click")
 async def process_ban_user_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    users = await db_func.get_users(conn)
-    users = [u for u in users if u['telegram_id'] != callback.from_user.id]
+    data = await state.get_data()
+    user = await db_func.seek_user(conn, current_id=data.get("user_cursor"), direction=SeekDirection.NEAREST,
+                                   exclude_telegram_id=callback.from_user.id)
 
-    if not users:
+    if not user:
         await callback.answer("Пользователей не существует.")
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("user_index", 0)
-    user = users[idx]
-
     text = make_user_text(user)
 
     inline_keyboard = keyb.admin_ban_action()
     await callback.message.edit_text(text, reply_markup=inline_keyboard)
-    await state.update_data(user_index=idx)
+    await state.update_data(user_cursor=user['id'])
 
 @admin_main_router.callback_query(F.data == "ban_click")
-async def process_ban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnection, state: FSMContext):
+async def process_ban_click(callback: CallbackQuery, outbox: Outbox, conn: AsyncConnection, state: FSMContext,
+                            scheduler: DelayedScheduler):
     await callback.answer()
-    users = await db_func.get_users(conn)
-    users = [u for u in users if u['telegram_id'] != callback.from_user.id]
+    data = await state.get_data()
+    user = await db_func.seek_user(conn, current_id=data.get("user_cursor"), direction=SeekDirection.NEAREST,
+                                   exclude_telegram_id=callback.from_user.id)
 
-    if not users:
-        await asyncio.sleep(1)
+    if not user:
         await state.clear()
         await callback.answer("Пользователей не существует.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("user_index", 0)
-
-    if idx < 0:
-        idx = 0
-    elif idx >= len(users):
-        idx = len(users) - 1
-
-    user = users[idx]
+    await state.update_data(user_cursor=user['id'])
 
     if user['is_banned']:
         await callback.answer("Пользователей уже забанен.")
@@ -89,7 +80,7 @@ async def process_ban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnec
 
     await db_func.ban_user(conn, telegram_id=user['telegram_id'])
 
-    await bot.send_message(user['telegram_id'], "Вас забанил администратор.")
+    outbox.send_message(user['telegram_id'], "Вас забанил администратор.")
 
     user['is_banned'] = not user['is_banned']
     text = make_user_text(user)
@@ -100,29 +91,22 @@ async def process_ban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnec
     await callback.answer("Пользователь забанен.")
 
 @admin_main_router.callback_query(F.data == "unban_click")
-async def process_unban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnection, state: FSMContext):
+async def process_unban_click(callback: CallbackQuery, outbox: Outbox, conn: AsyncConnection, state: FSMContext,
+                              scheduler: DelayedScheduler):
     await callback.answer()
 
-    users = await db_func.get_users(conn)
-    users = [u for u in users if u['telegram_id'] != callback.from_user.id]
+    data = await state.get_data()
+    user = await db_func.seek_user(conn, current_id=data.get("user_cursor"), direction=SeekDirection.NEAREST,
+                                   exclude_telegram_id=callback.from_user.id)
 
-    if not users:
-        await asyncio.sleep(1)
+    if not user:
         await state.clear()
         await callback.answer("Пользователей не существует.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("user_index", 0)
-
-    if idx < 0:
-        idx = 0
-    elif idx >= len(users):
-        idx = len(users) - 1
-
-    user = users[idx]
+    await state.update_data(user_cursor=user['id'])
 
     if not user['is_banned']:
         await callback.answer("У пользователя нет бана.")
@@ -130,7 +114,7 @@ async def process_unban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConn
 
     await db_func.unban_user(conn, telegram_id=user['telegram_id'])
 
-    await bot.send_message(user['telegram_id'], "Вас разбанил администратор.")
+    outbox.send_message(user['telegram_id'], "Вас разбанил администратор.")
 
     user['is_banned'] = not user['is_banned']
     text = make_user_text(user)
@@ -143,24 +127,20 @@ async def process_unban_click(callback: CallbackQuery, bot: Bot, conn: AsyncConn
 @admin_main_router.callback_query(F.data == "prev_ban_click")
 async def process_prev_ban_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    users = await db_func.get_users(conn)
-    users = [u for u in users if u['telegram_id'] != callback.from_user.id]
+    data = await state.get_data()
+    user = await db_func.seek_user(conn, current_id=data.get("user_cursor"), direction=SeekDirection.PREV,
+                                   exclude_telegram_id=callback.from_user.id)
 
-    if not users:
-        await callback.message.edit_text("Пользователей не существует.")
-        await state.clear()
-        return
-
-    current_index = await state.get_data()
-    idx = current_index.get("user_index", 0)
+    if not user:
+        if not await db_func.count_users(conn, exclude_telegram_id=callback.from_user.id):
+            await callback.message.edit_text("Пользователей не существует.")
+            await state.clear()
+            return
 
-    idx -= 1
-    if idx < 0:
         await callback.answer("Это первый пользователь.")
         return
 
-    await state.update_data(user_index=idx)
-    user = users[idx]
+    await state.update_data(user_cursor=user['id'])
 
     text = make_user_text(user)
 
@@ -170,24 +150,20 @@ async def process_prev_ban_click(callback: CallbackQuery, conn: AsyncConnection,
 @admin_main_router.callback_query(F.data == "next_ban_click")
 async def process_next_ban_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    users = await db_func.get_users(conn)
-    users = [u for u in users if u['telegram_id'] != callback.from_user.id]
+    data = await state.get_data()
+    user = await db_func.seek_user(conn, current_id=data.get("user_cursor"), direction=SeekDirection.NEXT,
+                                   exclude_telegram_id=callback.from_user.id)
 
-    if not users:
-        await callback.message.edit_text("Пользователей не существует.")
-        await state.clear()
-        return
+    if not user:
+        if not await db_func.count_users(conn, exclude_telegram_id=callback.from_user.id):
+            await callback.message.edit_text("Пользователей не существует.")
+            await state.clear()
+            return
 
-    current_index = await state.get_data()
-    idx = current_index.get("user_index", 0)
-
-    idx += 1
-    if idx >= len(users):
         await callback.answer("Это последний пользователь.")
         return
 
-    await state.update_data(user_index=idx)
-    user = users[idx]
+    await state.update_data(user_cursor=user['id'])
 
     text = make_user_text(user)
 
@@ -197,65 +173,51 @@ async def process_next_ban_click(callback: CallbackQuery, conn: AsyncConnection,
 @admin_main_router.callback_query(F.data == "requests_click")
 async def process_requests_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    requests = await db_func.get_access_requests(conn)
+    data = await state.get_data()
+    request = await db_func.seek_access_request(conn, current_id=data.get("request_cursor"),
+                                                direction=SeekDirection.NEAREST)
 
-    if not requests:
+    if not request:
         await callback.answer("Заявок нет.")
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("request_index", 0)
-    request = requests[idx]
-
     text = make_request_text(request)
 
     inline_keyboard = keyb.admin_request_action()
     await callback.message.edit_text(text, reply_markup=inline_keyboard)
-    await state.update_data(request_index=idx)
+    await state.update_data(request_cursor=request['id'])
 
 @admin_main_router.callback_query(F.data == "approve_click")
-async def process_approve_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnection, state: FSMContext):
+async def process_approve_click(callback: CallbackQuery, outbox: Outbox, conn: AsyncConnection, state: FSMContext,
+                                scheduler: DelayedScheduler):
     await callback.answer()
-    requests = await db_func.get_access_requests(conn)
+    data = await state.get_data()
+    request = await db_func.seek_access_request(conn, current_id=data.get("request_cursor"),
+                                                direction=SeekDirection.NEAREST)
 
-    if not requests:
-        await asyncio.sleep(1)
+    if not request:
         await state.clear()
         await callback.answer("Больше заявок нет.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("request_index", 0)
-
-    if idx < 0:
-        idx = 0
-    elif idx >= len(requests):
-        idx = len(requests) - 1
-
-    request = requests[idx]
-
     await db_func.create_user_from_request(conn, request_id=request['id'])
     await db_func.delete_access_request(conn, request_id=request['id'])
 
-    await bot.send_message(request['telegram_id'], "Поздравляем, Ваша заявка была одобрена.")
+    outbox.send_message(request['telegram_id'], "Поздравляем, Ваша заявка была одобрена.")
 
-    new_requests = await db_func.get_access_requests(conn)
+    next_request = await db_func.seek_access_request(conn, current_id=request['id'],
+                                                     direction=SeekDirection.NEAREST)
 
-    if not new_requests:
-        await asyncio.sleep(1)
+    if not next_request:
         await state.clear()
         await callback.answer("Больше заявок нет.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    if idx >= len(new_requests):
-        idx = max(len(new_requests) - 1, 0)
-
-    await state.update_data(request_index=idx)
-    next_request = new_requests[idx]
+    await state.update_data(request_cursor=next_request['id'])
     text = make_request_text(next_request)
     inline_keyboard = keyb.admin_request_action()
 
@@ -263,41 +225,35 @@ async def process_approve_click(callback: CallbackQuery, bot: Bot, conn: AsyncCo
     await callback.answer("Заявка одобрена.")
 
 @admin_main_router.callback_query(F.data == "reject_click")
-async def process_reject_click(callback: CallbackQuery, bot: Bot, conn: AsyncConnection, state: FSMContext):
+async def process_reject_click(callback: CallbackQuery, outbox: Outbox, conn: AsyncConnection, state: FSMContext,
+                               scheduler: DelayedScheduler):
     await callback.answer()
-    requests = await db_func.get_access_requests(conn)
+    data = await state.get_data()
+    request = await db_func.seek_access_request(conn, current_id=data.get("request_cursor"),
+                                                direction=SeekDirection.NEAREST)
 
-    if not requests:
-        await asyncio.sleep(1)
+    if not request:
         await state.clear()
         await callback.answer("Больше заявок нет.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    current_index = await state.get_data()
-    idx = current_index.get("request_index", 0)
-    request = requests[idx]
-
-    await bot.send_message(request['telegram_id'], "Увы, Ваша заявка была отклонена.\nЕсли Вы считаете это ошибкой, свяжитесь с администратором лично.")
+    outbox.send_message(request['telegram_id'], "Увы, Ваша заявка была отклонена.\nЕсли Вы считаете это ошибкой, свяжитесь с администратором лично.")
 
     await db_func.delete_access_request(conn, request_id=request['id'])
 
-    new_requests = await db_func.get_access_requests(conn)
+    next_request = await db_func.seek_access_request(conn, current_id=request['id'],
+                                                     direction=SeekDirection.NEAREST)
 
-    if not new_requests:
-        await asyncio.sleep(1)
+    if not next_request:
         await state.clear()
         await callback.answer("Больше заявок нет.")
         inline_keyboard = keyb.admin_functions()
-        await callback.message.edit_text("Выберите действие:", reply_markup=inline_keyboard)
+        scheduler.call_later(1, callback.message.edit_text, "Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    if idx >= len(new_requests):
-        idx = max(len(new_requests) - 1, 0)
-
-    await state.update_data(request_index=idx)
-    next_request = new_requests[idx]
+    await state.update_data(request_cursor=next_request['id'])
     text = make_request_text(next_request)
     inline_keyboard = keyb.admin_request_action()
 
@@ -307,23 +263,20 @@ async def process_reject_click(callback: CallbackQuery, bot: Bot, conn: AsyncCon
 @admin_main_router.callback_query(F.data == "prev_request_click")
 async def process_prev_request_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    requests = await db_func.get_access_requests(conn)
-
-    if not requests:
-        await callback.message.edit_text("Заявок нет.")
-        await state.clear()
-        return
+    data = await state.get_data()
+    request = await db_func.seek_access_request(conn, current_id=data.get("request_cursor"),
+                                                direction=SeekDirection.PREV)
 
-    current_index = await state.get_data()
-    idx = current_index.get("request_index", 0)
+    if not request:
+        if not await db_func.count_access_requests(conn):
+            await callback.message.edit_text("Заявок нет.")
+            await state.clear()
+            return
 
-    idx -= 1
-    if idx < 0:
         await callback.answer("Это первый запрос.")
         return
 
-    await state.update_data(request_index=idx)
-    request = requests[idx]
+    await state.update_data(request_cursor=request['id'])
 
     text = make_request_text(request)
 
@@ -333,23 +286,20 @@ async def process_prev_request_click(callback: CallbackQuery, conn: AsyncConnect
 @admin_main_router.callback_query(F.data == "next_request_click")
 async def process_next_request_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    requests = await db_func.get_access_requests(conn)
-
-    if not requests:
-        await callback.message.edit_text("Заявок нет.")
-        await state.clear()
-        return
+    data = await state.get_data()
+    request = await db_func.seek_access_request(conn, current_id=data.get("request_cursor"),
+                                                direction=SeekDirection.NEXT)
 
-    current_index = await state.get_data()
-    idx = current_index.get("request_index", 0)
+    if not request:
+        if not await db_func.count_access_requests(conn):
+            await callback.message.edit_text("Заявок нет.")
+            await state.clear()
+            return
 
-    idx += 1
-    if idx >= len(requests):
         await callback.answer("Это последний запрос.")
         return
 
-    await state.update_data(request_index=idx)
-    request = requests[idx]
+    await state.update_data(request_cursor=request['id'])
 
     text = make_request_text(request)
 
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 from aiogram import Router, F
@@ -9,6 +8,11 @@ from aiogram.fsm.context import FSMContext
 from app.bot.states.states import AddLabStates, EditLabStates
 import app.infrastructure.database.db as db_func
 import app.bot.keyboards.keyboards as keyb
+from app.bot.enums.enums import SeekDirection
+from app.bot.broadcast.broadcast import Broadcaster
+from app.bot.export.export import SubmissionExporter
+from app.bot.scheduler.scheduler import DelayedScheduler
+from app.bot.handlers.sys_functions import push_bot_message, clear_bot_messages, clear_bot_messages_later
 
 admin_labs_router = Router(name="admin_labs")
 
@@ -45,16 +49,13 @@ async def process_labs_edit(callback: CallbackQuery):
 async def process_labs_select(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
     await state.update_data(media_id=callback.message.message_id)
-    labs = await db_func.get_lab_works_with_file_ids(conn)
+    lab = await db_func.seek_lab_work(conn, direction=SeekDirection.FIRST)
 
-    if not labs:
+    if not lab:
         await callback.message.edit_text("Лабораторных работ нет.")
         await state.clear()
         return
 
-    idx = 0
-    lab = labs[idx]
-
     media = InputMediaDocument(
         media=lab["telegram_file_id"],
         caption=make_lab_text(lab)
@@ -63,25 +64,22 @@ async def process_labs_select(callback: CallbackQuery, conn: AsyncConnection, st
     inline_keyboard = keyb.admin_lab_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
 
-    await state.update_data(lab_index=idx)
+    await state.update_data(lab_cursor=lab["id"])
 
 @admin_labs_router.callback_query(F.data == "prev_lab_click")
 async def process_prev_lab_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not labs:
-        await callback.message.edit_text("Лабораторных работ нет.")
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("lab_index", 0) - 1
-    if idx < 0:
+    lab = await db_func.seek_lab_work(conn, current_id=data.get("lab_cursor"), direction=SeekDirection.PREV)
+    if not lab:
+        if not await db_func.count_lab_works(conn):
+            await callback.message.edit_text("Лабораторных работ нет.")
+            await state.clear()
+            return
+
         await callback.answer("Это первая лабораторная.")
         return
 
-    lab = labs[idx]
-
     media = InputMediaDocument(
         media=lab["telegram_file_id"],
         caption=make_lab_text(lab)
@@ -89,26 +87,23 @@ async def process_prev_lab_click(callback: CallbackQuery, conn: AsyncConnection,
 
     inline_keyboard = keyb.admin_lab_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-    await state.update_data(lab_index=idx)
+    await state.update_data(lab_cursor=lab["id"])
 
 
 @admin_labs_router.callback_query(F.data == "next_lab_click")
 async def process_next_lab_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not labs:
-        await callback.message.edit_text("Лабораторных работ нет.")
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("lab_index", 0) + 1
-    if idx >= len(labs):
+    lab = await db_func.seek_lab_work(conn, current_id=data.get("lab_cursor"), direction=SeekDirection.NEXT)
+    if not lab:
+        if not await db_func.count_lab_works(conn):
+            await callback.message.edit_text("Лабораторных работ нет.")
+            await state.clear()
+            return
+
         await callback.answer("Это последняя лабораторная.")
         return
 
-    lab = labs[idx]
-
     media = InputMediaDocument(
         media=lab["telegram_file_id"],
         caption=make_lab_text(lab)
@@ -116,14 +111,14 @@ async def process_next_lab_click(callback: CallbackQuery, conn: AsyncConnection,
 
     inline_keyboard = keyb.admin_lab_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-    await state.update_data(lab_index=idx)
+    await state.update_data(lab_cursor=lab["id"])
 
 @admin_labs_router.callback_query(F.data == "lab_add_click")
 async def lab_add_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     await state.set_state(AddLabStates.waiting_for_name)
     msg_instruction = await callback.message.answer("Введите название новой лабораторной:")
-    await state.update_data(msg_instruction_id=msg_instruction.message_id)
+    await push_bot_message(msg_instruction.message_id, state)
     try:
         await callback.message.delete()
     except Exception:
@@ -143,17 +138,14 @@ async def handle_new_lab_name(message: Message, state: FSMContext):
     await state.set_state(AddLabStates.waiting_for_file)
     msg_instruction = await message.answer("Отправьте PDF-файл лабораторной:")
 
-    data = await state.get_data()
-    prev_instr = data.get("msg_instruction_id")
-
-    await state.update_data(prev_instruction_id=prev_instr)
-    await state.update_data(msg_answer_id=message.message_id)
-    await state.update_data(msg_instruction_id=msg_instruction.message_id)
+    await push_bot_message(message.message_id, state)
+    await push_bot_message(msg_instruction.message_id, state)
 
 
 # ----------------- Принимаем PDF и создаём запись -----------------
 @admin_labs_router.message(AddLabStates.waiting_for_file, F.document.mime_type.in_(ALLOWED_TYPE))
-async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncConnection):
+async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncConnection, broadcaster: Broadcaster,
+                              scheduler: DelayedScheduler):
     data = await state.get_data()
     lab_name = data.get("lab_name")
     if not lab_name:
@@ -168,6 +160,9 @@ async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncCo
             conn,
             file_type="lab",
             telegram_file_id=telegram_file_id,
+            file_unique_id=message.document.file_unique_id,
+            file_size=message.document.file_size,
+            mime_type=message.document.mime_type,
             path=telegram_file_id
         )
     except Exception as exc:
@@ -196,27 +191,13 @@ async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncCo
         await state.clear()
         return
 
-    msg_confirmation = await message.answer(f"Лабораторная '{lab_name}' добавлена.")
-    await asyncio.sleep(1.5)
+    await broadcaster.announce(conn, text=f"Добавлена новая лабораторная работа: «{lab_name}».",
+                               admin_chat_id=message.chat.id)
 
-    try:
-        prev_instruction_id = data.get("prev_instruction_id")
-        msg_instruction_id = data.get("msg_instruction_id")
-        msg_answer_id = data.get("msg_answer_id")
-
-        if msg_answer_id:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_answer_id)
-        if msg_instruction_id:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_instruction_id)
-        await message.delete()
-        if prev_instruction_id:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=prev_instruction_id)
-    except Exception:
-        pass
-    try:
-        await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_confirmation.message_id)
-    except Exception:
-        pass
+    msg_confirmation = await message.answer(f"Лабораторная '{lab_name}' добавлена.")
+    await push_bot_message(message.message_id, state)
+    await push_bot_message(msg_confirmation.message_id, state)
+    await clear_bot_messages_later(state, scheduler)
 
     new_lab = {
         "id": new_lab_id,
@@ -247,13 +228,13 @@ async def handle_new_lab_wrong_file(message: Message):
 async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    cursor = data.get("lab_cursor")
+    if cursor is None:
         await callback.answer("Нет выбранной лабораторной для удаления.", show_alert=True)
         return
 
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not labs:
+    lab = await db_func.seek_lab_work(conn, current_id=cursor, direction=SeekDirection.NEAREST)
+    if not lab:
         await callback.answer("Лабораторных работ нет.", show_alert=False)
         await state.clear()
         inline_keyboard = keyb.admin_labs()
@@ -263,13 +244,6 @@ async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state
             await callback.message.answer("Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    if idx < 0:
-        idx = 0
-    elif idx >= len(labs):
-        idx = len(labs) - 1
-
-    lab = labs[idx]
-
     try:
         await db_func.delete_lab_work(conn, lab_id=lab["id"])
         logger.info("Deleted lab id=%s name=%s", lab["id"], lab["name"])
@@ -278,8 +252,8 @@ async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state
         await callback.answer("Ошибка удаления из БД.", show_alert=True)
         return
 
-    new_labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not new_labs:
+    next_lab = await db_func.seek_lab_work(conn, current_id=lab["id"], direction=SeekDirection.NEAREST)
+    if not next_lab:
         await state.clear()
         inline_keyboard = keyb.admin_labs()
         try:
@@ -289,17 +263,13 @@ async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state
         await callback.answer("Лабораторная удалена.")
         return
 
-    if idx >= len(new_labs):
-        idx = max(len(new_labs) - 1, 0)
-
-    next_lab = new_labs[idx]
     caption = make_lab_text(next_lab)
     inline_keyboard = keyb.admin_lab_select()
 
     try:
         media = InputMediaDocument(media=next_lab["telegram_file_id"], caption=caption)
         await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-        await state.update_data(lab_index=idx)
+        await state.update_data(lab_cursor=next_lab["id"])
         await callback.answer("Лабораторная удалена. Показана следующая.")
         return
     except TelegramBadRequest as e:
@@ -315,14 +285,13 @@ async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state
             await callback.message.delete()
         except Exception:
             logger.debug("Old lab message wasn't deleted or already removed.")
-        await state.update_data(lab_index=idx, labs_message_id=new_msg.message_id)
+        await state.update_data(lab_cursor=next_lab["id"], labs_message_id=new_msg.message_id)
         await callback.answer("Лабораторная удалена. Показана следующая.")
     except Exception as e:
         logger.exception("Failed to show next lab after deletion: %s", e)
         inline_keyboard = keyb.admin_labs()
         await callback.message.answer(f"Лабораторная '{lab['name']}' удалена, но не удалось показать следующую.", reply_markup=inline_keyboard)
         await state.set_state(None)
-        await state.update_data(msg_instruction_id=None)
         await callback.answer("Лабораторная удалена.")
 
 
@@ -331,14 +300,13 @@ async def lab_delete_click(callback: CallbackQuery, conn: AsyncConnection, state
 async def lab_update_name_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    if data.get("lab_cursor") is None:
         await callback.answer("Нет выбранной лабораторной для изменения названия.", show_alert=True)
         return
 
     await state.set_state(EditLabStates.waiting_for_name)
     msg_instruction = await callback.message.answer("Введите новое название лабораторной:")
-    await state.update_data(msg_instruction_id=msg_instruction.message_id)
+    await push_bot_message(msg_instruction.message_id, state)
 
     try:
         await callback.message.delete()
@@ -354,32 +322,22 @@ async def handle_edit_lab_name(message: Message, state: FSMContext, conn: AsyncC
         return
 
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    cursor = data.get("lab_cursor")
+    if cursor is None:
         await message.answer("Не удалось определить выбранную лабораторную. Операция отменена.")
         await state.clear()
         return
 
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not labs or idx >= len(labs):
+    lab = await db_func.get_lab_work_with_file(conn, lab_id=cursor)
+    if not lab:
         await message.answer("Лабораторная не найдена. Операция отменена.")
         await state.clear()
         return
 
-    lab = labs[idx]
-
     await db_func.update_lab_work(conn, lab_id=lab["id"], name=new_name)
 
-    msg_instruction_id = data.get("msg_instruction_id")
-    try:
-        await message.delete()
-    except Exception:
-        pass
-    if msg_instruction_id:
-        try:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_instruction_id)
-        except Exception:
-            pass
+    await push_bot_message(message.message_id, state)
+    await clear_bot_messages(message, state)
 
     updated_lab = {**lab, "name": new_name}
     caption = make_lab_text(updated_lab)
@@ -392,13 +350,12 @@ async def handle_edit_lab_name(message: Message, state: FSMContext, conn: AsyncC
             reply_markup=inline_keyboard
         )
 
-        await state.update_data(labs_message_id=new_msg.message_id, lab_index=idx)
+        await state.update_data(labs_message_id=new_msg.message_id, lab_cursor=lab["id"])
     except Exception as e:
         logger.exception("Failed to send updated lab media: %s", e)
         await message.answer("Не удалось показать обновлённую лабораторную.")
 
     await state.set_state(None)
-    await state.update_data(msg_instruction_id=None)
 
 
 # --- Обновление файла лабораторной ---
@@ -408,14 +365,13 @@ async def lab_update_click(callback: CallbackQuery, state: FSMContext):
     logger.debug("lab_update_click")
 
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    if data.get("lab_cursor") is None:
         await callback.answer("Нет выбранной лабораторной для обновления файла.", show_alert=True)
         return
 
     await state.set_state(EditLabStates.waiting_for_file)
     msg = await callback.message.answer("Отправьте новый PDF-файл для лабораторной:")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await push_bot_message(msg.message_id, state)
 
     try:
         await callback.message.delete()
@@ -424,22 +380,24 @@ async def lab_update_click(callback: CallbackQuery, state: FSMContext):
 
 
 @admin_labs_router.message(EditLabStates.waiting_for_file, F.document.mime_type.in_(ALLOWED_TYPE))
-async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncConnection):
+async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncConnection,
+                              scheduler: DelayedScheduler):
     data = await state.get_data()
-    idx = data.get("lab_index")
-    labs = await db_func.get_lab_works(conn)
-    if labs is None or idx is None or idx >= len(labs):
+    cursor = data.get("lab_cursor")
+    lab = await db_func.get_lab_work_with_file(conn, lab_id=cursor) if cursor is not None else None
+    if not lab:
         await message.answer("Не удалось найти выбранную лабораторную. Операция отменена.")
         await state.clear()
         return
 
-    lab = labs[idx]
-
     try:
         new_file_record_id = await db_func.add_file(
             connection=conn,
             file_type="lab",
             telegram_file_id=message.document.file_id,
+            file_unique_id=message.document.file_unique_id,
+            file_size=message.document.file_size,
+            mime_type=message.document.mime_type,
             path=None
         )
     except Exception as e:
@@ -456,30 +414,16 @@ async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncCo
     await db_func.update_lab_work(conn, lab_id=lab["id"], file_id=new_file_record_id)
 
     msg_confirmation = await message.answer(f"Файл лабораторной '{lab['name']}' успешно обновлён.")
-    await asyncio.sleep(1.2)
-    try:
-        await message.delete()
-    except Exception:
-        logger.exception("")
-    try:
-        msg_instruction_id = data.get("msg_instruction_id")
-        if msg_instruction_id:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_instruction_id)
-        else: logger.warning("msg_instruction_id not found")
-    except Exception:
-        logger.exception("")
-    try:
-        await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_confirmation.message_id)
-    except Exception:
-        logger.exception("")
+    await push_bot_message(message.message_id, state)
+    await push_bot_message(msg_confirmation.message_id, state)
+    await clear_bot_messages_later(state, scheduler, delay=1.2)
 
-    new_labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not new_labs:
-        await message.answer("Обновление прошло, но не удалось получить список лабораторных.")
+    new_lab = await db_func.get_lab_work_with_file(conn, lab_id=lab["id"])
+    if not new_lab:
+        await message.answer("Обновление прошло, но не удалось получить лабораторную.")
         await state.clear()
         return
 
-    new_lab = new_labs[idx] if idx < len(new_labs) else new_labs[-1]
     caption = make_lab_text(new_lab)
     inline_keyboard = keyb.admin_lab_select()
 
@@ -493,13 +437,12 @@ async def handle_new_lab_file(message: Message, state: FSMContext, conn: AsyncCo
                 await message.bot.delete_message(chat_id=message.chat.id, message_id=old_msg_id)
         except Exception:
             logger.exception("")
-        await state.update_data(lab_index=idx, labs_message_id=new_msg.message_id)
+        await state.update_data(lab_cursor=lab["id"], labs_message_id=new_msg.message_id)
     except Exception as e:
         logger.exception("Не удалось показать обновлённую лабораторную: %s", e)
         await message.answer("Файл обновлен, но не удалось показать обновлённую лабораторную.")
 
     await state.set_state(None)
-    await state.update_data(msg_instruction_id=None)
 
 
 @admin_labs_router.message(EditLabStates.waiting_for_file, ~F.document.mime_type.in_(ALLOWED_TYPE))
@@ -512,14 +455,13 @@ async def handle_wrong_lab_file_type(message: Message):
 async def lab_update_description_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    if data.get("lab_cursor") is None:
         await callback.answer("Нет выбранной лабораторной для изменения описания.", show_alert=True)
         return
 
     await state.set_state(EditLabStates.waiting_for_description)
     msg_instruction = await callback.message.answer("Введите новое описание лабораторной:")
-    await state.update_data(msg_instruction_id=msg_instruction.message_id)
+    await push_bot_message(msg_instruction.message_id, state)
 
     try:
         await callback.message.delete()
@@ -530,49 +472,34 @@ async def lab_update_description_click(callback: CallbackQuery, state: FSMContex
 
 
 @admin_labs_router.message(EditLabStates.waiting_for_description)
-async def handle_new_lab_description(message: Message, state: FSMContext, conn: AsyncConnection):
+async def handle_new_lab_description(message: Message, state: FSMContext, conn: AsyncConnection,
+                                     scheduler: DelayedScheduler):
     new_description = (message.text or "").strip()
     if new_description == "":
         await message.answer("Описание не может быть пустым. Попробуйте снова.")
         return
 
     data = await state.get_data()
-    idx = data.get("lab_index")
-    if idx is None:
+    cursor = data.get("lab_cursor")
+    if cursor is None:
         await message.answer("Нет выбранной лабораторной.")
         await state.clear()
         return
 
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    if not labs or idx >= len(labs):
+    lab = await db_func.get_lab_work_with_file(conn, lab_id=cursor)
+    if not lab:
         await message.answer("Лабораторная не найдена.")
         await state.clear()
         return
-
-    lab = labs[idx]
     await db_func.update_lab_work(conn, lab_id=lab["id"], description=new_description)
 
     msg_confirmation = await message.answer("Описание успешно обновлено.")
-    await asyncio.sleep(1.5)
-
-    msg_instruction_id = data.get("msg_instruction_id")
-    try:
-        await message.delete()
-    except Exception:
-        pass
-    try:
-        await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_confirmation.message_id)
-    except Exception:
-        pass
-    if msg_instruction_id:
-        try:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=msg_instruction_id)
-        except Exception:
-            pass
+    await push_bot_message(message.message_id, state)
+    await push_bot_message(msg_confirmation.message_id, state)
+    await clear_bot_messages_later(state, scheduler)
 
-    updated_labs = await db_func.get_lab_works_with_file_ids(conn)
-    if updated_labs and idx < len(updated_labs):
-        new_lab = updated_labs[idx]
+    new_lab = await db_func.get_lab_work_with_file(conn, lab_id=lab["id"])
+    if new_lab:
         try:
             new_msg = await message.bot.send_document(chat_id=message.chat.id, document=new_lab["telegram_file_id"],
                                                       caption=make_lab_text(new_lab), reply_markup=keyb.admin_lab_select())
@@ -580,7 +507,27 @@ async def handle_new_lab_description(message: Message, state: FSMContext, conn:
             logger.exception("Failed to send updated lab media after description update")
 
     await state.set_state(None)
-    await state.update_data(msg_instruction_id=None)
+
+
+@admin_labs_router.callback_query(F.data == "lab_export_click")
+async def lab_export_click(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection,
+                           submission_exporter: SubmissionExporter):
+    await callback.answer()
+    data = await state.get_data()
+    cursor = data.get("lab_cursor")
+
+    lab = await db_func.get_lab_work_with_file(conn, lab_id=cursor) if cursor is not None else None
+    if not lab:
+        await callback.answer("Нет выбранной лабораторной.", show_alert=True)
+        return
+
+    submissions = await db_func.get_lab_submissions_for_export(conn, lab_id=lab["id"])
+    if not submissions:
+        await callback.message.answer(f"По лабораторной «{lab['name']}» ещё нет сдач.")
+        return
+
+    submission_exporter.start_export(callback.bot, callback.message.chat.id, lab["name"], submissions)
+    await callback.message.answer(f"Готовлю архив со сдачами «{lab['name']}» ({len(submissions)} шт.).")
 
 
 @admin_labs_router.callback_query(F.data == "cancel_labs_click")
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import os
 
@@ -8,10 +7,12 @@ from aiogram.types import Message, CallbackQuery, InputMediaDocument
 from psycopg import AsyncConnection
 from aiogram.fsm.context import FSMContext
 from app.bot.states.states import AddLectureStates, EditLectureStates
-from app.bot.enums.enums import FileType
+from app.bot.enums.enums import FileType, SeekDirection
 import app.infrastructure.database.db as db_func
 import app.bot.keyboards.keyboards as keyb
-from app.bot.handlers.sys_functions import push_bot_message, clear_bot_messages
+from app.bot.handlers.sys_functions import push_bot_message, clear_bot_messages_later
+from app.bot.broadcast.broadcast import Broadcaster
+from app.bot.scheduler.scheduler import DelayedScheduler
 
 admin_lectures_router = Router(name="admin_lectures")
 
@@ -43,16 +44,13 @@ async def process_lectures_edit(callback: CallbackQuery):
 async def process_lectures_select(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
     await state.update_data(media_id=callback.message.message_id)
-    lectures = await db_func.get_lectures_with_file_ids(conn)
+    lecture = await db_func.seek_lecture(conn, direction=SeekDirection.FIRST)
 
-    if not lectures:
+    if not lecture:
         await callback.message.edit_text("Лекций нет.")
         await state.clear()
         return
 
-    idx = 0
-    lecture = lectures[idx]
-
     media = InputMediaDocument(
         media=lecture["telegram_file_id"],
         caption=make_lecture_text(lecture)
@@ -61,25 +59,22 @@ async def process_lectures_select(callback: CallbackQuery, conn: AsyncConnection
     inline_keyboard = keyb.admin_lecture_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
 
-    await state.update_data(lecture_index=idx)
+    await state.update_data(lecture_cursor=lecture["id"])
 
 @admin_lectures_router.callback_query(F.data == "prev_lecture_click")
 async def process_prev_lecture_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    lectures = await db_func.get_lectures_with_file_ids(conn)
-    if not lectures:
-        await callback.message.edit_text("Лекций нет.")
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("lecture_index", 0) - 1
-    if idx < 0:
+    lecture = await db_func.seek_lecture(conn, current_id=data.get("lecture_cursor"), direction=SeekDirection.PREV)
+    if not lecture:
+        if not await db_func.count_lectures(conn):
+            await callback.message.edit_text("Лекций нет.")
+            await state.clear()
+            return
+
         await callback.answer("Это первая лекция.")
         return
 
-    lecture = lectures[idx]
-
     media = InputMediaDocument(
         media=lecture["telegram_file_id"],
         caption=make_lecture_text(lecture)
@@ -87,26 +82,23 @@ async def process_prev_lecture_click(callback: CallbackQuery, conn: AsyncConnect
 
     inline_keyboard = keyb.admin_lecture_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-    await state.update_data(lecture_index=idx)
+    await state.update_data(lecture_cursor=lecture["id"])
 
 
 @admin_lectures_router.callback_query(F.data == "next_lecture_click")
 async def process_next_lecture_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    lectures = await db_func.get_lectures_with_file_ids(conn)
-    if not lectures:
-        await callback.message.edit_text("Лекций нет.")
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("lecture_index", 0) + 1
-    if idx >= len(lectures):
+    lecture = await db_func.seek_lecture(conn, current_id=data.get("lecture_cursor"), direction=SeekDirection.NEXT)
+    if not lecture:
+        if not await db_func.count_lectures(conn):
+            await callback.message.edit_text("Лекций нет.")
+            await state.clear()
+            return
+
         await callback.answer("Это последняя лекция.")
         return
 
-    lecture = lectures[idx]
-
     media = InputMediaDocument(
         media=lecture["telegram_file_id"],
         caption=make_lecture_text(lecture)
@@ -114,7 +106,7 @@ async def process_next_lecture_click(callback: CallbackQuery, conn: AsyncConnect
 
     inline_keyboard = keyb.admin_lecture_select()
     await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-    await state.update_data(lecture_index=idx)
+    await state.update_data(lecture_cursor=lecture["id"])
 
 @admin_lectures_router.callback_query(F.data == "lecture_add_click")
 async def process_lecture_add(callback: CallbackQuery, state: FSMContext):
@@ -135,25 +127,35 @@ async def process_lecture_name(message: Message, state: FSMContext):
     await push_bot_message(msg.message_id, state)
 
 @admin_lectures_router.message(AddLectureStates.waiting_for_pdf, F.document.mime_type.in_(ALLOWED_TYPE))
-async def process_lecture_pdf(message: Message, bot: Bot, conn: AsyncConnection, state: FSMContext):
+async def process_lecture_pdf(message: Message, bot: Bot, conn: AsyncConnection, state: FSMContext,
+                              broadcaster: Broadcaster, scheduler: DelayedScheduler):
     await push_bot_message(message.message_id, state)
 
     data = await state.get_data()
     lecture_name = data.get("lecture_name")
 
-    media_folder = os.path.join("media", "lectures")
-    os.makedirs(media_folder, exist_ok=True)
-
-    file_path = os.path.join(media_folder, message.document.file_name)
-    await bot.download(
-        file=message.document.file_id,
-        destination=file_path
-    )
+    document = message.document
+    stored = await db_func.get_file_by_unique_id(conn, file_unique_id=document.file_unique_id,
+                                                 file_type=FileType.LECTURE)
+    if stored is not None and os.path.isfile(stored["path"]):
+        file_path = stored["path"]
+    else:
+        media_folder = os.path.join("media", "lectures")
+        os.makedirs(media_folder, exist_ok=True)
+
+        file_path = os.path.join(media_folder, document.file_name)
+        await bot.download(
+            file=document.file_id,
+            destination=file_path
+        )
 
     file_id = await db_func.add_file(
         connection=conn,
         file_type=FileType.LECTURE,
-        telegram_file_id=message.document.file_id,
+        telegram_file_id=document.file_id,
+        file_unique_id=document.file_unique_id,
+        file_size=document.file_size,
+        mime_type=document.mime_type,
         path=file_path
     )
 
@@ -173,11 +175,13 @@ async def process_lecture_pdf(message: Message, bot: Bot, conn: AsyncConnection,
         await push_bot_message(msg.message_id, state)
         return
 
+    await broadcaster.announce(conn, text=f"Добавлена новая лекция: «{lecture_name}».",
+                               admin_chat_id=message.chat.id)
+
     msg = await message.answer(f"Лекция '{lecture_name}' успешно добавлена.")
     await push_bot_message(msg.message_id, state)
 
-    await asyncio.sleep(1.5)
-    await clear_bot_messages(message, state)
+    await clear_bot_messages_later(state, scheduler)
 
     await state.clear()
 
@@ -193,13 +197,13 @@ async def process_invalid_file(message: Message, state: FSMContext):
 async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("lecture_index")
-    if idx is None:
+    cursor = data.get("lecture_cursor")
+    if cursor is None:
         await callback.answer("Нет выбранной лекции для удаления.", show_alert=True)
         return
 
-    lectures = await db_func.get_lectures_with_file_ids(conn)
-    if not lectures:
+    lecture = await db_func.seek_lecture(conn, current_id=cursor, direction=SeekDirection.NEAREST)
+    if not lecture:
         await callback.answer("Лекций нет.", show_alert=False)
         await state.clear()
         inline_keyboard = keyb.admin_functions()
@@ -209,13 +213,6 @@ async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, s
             await callback.message.answer("Выберите действие:", reply_markup=inline_keyboard)
         return
 
-    if idx < 0:
-        idx = 0
-    elif idx >= len(lectures):
-        idx = len(lectures) - 1
-
-    lecture = lectures[idx]
-
     try:
         await db_func.delete_lecture(conn, lecture_id=lecture["id"])
         logger.info("Deleted lecture id=%s name=%s", lecture["id"], lecture["name"])
@@ -224,9 +221,9 @@ async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, s
         await callback.answer("Ошибка удаления из БД.", show_alert=True)
         return
 
-    new_lectures = await db_func.get_lectures_with_file_ids(conn)
+    next_lecture = await db_func.seek_lecture(conn, current_id=lecture["id"], direction=SeekDirection.NEAREST)
 
-    if not new_lectures:
+    if not next_lecture:
         await state.clear()
         inline_keyboard = keyb.admin_functions()
 
@@ -237,10 +234,6 @@ async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, s
         await callback.answer("Лекция удалена.")
         return
 
-    if idx >= len(new_lectures):
-        idx = max(len(new_lectures) - 1, 0)
-
-    next_lecture = new_lectures[idx]
     caption = make_lecture_text(next_lecture)
     inline_keyboard = keyb.admin_lecture_select()
 
@@ -248,7 +241,7 @@ async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, s
         media = InputMediaDocument(media=next_lecture["telegram_file_id"], caption=caption)
 
         await callback.message.edit_media(media=media, reply_markup=inline_keyboard)
-        await state.update_data(lecture_index=idx)
+        await state.update_data(lecture_cursor=next_lecture["id"])
         await callback.answer("Лекция удалена. Показана следующая.")
         return
     except TelegramBadRequest as e:
@@ -266,7 +259,7 @@ async def lecture_delete_click(callback: CallbackQuery, conn: AsyncConnection, s
         except TelegramBadRequest:
             logger.exception("Old lecture message wasn't deleted or already removed.")
 
-        await state.update_data(lecture_index=idx, lectures_message_id=new_msg.message_id)
+        await state.update_data(lecture_cursor=next_lecture["id"], lectures_message_id=new_msg.message_id)
         await callback.answer("Лекция удалена. Показана следующая.")
     except Exception as e:
         logger.exception("Failed to show next lecture after deletion: %s", e)
@@ -284,8 +277,7 @@ async def lecture_update_name_click(callback: CallbackQuery, state: FSMContext):
     await state.update_data(media_id=callback.message.message_id)
 
     data = await state.get_data()
-    idx = data.get("lecture_index")
-    if idx is None:
+    if data.get("lecture_cursor") is None:
         await callback.answer("Нет выбранной лекции для изменения названия.", show_alert=True)
         return
 
@@ -295,7 +287,8 @@ async def lecture_update_name_click(callback: CallbackQuery, state: FSMContext):
 
 
 @admin_lectures_router.message(EditLectureStates.waiting_for_name)
-async def handle_new_lecture_name(message: Message, conn: AsyncConnection, state: FSMContext):
+async def handle_new_lecture_name(message: Message, conn: AsyncConnection, state: FSMContext,
+                                  scheduler: DelayedScheduler):
     await push_bot_message(message.message_id, state)
 
     new_name = message.text.strip()
@@ -304,9 +297,11 @@ async def handle_new_lecture_name(message: Message, conn: AsyncConnection, state
         return
 
     data = await state.get_data()
-    idx = data.get("lecture_index")
-    lectures = await db_func.get_lectures_with_file_ids(conn)
-    lecture = lectures[idx]
+    lecture = await db_func.get_lecture_with_file(conn, lecture_id=data.get("lecture_cursor"))
+    if not lecture:
+        await message.answer("Лекция не найдена.")
+        await state.clear()
+        return
 
     await db_func.update_lecture(conn, lecture_id=lecture["id"], name=new_name)
 
@@ -322,8 +317,7 @@ async def handle_new_lecture_name(message: Message, conn: AsyncConnection, state
     await message.bot.edit_message_media(chat_id=message.chat.id, message_id=data["media_id"], media=media,
                                          reply_markup=keyb.admin_lecture_select())
 
-    await asyncio.sleep(1.5)
-    await clear_bot_messages(message, state)
+    await clear_bot_messages_later(state, scheduler)
 
     await state.set_state(None)
 
@@ -334,8 +328,7 @@ async def lecture_update_click(callback: CallbackQuery, state: FSMContext):
     await state.update_data(media_id=callback.message.message_id)
 
     data = await state.get_data()
-    idx = data.get("lecture_index")
-    if idx is None:
+    if data.get("lecture_cursor") is None:
         await callback.answer("Нет выбранной лекции для обновления файла.", show_alert=True)
         return
 
@@ -347,23 +340,30 @@ async def lecture_update_click(callback: CallbackQuery, state: FSMContext):
 
 # ----------------- Обработка нового PDF файла -----------------
 @admin_lectures_router.message(EditLectureStates.waiting_for_file, F.document.mime_type.in_(ALLOWED_TYPE))
-async def handle_new_lecture_file(message: Message, conn: AsyncConnection, state: FSMContext):
+async def handle_new_lecture_file(message: Message, conn: AsyncConnection, state: FSMContext,
+                                  scheduler: DelayedScheduler):
     await push_bot_message(message.message_id, state)
 
     data = await state.get_data()
-    idx = data.get("lecture_index")
-    if idx is None:
+    cursor = data.get("lecture_cursor")
+    if cursor is None:
         await message.answer("Нет выбранной лекции для обновления файла.")
         await state.clear()
         return
 
-    lectures = await db_func.get_lectures(conn)
-    lecture = lectures[idx]
+    lecture = await db_func.get_lecture_with_file(conn, lecture_id=cursor)
+    if not lecture:
+        await message.answer("Лекция не найдена.")
+        await state.clear()
+        return
 
     await db_func.update_lecture_file(
         conn,
         lecture_id=lecture['id'],
         telegram_file_id=message.document.file_id,
+        file_unique_id=message.document.file_unique_id,
+        file_size=message.document.file_size,
+        mime_type=message.document.mime_type,
         file_type="lecture"
     )
 
@@ -379,8 +379,7 @@ async def handle_new_lecture_file(message: Message, conn: AsyncConnection, state
     await message.bot.edit_message_media(chat_id=message.chat.id, message_id=data["media_id"], media=media,
                                          reply_markup=keyb.admin_lecture_select())
 
-    await asyncio.sleep(1.5)
-    await clear_bot_messages(message, state)
+    await clear_bot_messages_later(state, scheduler)
 
     await state.set_state(None)
 
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 from aiogram import Router, F
@@ -9,7 +8,12 @@ from aiogram.fsm.context import FSMContext
 from app.bot.states.states import TestCreationStates, EditTestStates
 import app.infrastructure.database.db as db_func
 import app.bot.keyboards.keyboards as keyb
-from app.bot.handlers.sys_functions import push_bot_message, clear_bot_messages
+from app.bot.enums.enums import SeekDirection, BotMessageSlot
+from app.bot.handlers.sys_functions import (push_bot_message, set_bot_message, get_bot_message, pop_bot_message,
+                                            pop_bot_messages)
+from app.bot.broadcast.broadcast import Broadcaster
+from app.bot.scheduler.scheduler import DelayedScheduler
+from app.bot.messages.messages import delete_messages
 
 admin_tests_router = Router(name="admin_tests")
 
@@ -21,22 +25,20 @@ def _make_test_summary(test: dict) -> str:
 async def _make_full_test_text(conn: AsyncConnection, test_id: int) -> str:
     text_lines = []
 
-    test = await db_func.get_test(conn, test_id=test_id)
+    test = await db_func.get_test_bundle(conn, test_id=test_id)
     if not test:
         return "Не найден тест."
 
-    text_lines.append(f"Тест «{test['name']}»\n")
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if not questions:
+    text_lines.append(f"Тест «{test.name}»\n")
+    if not test.questions:
         text_lines.append("Вопросов ещё нет.")
         return "\n".join(text_lines)
 
-    for qi, q in enumerate(questions, start=1):
-        text_lines.append(f"{qi}. {q['text']}")
-        answers = await db_func.get_answers_by_question(conn, question_id=q['id']) or []
-        for ai, a in enumerate(answers, start=1):
-            mark = "✓" if a.get("is_right") else "✗"
-            text_lines.append(f"   {ai}) {a['text']} [{mark}]")
+    for qi, q in enumerate(test.questions, start=1):
+        text_lines.append(f"{qi}. {q.text}")
+        for ai, a in enumerate(q.answers, start=1):
+            mark = "✓" if a.is_right else "✗"
+            text_lines.append(f"   {ai}) {a.text} [{mark}]")
         text_lines.append("")
     return "\n".join(text_lines)
 
@@ -52,36 +54,32 @@ async def process_tests_edit(callback: CallbackQuery):
         await callback.message.answer("Выберите действие:", reply_markup=inline_keyboard)
 
 async def _init_draft(state: FSMContext, test_name: str):
-    await state.update_data(draft_test={"name": test_name, "questions": []},
-                            msg_instruction_id=None,
-                            last_sys_message_id=None)
+    await state.update_data(draft_test={"name": test_name, "questions": []})
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, None)
+    await set_bot_message(state, BotMessageSlot.SYSTEM, None)
 
-async def _clear_sys_messages(message_or_bot, chat_id: int, state_data: dict):
-    try:
-        msg_instruction_id = state_data.get("msg_instruction_id")
-        last_sys_message_id = state_data.get("last_sys_message_id")
-        if msg_instruction_id:
-            await message_or_bot.delete_message(chat_id=chat_id, message_id=msg_instruction_id)
-        if last_sys_message_id:
-            await message_or_bot.delete_message(chat_id=chat_id, message_id=last_sys_message_id)
-    except Exception:
-        logger.debug("Не удалось удалить одно из системных сообщений.", exc_info=True)
+async def _clear_sys_messages(bot, chat_id: int, state: FSMContext, *, include_tracked: bool = False):
+    message_ids = await pop_bot_messages(state, tracked=include_tracked)
+
+    if not await delete_messages(bot, chat_id, message_ids):
+        logger.debug("Не удалось удалить одно из системных сообщений.")
 
-async def _save_sys_message(state: FSMContext, message: Message, key: str = "last_sys_message_id"):
-    await state.update_data(**{key: message.message_id})
+async def _save_sys_message(state: FSMContext, message: Message, *, reset_instruction: bool = False):
+    await set_bot_message(state, BotMessageSlot.SYSTEM, message.message_id)
+    if reset_instruction:
+        await set_bot_message(state, BotMessageSlot.INSTRUCTION, None)
 
 async def _build_question_view_and_kb(conn: AsyncConnection, test_id: int, qnum: int):
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if qnum < 1 or qnum > len(questions):
-        return "Вопрос не найден.", InlineKeyboardMarkup(inline_keyboard=[]), None, []
+    q = await db_func.get_test_question(conn, test_id=test_id, number=qnum)
+    if not q:
+        return "Вопрос не найден.", InlineKeyboardMarkup(inline_keyboard=[]), None, ()
 
-    q = questions[qnum - 1]
-    answers = await db_func.get_answers_by_question(conn, question_id=q["id"]) or []
+    answers = q.answers
 
-    lines = [f"Вопрос #{qnum}: {q['text']}", "", "Варианты:"]
+    lines = [f"Вопрос #{qnum}: {q.text}", "", "Варианты:"]
     for ai, a in enumerate(answers, start=1):
-        mark = "✓" if a.get("is_right") else "✗"
-        lines.append(f"{ai}) {a['text']} [{mark}]")
+        mark = "✓" if a.is_right else "✗"
+        lines.append(f"{ai}) {a.text} [{mark}]")
 
     text = "\n".join(lines)
 
@@ -108,15 +106,14 @@ async def test_add_click(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await state.set_state(TestCreationStates.waiting_for_test_name)
     msg = await callback.message.answer("Введите название теста или отправьте 'Отмена' для отмены:")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, msg.message_id)
 
 
 @admin_tests_router.callback_query(F.data == "test_cancel_creation_click")
 async def test_cancel_creation_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
-    data = await state.get_data()
 
-    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, data)
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state, include_tracked=True)
     await state.clear()
     await callback.message.answer("Создание теста отменено.", reply_markup=keyb.admin_tests())
     await callback.answer()
@@ -127,8 +124,7 @@ async def handle_test_name(message: Message, state: FSMContext):
     text = (message.text or "").strip()
     if not text or text.lower() == "отмена":
 
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.clear()
         await message.answer("Создание теста отменено.", reply_markup=keyb.admin_tests())
         return
@@ -139,7 +135,7 @@ async def handle_test_name(message: Message, state: FSMContext):
 
     edit_kb = keyb.admin_test_edit()
     sys_msg = await message.answer(f"Тест: {text}\nДобавляйте вопросы.", reply_markup=edit_kb)
-    await _save_sys_message(state, sys_msg, key="last_sys_message_id")
+    await _save_sys_message(state, sys_msg)
     await state.set_state(TestCreationStates.editing_test)
 
 
@@ -147,7 +143,7 @@ async def handle_test_name(message: Message, state: FSMContext):
 async def test_add_question_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     msg = await callback.message.answer("Введите текст вопроса или 'Отмена':")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_question_text)
     await callback.answer()
 
@@ -155,8 +151,7 @@ async def test_add_question_click(callback: CallbackQuery, state: FSMContext):
 @admin_tests_router.callback_query(F.data == "test_cancel_question_click")
 async def test_cancel_question_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
-    data = await state.get_data()
-    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, data)
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state)
 
     edit_kb = keyb.admin_test_edit()
     try:
@@ -164,7 +159,6 @@ async def test_cancel_question_click(callback: CallbackQuery, state: FSMContext)
     except Exception:
         pass
     await state.set_state(TestCreationStates.editing_test)
-    await state.update_data(msg_instruction_id=None, last_sys_message_id=None)
     await callback.answer()
 
 
@@ -175,8 +169,7 @@ async def handle_question_text(message: Message, state: FSMContext):
         await message.answer("Текст вопроса не может быть пустым. Попробуйте снова или отправьте 'Отмена'.")
         return
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.set_state(TestCreationStates.editing_test)
         await message.answer("Ввод вопроса отменён.", reply_markup=keyb.admin_test_edit())
         return
@@ -191,7 +184,7 @@ async def handle_question_text(message: Message, state: FSMContext):
     await push_bot_message(message.message_id, state)
 
     sys_msg = await message.answer("Вопрос принят. Выберите действие:", reply_markup=keyb.admin_question_actions())
-    await state.update_data(last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+    await _save_sys_message(state, sys_msg, reset_instruction=True)
     await state.set_state(TestCreationStates.editing_test)
 
 
@@ -206,7 +199,7 @@ async def test_add_variant_click(callback: CallbackQuery, state: FSMContext):
         return
 
     msg = await callback.message.answer("Введите текст варианта ответа или 'Отмена':")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_variant_text)
     await callback.answer()
 
@@ -218,8 +211,7 @@ async def handle_variant_text(message: Message, state: FSMContext):
         await message.answer("Вариант не может быть пустым. Попробуйте снова или отправьте 'Отмена'.")
         return
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.set_state(TestCreationStates.editing_test)
         await message.answer("Добавление варианта отменено.", reply_markup=keyb.admin_question_actions())
         return
@@ -227,7 +219,7 @@ async def handle_variant_text(message: Message, state: FSMContext):
     await state.update_data(last_variant_text=text)
 
     sys_msg = await message.answer("Вариант — правильный ответ?", reply_markup=keyb.admin_variant_correct())
-    await state.update_data(msg_instruction_id=sys_msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, sys_msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_variant_confirm)
 
     await push_bot_message(message.message_id, state)
@@ -253,14 +245,13 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
     editing_question_idx = data.get("editing_question_idx")
 
     if editing_test_id is not None and editing_question_idx is not None:
-        questions = await db_func.get_questions_by_test(conn, test_id=editing_test_id) or []
-        if editing_question_idx < 0 or editing_question_idx >= len(questions):
+        q = await db_func.get_test_question(conn, test_id=editing_test_id, number=editing_question_idx + 1)
+        if not q:
             await callback.answer("Вопрос не найден.", show_alert=True)
             await state.set_state(TestCreationStates.editing_test)
             return
-        q = questions[editing_question_idx]
         try:
-            await db_func.add_answer(conn, question_id=q["id"], text=last_variant_text, is_right=bool(is_right))
+            await db_func.add_answer(conn, question_id=q.id, text=last_variant_text, is_right=bool(is_right))
         except Exception as e:
             logger.exception("Failed to add answer to DB: %s", e)
             await callback.answer("Ошибка при добавлении варианта.", show_alert=True)
@@ -268,7 +259,7 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
             return
 
         try:
-            msg_instruction_id = data.get("msg_instruction_id")
+            msg_instruction_id = await pop_bot_message(state, BotMessageSlot.INSTRUCTION)
             if msg_instruction_id:
                 await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=msg_instruction_id)
         except Exception:
@@ -278,7 +269,7 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
         qnum = editing_question_idx + 1
         text_out, kb, q, answers = await _build_question_view_and_kb(conn, test_id=test_id, qnum=qnum)
 
-        last_sys_message_id = data.get("last_sys_message_id") or callback.message.message_id
+        last_sys_message_id = await get_bot_message(state, BotMessageSlot.SYSTEM) or callback.message.message_id
         try:
             await callback.message.bot.edit_message_text(chat_id=callback.message.chat.id,
                                                         message_id=last_sys_message_id,
@@ -286,9 +277,9 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
                                                         reply_markup=kb)
         except Exception:
             new_msg = await callback.message.chat.send_message(text_out, reply_markup=kb)
-            await state.update_data(last_sys_message_id=new_msg.message_id)
+            await _save_sys_message(state, new_msg)
 
-        await state.update_data(last_variant_text=None, msg_instruction_id=None)
+        await state.update_data(last_variant_text=None)
         await state.set_state(TestCreationStates.editing_test)
         await callback.answer("Вариант добавлен.")
         return
@@ -302,14 +293,14 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
     await state.update_data(draft_test=draft, last_variant_text=None)
 
     try:
-        msg_instruction_id = data.get("msg_instruction_id")
+        msg_instruction_id = await pop_bot_message(state, BotMessageSlot.INSTRUCTION)
         if msg_instruction_id:
             await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=msg_instruction_id)
     except Exception:
         pass
 
     sys_msg = await callback.message.answer("Вариант добавлен.", reply_markup=keyb.admin_after_variant())
-    await state.update_data(last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+    await _save_sys_message(state, sys_msg, reset_instruction=True)
     await state.set_state(TestCreationStates.editing_test)
     await callback.answer()
 
@@ -320,7 +311,7 @@ async def _variant_correct_set_db(callback: CallbackQuery, state: FSMContext, co
 async def test_next_question_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     msg = await callback.message.answer("Введите текст следующего вопроса или 'Отмена':")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_question_text)
     await callback.answer()
 
@@ -366,7 +357,7 @@ async def test_delete_question(callback: CallbackQuery, state: FSMContext):
 
 
 @admin_tests_router.callback_query(F.data == "test_finish_click")
-async def test_finish_click(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection):
+async def test_finish_click(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection, broadcaster: Broadcaster):
     await callback.answer()
     data = await state.get_data()
     draft = data.get("draft_test")
@@ -397,7 +388,10 @@ async def test_finish_click(callback: CallbackQuery, state: FSMContext, conn: As
         except Exception:
             logger.exception("Ошибка при сохранении вопроса/вариантов в БД")
 
-    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, data)
+    await broadcaster.announce(conn, text=f"Добавлен новый тест: «{test_name}».",
+                               admin_chat_id=callback.message.chat.id)
+
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state, include_tracked=True)
     await state.clear()
 
     await callback.message.answer(f"Тест '{test_name}' успешно сохранён в базе.", reply_markup=keyb.admin_tests())
@@ -424,31 +418,21 @@ async def test_back_to_edit_click(callback: CallbackQuery, state: FSMContext):
     except Exception:
         pass
 
-    try:
-        msg_instruction_id = data.get("msg_instruction_id")
-        last_sys_message_id = data.get("last_sys_message_id")
-        if msg_instruction_id:
-            await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=msg_instruction_id)
-        if last_sys_message_id:
-            await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=last_sys_message_id)
-    except Exception:
-        pass
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state)
 
     try:
         edit_kb = keyb.admin_after_variant()
         sys_msg = await callback.message.answer(f"Редактирование теста: {draft.get('name', '')}", reply_markup=edit_kb)
-        await state.update_data(last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+        await _save_sys_message(state, sys_msg, reset_instruction=True)
     except Exception:
         await callback.message.answer("Возвращаемся к редактированию теста.")
-        await state.update_data(msg_instruction_id=None, last_sys_message_id=None)
 
     await state.set_state(TestCreationStates.editing_test)
 
 @admin_tests_router.callback_query(F.data == "test_cancel_creation_click")
 async def test_cancel_creation_click2(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
-    data = await state.get_data()
-    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, data)
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state)
     await state.clear()
     await callback.message.answer("Создание теста отменено.", reply_markup=keyb.admin_tests())
     await callback.answer()
@@ -467,20 +451,11 @@ async def process_cancel_tests_click(callback: CallbackQuery, state: FSMContext)
     except Exception:
         logger.exception("Failed to edit requests message back to admin menu.")
 
-async def _fetch_all_tests(conn: AsyncConnection) -> list[dict] | None:
-    async with conn.cursor() as cur:
-        data = await cur.execute("SELECT id, name, lecture_id FROM tests ORDER BY id;")
-        rows = await data.fetchall()
-        if not rows:
-            return None
-        cols = [d.name for d in cur.description]
-        return [dict(zip(cols, r)) for r in rows]
-
 @admin_tests_router.callback_query(F.data == "tests_select_click")
 async def tests_select_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    tests = await _fetch_all_tests(conn)
-    if not tests:
+    test = await db_func.seek_test(conn, direction=SeekDirection.FIRST)
+    if not test:
         try:
             await callback.message.edit_text("Тестов нет.")
         except Exception:
@@ -489,8 +464,6 @@ async def tests_select_click(callback: CallbackQuery, conn: AsyncConnection, sta
         await callback.answer()
         return
 
-    idx = 0
-    test = tests[idx]
     text = _make_test_summary(test)
 
 
@@ -502,26 +475,23 @@ async def tests_select_click(callback: CallbackQuery, conn: AsyncConnection, sta
         msg = await callback.message.answer(text, reply_markup=kb)
         await state.update_data(tests_message_id=msg.message_id)
 
-    await state.update_data(test_index=idx)
+    await state.update_data(test_cursor=test["id"])
     await callback.answer()
 
 
 @admin_tests_router.callback_query(F.data == "prev_test_click")
 async def prev_test_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    tests = await _fetch_all_tests(conn)
-    if not tests:
-        await callback.answer("Тестов нет.", show_alert=True)
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("test_index", 0) - 1
-    if idx < 0:
+    test = await db_func.seek_test(conn, current_id=data.get("test_cursor"), direction=SeekDirection.PREV)
+    if not test:
+        if not await db_func.count_tests(conn):
+            await callback.answer("Тестов нет.", show_alert=True)
+            await state.clear()
+            return
+
         await callback.answer("Это первый тест.")
         return
-
-    test = tests[idx]
     text = _make_test_summary(test)
     kb = keyb.admin_test_view_edit(test)
 
@@ -530,26 +500,23 @@ async def prev_test_click(callback: CallbackQuery, conn: AsyncConnection, state:
     except Exception:
         await callback.message.answer(text, reply_markup=kb)
 
-    await state.update_data(test_index=idx)
+    await state.update_data(test_cursor=test["id"])
     await callback.answer()
 
 
 @admin_tests_router.callback_query(F.data == "next_test_click")
 async def next_test_click(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
-    tests = await _fetch_all_tests(conn)
-    if not tests:
-        await callback.answer("Тестов нет.", show_alert=True)
-        await state.clear()
-        return
-
     data = await state.get_data()
-    idx = data.get("test_index", 0) + 1
-    if idx >= len(tests):
+    test = await db_func.seek_test(conn, current_id=data.get("test_cursor"), direction=SeekDirection.NEXT)
+    if not test:
+        if not await db_func.count_tests(conn):
+            await callback.answer("Тестов нет.", show_alert=True)
+            await state.clear()
+            return
+
         await callback.answer("Это последний тест.")
         return
-
-    test = tests[idx]
     text = _make_test_summary(test)
     kb = keyb.admin_test_view_edit(test)
     try:
@@ -557,7 +524,7 @@ async def next_test_click(callback: CallbackQuery, conn: AsyncConnection, state:
     except Exception:
         await callback.message.answer(text, reply_markup=kb)
 
-    await state.update_data(test_index=idx)
+    await state.update_data(test_cursor=test["id"])
     await callback.answer()
 
 
@@ -566,8 +533,7 @@ async def next_test_click(callback: CallbackQuery, conn: AsyncConnection, state:
 async def test_delete_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("test_index")
-    if idx is None:
+    if data.get("test_cursor") is None:
         await callback.answer("Нет выбранного теста.", show_alert=True)
         return
 
@@ -591,26 +557,18 @@ async def test_delete_confirm_no(callback: CallbackQuery):
 async def test_delete_confirm_yes(callback: CallbackQuery, conn: AsyncConnection, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    idx = data.get("test_index")
-    if idx is None:
+    cursor = data.get("test_cursor")
+    if cursor is None:
         await callback.answer("Нет выбранного теста.", show_alert=True)
         return
 
-    tests = await _fetch_all_tests(conn)
-    if not tests:
+    test = await db_func.seek_test(conn, current_id=cursor, direction=SeekDirection.NEAREST)
+    if not test:
         await callback.answer("Тестов нет.", show_alert=True)
         await state.clear()
         return
 
 
-    if idx < 0:
-        idx = 0
-    elif idx >= len(tests):
-        idx = len(tests) - 1
-
-    test = tests[idx]
-
-
     try:
         await db_func.delete_test(conn, test_id=test["id"])
         logger.info("Deleted test id=%s name=%s", test["id"], test["name"])
@@ -620,8 +578,8 @@ async def test_delete_confirm_yes(callback: CallbackQuery, conn: AsyncConnection
         return
 
 
-    new_tests = await _fetch_all_tests(conn)
-    if not new_tests:
+    next_test = await db_func.seek_test(conn, current_id=test["id"], direction=SeekDirection.NEAREST)
+    if not next_test:
 
         try:
             await callback.message.edit_text(f"Тест '{test['name']}' удалён.\nТестов больше нет.", reply_markup=keyb.admin_tests())
@@ -632,17 +590,13 @@ async def test_delete_confirm_yes(callback: CallbackQuery, conn: AsyncConnection
         return
 
 
-    if idx >= len(new_tests):
-        idx = len(new_tests) - 1
-
-    next_test = new_tests[idx]
     text = _make_test_summary(next_test)
     kb = keyb.admin_test_view_edit(next_test)
 
 
     try:
         await callback.message.edit_text(text, reply_markup=kb)
-        await state.update_data(test_index=idx)
+        await state.update_data(test_cursor=next_test["id"])
         await callback.answer("Тест удалён. Показан следующий.")
         return
     except TelegramBadRequest:
@@ -652,7 +606,7 @@ async def test_delete_confirm_yes(callback: CallbackQuery, conn: AsyncConnection
                 await callback.message.delete()
             except Exception:
                 logger.debug("Old test message not deleted.")
-            await state.update_data(test_index=idx, tests_message_id=new_msg.message_id)
+            await state.update_data(test_cursor=next_test["id"], tests_message_id=new_msg.message_id)
             await callback.answer("Тест удалён. Показан следующий.")
             return
         except Exception as e:
@@ -681,12 +635,8 @@ async def test_update_name_click(callback: CallbackQuery, state: FSMContext):
     if test_id is None:
         test_id = data.get("editing_test_id")
     if test_id is None:
-
-        idx = data.get("test_index")
-        if idx is not None:
-            tests = await _fetch_all_tests(callback.bot.session.get_connection()) if False else None
-
-
+        test_id = data.get("test_cursor")
+    if test_id is None:
         await callback.answer("Не определён тест для переименования.", show_alert=True)
         return
 
@@ -694,7 +644,7 @@ async def test_update_name_click(callback: CallbackQuery, state: FSMContext):
     await state.update_data(editing_test_id=test_id)
     await state.set_state(EditTestStates.waiting_for_name)
     instr = await callback.message.answer("Введите новое название теста или 'Отмена':")
-    await state.update_data(msg_instruction_id=instr.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, instr.message_id)
 
 
     try:
@@ -711,8 +661,7 @@ async def handle_test_new_name_edit(message: Message, state: FSMContext, conn: A
         return
 
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.clear()
         await message.answer("Переименование отменено.", reply_markup=keyb.admin_tests())
         return
@@ -734,7 +683,7 @@ async def handle_test_new_name_edit(message: Message, state: FSMContext, conn: A
         return
 
 
-    await _clear_sys_messages(message.bot, message.chat.id, data)
+    await _clear_sys_messages(message.bot, message.chat.id, state)
 
 
     try:
@@ -758,11 +707,11 @@ async def handle_test_new_name_edit(message: Message, state: FSMContext, conn: A
 
 
 @admin_tests_router.message(TestCreationStates.waiting_for_test_name)
-async def handle_test_name_message(message: Message, state: FSMContext, conn: AsyncConnection):
+async def handle_test_name_message(message: Message, state: FSMContext, conn: AsyncConnection,
+                                   scheduler: DelayedScheduler):
     text = (message.text or "").strip()
     if not text or text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.clear()
         await message.answer("Операция отменена.", reply_markup=keyb.admin_tests())
         return
@@ -771,7 +720,7 @@ async def handle_test_name_message(message: Message, state: FSMContext, conn: As
     editing_idx = data.get("editing_test_index")
 
     if editing_idx is not None:
-        tests = await _fetch_all_tests(conn)
+        tests = await db_func.get_tests(conn)
         if not tests or editing_idx < 0 or editing_idx >= len(tests):
             await message.answer("Не удалось найти тест для переименования.")
             await state.clear()
@@ -787,8 +736,7 @@ async def handle_test_name_message(message: Message, state: FSMContext, conn: As
             return
 
 
-        await asyncio.sleep(0.2)
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        scheduler.delete_later(message.chat.id, await pop_bot_messages(state, tracked=False), delay=0.2)
 
 
         updated_test = {"id": test["id"], "name": text}
@@ -822,10 +770,7 @@ async def test_edit_click(callback: CallbackQuery, state: FSMContext, conn: Asyn
 
     if test_id is None:
         data = await state.get_data()
-        idx = data.get("test_index")
-        tests = await _fetch_all_tests(conn)
-        if tests and idx is not None and 0 <= idx < len(tests):
-            test_id = tests[idx]["id"]
+        test_id = data.get("test_cursor")
 
     if test_id is None:
         await callback.answer("Не удалось определить тест.", show_alert=True)
@@ -839,7 +784,8 @@ async def test_edit_click(callback: CallbackQuery, state: FSMContext, conn: Asyn
         [InlineKeyboardButton(text="Отмена", callback_data="test_cancel_view_click")]
     ]))
 
-    await state.update_data(editing_test_id=test_id, last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+    await state.update_data(editing_test_id=test_id)
+    await _save_sys_message(state, sys_msg, reset_instruction=True)
     await state.set_state(TestCreationStates.waiting_for_question_number_to_edit)
     await callback.answer()
 
@@ -847,8 +793,7 @@ async def test_edit_click(callback: CallbackQuery, state: FSMContext, conn: Asyn
 @admin_tests_router.callback_query(F.data == "test_cancel_view_click")
 async def test_cancel_view_click(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
-    data = await state.get_data()
-    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, data)
+    await _clear_sys_messages(callback.message.bot, callback.message.chat.id, state)
     await state.set_state(TestCreationStates.editing_test)
 
 
@@ -859,8 +804,7 @@ async def handle_question_number_input(message: Message, state: FSMContext, conn
         await message.answer("Введите номер вопроса или 'Отмена'.")
         return
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.set_state(TestCreationStates.editing_test)
         await message.answer("Редактирование отменено.", reply_markup=keyb.admin_tests())
         return
@@ -888,7 +832,8 @@ async def handle_question_number_input(message: Message, state: FSMContext, conn
 
 
     sys_msg = await message.answer(text_out, reply_markup=kb)
-    await state.update_data(editing_question_idx=qnum - 1, last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+    await state.update_data(editing_question_idx=qnum - 1)
+    await _save_sys_message(state, sys_msg, reset_instruction=True)
     await state.set_state(TestCreationStates.editing_test)
 
 
@@ -906,19 +851,17 @@ async def test_delete_variant(callback: CallbackQuery, state: FSMContext, conn:
 
     data = await state.get_data()
     test_id = data.get("editing_test_id")
-    last_sys_message_id = data.get("last_sys_message_id')") if False else data.get("last_sys_message_id")
     if not test_id:
         await callback.answer("Тест не найден.", show_alert=True); return
 
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if qnum < 1 or qnum > len(questions): await callback.answer("Вопрос не найден.", show_alert=True); return
-    q = questions[qnum - 1]
-    answers = await db_func.get_answers_by_question(conn, question_id=q["id"]) or []
+    q = await db_func.get_test_question(conn, test_id=test_id, number=qnum)
+    if not q: await callback.answer("Вопрос не найден.", show_alert=True); return
+    answers = q.answers
     if anum < 1 or anum > len(answers): await callback.answer("Вариант не найден.", show_alert=True); return
 
     a = answers[anum - 1]
     try:
-        await db_func.delete_answer(conn, answer_id=a["id"])
+        await db_func.delete_answer(conn, answer_id=a.id)
     except Exception as e:
         logger.exception("Failed delete answer: %s", e)
         await callback.answer("Ошибка при удалении варианта.", show_alert=True)
@@ -926,7 +869,7 @@ async def test_delete_variant(callback: CallbackQuery, state: FSMContext, conn:
 
 
     text_out, kb, q, answers = await _build_question_view_and_kb(conn, test_id=test_id, qnum=qnum)
-    edit_msg_id = data.get("last_sys_message_id") or callback.message.message_id
+    edit_msg_id = await get_bot_message(state, BotMessageSlot.SYSTEM) or callback.message.message_id
     try:
         await callback.message.bot.edit_message_text(chat_id=callback.message.chat.id,
                                                     message_id=edit_msg_id,
@@ -935,7 +878,7 @@ async def test_delete_variant(callback: CallbackQuery, state: FSMContext, conn:
     except Exception:
 
         new_msg = await callback.message.chat.send_message(text_out, reply_markup=kb)
-        await state.update_data(last_sys_message_id=new_msg.message_id)
+        await _save_sys_message(state, new_msg)
     await callback.answer("Вариант удалён.")
 
 
@@ -953,23 +896,22 @@ async def test_toggle_variant(callback: CallbackQuery, state: FSMContext, conn:
     if not test_id:
         await callback.answer("Тест не найден.", show_alert=True); return
 
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if qnum < 1 or qnum > len(questions): await callback.answer("Вопрос не найден.", show_alert=True); return
-    q = questions[qnum - 1]
-    answers = await db_func.get_answers_by_question(conn, question_id=q["id"]) or []
+    q = await db_func.get_test_question(conn, test_id=test_id, number=qnum)
+    if not q: await callback.answer("Вопрос не найден.", show_alert=True); return
+    answers = q.answers
     if anum < 1 or anum > len(answers): await callback.answer("Вариант не найден.", show_alert=True); return
 
     a = answers[anum - 1]
-    new_flag = not bool(a.get("is_right"))
+    new_flag = not a.is_right
     try:
-        await db_func.update_answer(conn, answer_id=a["id"], is_right=new_flag)
+        await db_func.update_answer(conn, answer_id=a.id, is_right=new_flag)
     except Exception as e:
         logger.exception("Failed toggle answer correctness: %s", e)
         await callback.answer("Ошибка при переключении корректности.", show_alert=True); return
 
 
     text_out, kb, q, answers = await _build_question_view_and_kb(conn, test_id=test_id, qnum=qnum)
-    edit_msg_id = data.get("last_sys_message_id") or callback.message.message_id
+    edit_msg_id = await get_bot_message(state, BotMessageSlot.SYSTEM) or callback.message.message_id
     try:
         await callback.message.bot.edit_message_text(chat_id=callback.message.chat.id,
                                                     message_id=edit_msg_id,
@@ -977,7 +919,7 @@ async def test_toggle_variant(callback: CallbackQuery, state: FSMContext, conn:
                                                     reply_markup=kb)
     except Exception:
         new_msg = await callback.message.chat.send_message(text_out, reply_markup=kb)
-        await state.update_data(last_sys_message_id=new_msg.message_id)
+        await _save_sys_message(state, new_msg)
 
     await callback.answer(f"Вариант #{anum} теперь {'правильный' if new_flag else 'неправильный'}.")
 
@@ -1003,7 +945,7 @@ async def test_edit_variant_click(callback: CallbackQuery, state: FSMContext, co
 
     await state.update_data(editing_question_idx=qnum - 1, editing_variant_idx=anum - 1)
     instr = await callback.message.answer("Введите новый текст варианта или 'Отмена':")
-    await state.update_data(msg_instruction_id=instr.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, instr.message_id)
 
     await state.set_state(TestCreationStates.waiting_for_variant_new_text)
     await callback.answer()
@@ -1016,8 +958,7 @@ async def handle_variant_new_text(message: Message, state: FSMContext, conn: Asy
         await message.answer("Текст варианта не может быть пустым. Попробуйте снова или отправьте 'Отмена'.")
         return
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
 
         data = await state.get_data()
         test_id = data.get("editing_test_id")
@@ -1025,7 +966,7 @@ async def handle_variant_new_text(message: Message, state: FSMContext, conn: Asy
         if test_id is not None and qidx is not None:
             text_out, kb, q, answers = await _build_question_view_and_kb(conn, test_id=test_id, qnum=qidx+1)
             sys_msg = await message.answer(text_out, reply_markup=kb)
-            await state.update_data(last_sys_message_id=sys_msg.message_id, msg_instruction_id=None)
+            await _save_sys_message(state, sys_msg, reset_instruction=True)
             await state.set_state(TestCreationStates.editing_test)
             return
         await state.set_state(TestCreationStates.editing_test)
@@ -1042,13 +983,12 @@ async def handle_variant_new_text(message: Message, state: FSMContext, conn: Asy
         return
 
 
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if qidx < 0 or qidx >= len(questions):
+    q = await db_func.get_test_question(conn, test_id=test_id, number=qidx + 1)
+    if not q:
         await message.answer("Вопрос не найден.")
         await state.clear()
         return
-    q = questions[qidx]
-    answers = await db_func.get_answers_by_question(conn, question_id=q["id"]) or []
+    answers = q.answers
     if vidx < 0 or vidx >= len(answers):
         await message.answer("Вариант не найден.")
         await state.clear()
@@ -1057,7 +997,7 @@ async def handle_variant_new_text(message: Message, state: FSMContext, conn: Asy
 
 
     try:
-        await db_func.update_answer(conn, answer_id=answer_row["id"], text=text)
+        await db_func.update_answer(conn, answer_id=answer_row.id, text=text)
     except Exception as exc:
         logger.exception("Ошибка при обновлении варианта: %s", exc)
         await message.answer("Не удалось обновить вариант. Попробуйте позже.")
@@ -1065,25 +1005,24 @@ async def handle_variant_new_text(message: Message, state: FSMContext, conn: Asy
         return
 
 
-    data = await state.get_data()
-    await _clear_sys_messages(message.bot, message.chat.id, data)
+    await delete_messages(message.bot, message.chat.id, [await pop_bot_message(state, BotMessageSlot.INSTRUCTION)])
 
 
     text_out, kb, q, answers = await _build_question_view_and_kb(conn, test_id=test_id, qnum=qidx+1)
-    edit_msg_id = data.get("last_sys_message_id")
+    edit_msg_id = await get_bot_message(state, BotMessageSlot.SYSTEM)
     try:
         if edit_msg_id:
             await message.bot.edit_message_text(chat_id=message.chat.id, message_id=edit_msg_id, text=text_out, reply_markup=kb)
         else:
             new_msg = await message.answer(text_out, reply_markup=kb)
-            await state.update_data(last_sys_message_id=new_msg.message_id)
+            await _save_sys_message(state, new_msg)
     except Exception:
 
         new_msg = await message.answer(text_out, reply_markup=kb)
-        await state.update_data(last_sys_message_id=new_msg.message_id)
+        await _save_sys_message(state, new_msg)
 
 
-    await state.update_data(editing_variant_idx=None, msg_instruction_id=None)
+    await state.update_data(editing_variant_idx=None)
     await state.set_state(TestCreationStates.editing_test)
 
 
@@ -1105,7 +1044,7 @@ async def test_add_variant_in_question(callback: CallbackQuery, state: FSMContex
 
     await state.update_data(editing_question_idx=qnum - 1)
     msg = await callback.message.answer("Введите текст варианта ответа или отправьте 'Отмена':")
-    await state.update_data(msg_instruction_id=msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_variant_text)
     await callback.answer()
 
@@ -1116,8 +1055,7 @@ async def handle_variant_text(message: Message, state: FSMContext, conn: AsyncCo
         await message.answer("Вариант не может быть пустым. Попробуйте снова или отправьте 'Отмена'.")
         return
     if text.lower() == "отмена":
-        data = await state.get_data()
-        await _clear_sys_messages(message.bot, message.chat.id, data)
+        await _clear_sys_messages(message.bot, message.chat.id, state)
         await state.set_state(TestCreationStates.editing_test)
         await message.answer("Добавление варианта отменено.", reply_markup=keyb.admin_question_actions())
         return
@@ -1132,7 +1070,7 @@ async def handle_variant_text(message: Message, state: FSMContext, conn: AsyncCo
 
 
     sys_msg = await message.answer("Вариант — правильный ответ?", reply_markup=keyb.admin_variant_correct())
-    await state.update_data(msg_instruction_id=sys_msg.message_id)
+    await set_bot_message(state, BotMessageSlot.INSTRUCTION, sys_msg.message_id)
     await state.set_state(TestCreationStates.waiting_for_variant_confirm)
 
     try:
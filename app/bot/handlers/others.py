@@ -10,7 +10,7 @@ import app.infrastructure.database.db as db_func
 import app.bot.keyboards.keyboards as keyb
 from app.bot.states.states import FSM_Wait
 
-others_router = Router()
+others_router = Router(name="others")
 
 async def start_registration(message: Message, state: FSMContext):
     await message.answer("Начинаем! Введите ваше имя:")
@@ -1,34 +1,53 @@
 import logging
-from typing import List
 
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
+from app.bot.enums.enums import BotMessageSlot
+from app.bot.messages.messages import BOT_MESSAGES_KEY, MessageRegistry, delete_messages
+from app.bot.scheduler.scheduler import DELETE_DELAY, DelayedScheduler
+
 logger = logging.getLogger(__name__)
 
-async def push_bot_message(message_id: int, state: FSMContext):
-    data = await state.get_data()
-    bot_messages: List[int] = data.get("bot_messages", [])
+async def _load_registry(state: FSMContext) -> MessageRegistry:
+    return MessageRegistry.load(await state.get_value(BOT_MESSAGES_KEY))
 
-    bot_messages.append(message_id)
+async def _save_registry(state: FSMContext, registry: MessageRegistry) -> None:
+    await state.update_data({BOT_MESSAGES_KEY: registry.dump()})
 
-    await state.update_data(bot_messages=bot_messages)
+async def push_bot_message(message_id: int, state: FSMContext):
+    registry = await _load_registry(state)
+    registry.track(message_id)
+    await _save_registry(state, registry)
+
+async def set_bot_message(state: FSMContext, slot: BotMessageSlot, message_id: int | None):
+    registry = await _load_registry(state)
+    registry.set(slot, message_id)
+    await _save_registry(state, registry)
+
+async def get_bot_message(state: FSMContext, slot: BotMessageSlot) -> int | None:
+    return (await _load_registry(state)).get(slot)
+
+async def pop_bot_message(state: FSMContext, slot: BotMessageSlot) -> int | None:
+    registry = await _load_registry(state)
+    message_id = registry.pop(slot)
+    await _save_registry(state, registry)
+    return message_id
+
+async def pop_bot_messages(state: FSMContext, *, tracked: bool = True) -> list[int]:
+    """Забирает из реестра сообщения слотов и, если tracked, все отслеживаемые сообщения."""
+    registry = await _load_registry(state)
+    message_ids = registry.pop_all(tracked=tracked)
+    await _save_registry(state, registry)
+    return message_ids
 
 async def clear_bot_messages(message: Message, state: FSMContext) -> bool:
-    data = await state.get_data()
-    bot_messages: List = data.get("bot_messages")
+    message_ids = await pop_bot_messages(state)
 
-    if not bot_messages:
+    if not message_ids:
         return False
 
-    for message_id in reversed(bot_messages):
-        try:
-            await message.bot.delete_message(chat_id=message.chat.id, message_id=message_id)
-        except TelegramBadRequest:
-            logger.exception("Failed to delete message in clear_bot_messages")
-            return False
-
-    await state.update_data(bot_messages=[])
+    return await delete_messages(message.bot, message.chat.id, message_ids)
 
-    return True
\ No newline at end of file
+async def clear_bot_messages_later(state: FSMContext, scheduler: DelayedScheduler, delay: float = DELETE_DELAY) -> None:
+    scheduler.delete_later(state.key.chat_id, await pop_bot_messages(state), delay)
@@ -1,10 +1,16 @@
 # labs.py
 import logging
+from datetime import datetime, timezone
+
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 from psycopg import AsyncConnection
 
 import app.infrastructure.database.db as db_func
+from app.bot.enums.enums import FileType
+from app.bot.states.states import SubmitLabStates
+from app.bot.submissions.submissions import CLOUD_DOWNLOAD_LIMIT, SubmissionDownloader, exceeds_download_limit
 
 logger = logging.getLogger(__name__)
 user_labs_router = Router(name="user_labs")
@@ -24,9 +30,12 @@ async def show_labs_cmd(message: Message, conn: AsyncConnection):
 
     kb_rows = []
     for lab in labs:
-        kb_rows.append([InlineKeyboardButton(text=f"{lab['name']}", callback_data=f"download_lab:{lab['id']}\n")])
+        kb_rows.append([
+            InlineKeyboardButton(text=f"{lab['name']}", callback_data=f"download_lab:{lab['id']}\n"),
+            InlineKeyboardButton(text="Сдать", callback_data=f"submit_lab:{lab['id']}")
+        ])
     kb = InlineKeyboardMarkup(inline_keyboard=kb_rows)
-    await message.answer("Нажмите кнопку, чтобы скачать лабораторную:", reply_markup=kb)
+    await message.answer("Нажмите кнопку, чтобы скачать или сдать лабораторную:", reply_markup=kb)
 
 
 @user_labs_router.callback_query(F.data.startswith("download_lab:"))
@@ -38,14 +47,12 @@ async def download_lab_cb(callback: CallbackQuery, conn: AsyncConnection):
         await callback.answer("Неправильный идентификатор.", show_alert=True)
         return
 
-    lab = await db_func.get_lab_work(conn, lab_id=lab_id)
-    if not lab:
+    l = await db_func.get_lab_work_with_file(conn, lab_id=lab_id)
+    if not l:
         await callback.answer("Лабораторная не найдена.", show_alert=True)
         return
 
-    labs = await db_func.get_lab_works_with_file_ids(conn)
-    l = next((x for x in (labs or []) if x["id"] == lab_id), None)
-    if not l or not l.get("telegram_file_id"):
+    if not l.get("telegram_file_id"):
         await callback.answer("Файл лабораторной отсутствует.", show_alert=True)
         return
 
@@ -54,3 +61,83 @@ async def download_lab_cb(callback: CallbackQuery, conn: AsyncConnection):
     except Exception as e:
         logger.exception("Failed to send lab document: %s", e)
         await callback.answer("Не получилось отправить файл.", show_alert=True)
+
+
+@user_labs_router.callback_query(F.data.startswith("submit_lab:"))
+async def submit_lab_cb(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    try:
+        lab_id = int(callback.data.split(":", 1)[1])
+    except Exception:
+        await callback.answer("Неправильный идентификатор.", show_alert=True)
+        return
+
+    await state.set_state(SubmitLabStates.waiting_for_file)
+    await state.update_data(submit_lab_id=lab_id)
+    await callback.message.answer("Отправьте файл с выполненной работой одним документом.")
+
+
+@user_labs_router.message(SubmitLabStates.waiting_for_file, F.document)
+async def handle_submission_file(message: Message, state: FSMContext, conn: AsyncConnection,
+                                 submission_downloader: SubmissionDownloader):
+    data = await state.get_data()
+    lab_id = data.get("submit_lab_id")
+
+    user = await db_func.get_user_identity(conn, telegram_id=message.from_user.id)
+    if not user:
+        await message.answer("Вы не зарегистрированы.")
+        await state.clear()
+        return
+
+    lab = await db_func.get_lab_work_with_file(conn, lab_id=lab_id) if lab_id is not None else None
+    if not lab:
+        await message.answer("Лабораторная не найдена.")
+        await state.clear()
+        return
+
+    # Закрытую лабораторную отклоняем до записи файла, чтобы не оставлять в files сироту.
+    if lab["deadline"] is not None and lab["allow_late"] is False and datetime.now(timezone.utc) > lab["deadline"]:
+        await message.answer(f"Срок сдачи лабораторной «{lab['name']}» истёк.")
+        await state.clear()
+        return
+
+    document = message.document
+    if exceeds_download_limit(message.bot, document.file_size):
+        await message.answer(f"Файл слишком большой: бот принимает работы до {CLOUD_DOWNLOAD_LIMIT // (1024 * 1024)} МБ. Пришлите файл поменьше.")
+        return
+
+    stored = await db_func.upsert_file(
+        conn,
+        file_type=FileType.SUBMISSION,
+        telegram_file_id=document.file_id,
+        file_unique_id=document.file_unique_id,
+        file_size=document.file_size,
+        mime_type=document.mime_type
+    )
+    if stored is None:
+        await message.answer("Ошибка при сохранении файла. Попробуйте ещё раз.")
+        return
+
+    submission = await db_func.add_submission(conn, user_id=user.id, lab_id=lab["id"],
+                                              submission_file_id=stored["id"])
+    if submission is None:
+        await message.answer(f"Срок сдачи лабораторной «{lab['name']}» истёк.")
+        await state.clear()
+        return
+
+    if stored["sha256"] is None:
+        submission_downloader.enqueue(conn, {
+            "id": stored["id"],
+            "telegram_file_id": document.file_id,
+            "file_unique_id": document.file_unique_id,
+            "file_size": document.file_size
+        })
+
+    late_note = " Работа сдана после срока." if submission["is_late"] else ""
+    await message.answer(f"Работа по лабораторной «{lab['name']}» принята.{late_note}")
+    await state.clear()
+
+
+@user_labs_router.message(SubmitLabStates.waiting_for_file)
+async def handle_submission_not_document(message: Message):
+    await message.answer("Отправьте работу файлом (документом).")
@@ -45,14 +45,12 @@ async def download_lecture_cb(callback: CallbackQuery, conn: AsyncConnection):
         await callback.answer("Неправильный идентификатор.", show_alert=True)
         return
 
-    lecture = await db_func.get_lecture(conn, lecture_id=lecture_id)
-    if not lecture:
+    lec = await db_func.get_lecture_with_file(conn, lecture_id=lecture_id)
+    if not lec:
         await callback.answer("Лекция не найдена.", show_alert=True)
         return
 
-    lectures = await db_func.get_lectures_with_file_ids(conn)
-    lec = next((l for l in (lectures or []) if l["id"] == lecture_id), None)
-    if not lec or not lec.get("telegram_file_id"):
+    if not lec.get("telegram_file_id"):
         await callback.answer("Файл лекции отсутствует.", show_alert=True)
         return
 
@@ -1,5 +1,8 @@
 
 import logging
+from datetime import datetime, timezone
+from typing import Any
+
 from aiogram import Router, F
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
@@ -7,6 +10,8 @@ from aiogram.fsm.context import FSMContext
 from psycopg import AsyncConnection
 
 import app.infrastructure.database.db as db_func
+from app.bot.attempts.attempts import AttemptAnswer, AttemptAnswerBuffer
+from app.infrastructure.cache.tests import QuestionView, TestBundle
 
 logger = logging.getLogger(__name__)
 user_tests_router = Router(name="user_tests")
@@ -16,27 +21,46 @@ class TestRunStates(StatesGroup):
     running = State()
 
 
-async def _build_question_kb(conn: AsyncConnection, question_id: int) -> InlineKeyboardMarkup:
-    answers = await db_func.get_answers_by_question(conn, question_id=question_id) or []
+def _build_question_kb(question: QuestionView) -> InlineKeyboardMarkup:
     kb_rows = []
-    for a in answers:
-        cb = InlineKeyboardButton(text=a["text"], callback_data=f"answer:{question_id}:{a['id']}")
+    for a in question.answers:
+        cb = InlineKeyboardButton(text=a.text, callback_data=f"answer:{question.id}:{a.id}")
         kb_rows.append([cb])
     return InlineKeyboardMarkup(inline_keyboard=kb_rows)
 
 
+async def _restore_run(
+        conn: AsyncConnection,
+        attempt_buffer: AttemptAnswerBuffer,
+        bundle: TestBundle,
+        attempt: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Восстанавливает состояние прохождения теста из attempts/attempt_answers,
+    например после перезапуска бота. Ещё не записанные ответы попытки сохраняются сразу.
+    """
+    pending = await attempt_buffer.drain_attempt(attempt["id"], conn)
+    await db_func.add_attempt_answers(conn, answers=pending)
+
+    answered = set(attempt["answered_question_ids"]) | {a.question_id for a in pending}
+    score = attempt["score"] + sum(a.is_right for a in pending)
+
+    done = [q.id for q in bundle.questions if q.id in answered]
+    left = [q.id for q in bundle.questions if q.id not in answered]
+
+    return {
+        "attempt_id": attempt["id"],
+        "test_id": bundle.id,
+        "questions": done + left,
+        "cur_idx": len(done),
+        "score": score,
+        "total": len(done) + len(left)
+    }
+
+
 @user_tests_router.message(F.text == "Тесты")
 async def show_tests_cmd(message: Message, conn: AsyncConnection):
-    async def _fetch_all():
-        async with conn.cursor() as c:
-            data = await c.execute("SELECT id, name, lecture_id FROM tests ORDER BY id;")
-            rows = await data.fetchall()
-            if not rows:
-                return []
-            cols = [d.name for d in c.description]
-            return [dict(zip(cols, r)) for r in rows]
-
-    tests = await _fetch_all()
+    tests = await db_func.get_tests(conn)
     if not tests:
         await message.answer("Тестов нет.")
         return
@@ -53,7 +77,8 @@ async def show_tests_cmd(message: Message, conn: AsyncConnection):
 
 
 @user_tests_router.callback_query(F.data.startswith("start_test:"))
-async def start_test_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection):
+async def start_test_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection,
+                        attempt_buffer: AttemptAnswerBuffer):
     await callback.answer()
     try:
         test_id = int(callback.data.split(":", 1)[1])
@@ -61,36 +86,78 @@ async def start_test_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncC
         await callback.answer("Неправильный идентификатор теста.", show_alert=True)
         return
 
-    test = await db_func.get_test(conn, test_id=test_id)
-    if not test:
+    user = await db_func.get_user_identity(conn, telegram_id=callback.from_user.id)
+    if not user:
+        await callback.answer("Вы не зарегистрированы.", show_alert=True)
+        return
+
+    bundle = await db_func.get_test_bundle(conn, test_id=test_id)
+    if not bundle:
         await callback.answer("Тест не найден.", show_alert=True)
         return
 
-    questions = await db_func.get_questions_by_test(conn, test_id=test_id) or []
-    if not questions:
+    if not bundle.questions:
         await callback.answer("В этом тесте нет вопросов.", show_alert=True)
         return
 
-    await state.update_data(test_run={
-        "test_id": test_id,
-        "questions": [q["id"] for q in questions],
-        "cur_idx": 0,
-        "score": 0,
-        "total": len(questions)
-    })
-
-    qid = questions[0]["id"]
-    q = questions[0]
-    text = f"Вопрос 1/{len(questions)}:\n{q['text']}"
-    kb = await _build_question_kb(conn, question_id=qid)
+    await db_func.add_attempt(conn, user_id=user.id, test_id=test_id)
+    attempt = await db_func.get_active_attempt(conn, user_id=user.id, test_id=test_id)
+    if not attempt:
+        await callback.answer("Не удалось начать тест. Попробуйте ещё раз.", show_alert=True)
+        return
+
+    run = await _restore_run(conn, attempt_buffer, bundle, attempt)
+    await state.update_data(test_run=run)
+
+    if run["cur_idx"] >= run["total"]:
+        await _finish_run(callback, state, conn, attempt_buffer, run)
+        return
+
+    if run["cur_idx"]:
+        await callback.message.answer("Продолжаем незавершённую попытку.")
+
+    q = bundle.by_question_id[run["questions"][run["cur_idx"]]]
+    qid = q.id
+    text = f"Вопрос {run['cur_idx']+1}/{run['total']}:\n{q.text}"
+    kb = _build_question_kb(q)
     await state.set_state(TestRunStates.running)
     msg = await callback.message.answer(text, reply_markup=kb)
     await state.update_data(test_msg_id=msg.message_id)
     await state.update_data(last_question_id=qid)
 
 
+async def _finish_run(
+        callback: CallbackQuery,
+        state: FSMContext,
+        conn: AsyncConnection,
+        attempt_buffer: AttemptAnswerBuffer,
+        run: dict[str, Any]
+) -> None:
+    pending = await attempt_buffer.drain_attempt(run["attempt_id"], conn)
+    await db_func.add_attempt_answers(conn, answers=pending)
+
+    score = await db_func.finish_attempt(conn, attempt_id=run["attempt_id"])
+    if score is None:
+        score = run.get("score", 0)
+    total = run.get("total", 0)
+    pct = (score / total * 100) if total else 0
+
+    data = await state.get_data()
+    try:
+        msg_id = data.get("test_msg_id")
+        if msg_id:
+            await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=msg_id)
+    except Exception:
+        pass
+
+    await callback.message.answer(f"Тест завершён.\nРезультат: {score}/{total} ({pct:.1f}%)")
+
+    await state.clear()
+
+
 @user_tests_router.callback_query(F.data.startswith("answer:"))
-async def answer_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection):
+async def answer_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConnection,
+                    attempt_buffer: AttemptAnswerBuffer):
     await callback.answer()
     try:
         _, payload = callback.data.split(":", 1)
@@ -102,10 +169,20 @@ async def answer_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConne
 
     data = await state.get_data()
     run = data.get("test_run")
+    bundle = None
     if not run:
-        await callback.answer("Тест не найден в сессии. Запустите тест снова.", show_alert=True)
-        await state.clear()
-        return
+        user = await db_func.get_user_identity(conn, telegram_id=callback.from_user.id)
+        attempt = await db_func.get_active_attempt(conn, user_id=user.id) if user else None
+        bundle = await db_func.get_test_bundle(conn, test_id=attempt["test_id"]) if attempt else None
+        if not bundle:
+            await callback.answer("Тест не найден в сессии. Запустите тест снова.", show_alert=True)
+            await state.clear()
+            return
+
+        run = await _restore_run(conn, attempt_buffer, bundle, attempt)
+        await state.set_state(TestRunStates.running)
+        await state.update_data(test_run=run, test_msg_id=callback.message.message_id)
+        data = await state.get_data()
 
     cur_q_idx = run.get("cur_idx", 0)
     questions_ids = run.get("questions", [])
@@ -114,24 +191,44 @@ async def answer_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConne
         await callback.answer("Этот вариант уже не актуален.", show_alert=False)
         return
 
-    answers = await db_func.get_answers_by_question(conn, question_id=question_id) or []
-    a = next((x for x in answers if x["id"] == answer_id), None)
+    if bundle is None:
+        bundle = await db_func.get_test_bundle(conn, test_id=run["test_id"])
+    question = bundle.by_question_id.get(question_id) if bundle else None
+    if not question:
+        await callback.answer("Тест был изменён. Запустите тест снова.", show_alert=True)
+        await state.clear()
+        return
+
+    a = question.get_answer(answer_id)
     if not a:
         await callback.answer("Вариант не найден.", show_alert=True)
         return
 
-    is_right = bool(a.get("is_right"))
+    is_right = a.is_right
     if is_right:
         run["score"] = run.get("score", 0) + 1
 
+    attempt_buffer.add(AttemptAnswer(
+        attempt_id=run["attempt_id"],
+        question_id=question.id,
+        answer_id=a.id,
+        is_right=is_right,
+        answered_at=datetime.now(timezone.utc)
+    ))
+
     run["cur_idx"] = cur_q_idx + 1
     await state.update_data(test_run=run)
 
     if run["cur_idx"] < run["total"]:
         next_qid = run["questions"][run["cur_idx"]]
-        q = await db_func.get_question(conn, question_id=next_qid)
-        text = f"Вопрос {run['cur_idx']+1}/{run['total']}:\n{q['text']}"
-        kb = await _build_question_kb(conn, question_id=next_qid)
+        q = bundle.by_question_id.get(next_qid)
+        if not q:
+            await callback.answer("Тест был изменён. Запустите тест снова.", show_alert=True)
+            await state.clear()
+            return
+
+        text = f"Вопрос {run['cur_idx']+1}/{run['total']}:\n{q.text}"
+        kb = _build_question_kb(q)
 
         try:
             msg_id = data.get("test_msg_id")
@@ -148,24 +245,4 @@ async def answer_cb(callback: CallbackQuery, state: FSMContext, conn: AsyncConne
             await state.update_data(test_msg_id=new_msg.message_id)
         return
 
-    score = run.get("score", 0)
-    total = run.get("total", 0)
-    pct = (score / total * 100) if total else 0
-
-    try:
-
-        await db_func.add_or_update_test_stat(conn, user_id=callback.from_user.id, test_id=run["test_id"],
-                                             last_score=score, last_submission_time=None, attempts_count=None)
-    except Exception:
-        logger.exception("Не удалось обновить статистику теста.")
-
-    try:
-        msg_id = data.get("test_msg_id")
-        if msg_id:
-            await callback.message.bot.delete_message(chat_id=callback.message.chat.id, message_id=msg_id)
-    except Exception:
-        pass
-
-    await callback.message.answer(f"Тест завершён.\nРезультат: {score}/{total} ({pct:.1f}%)")
-
-    await state.clear()
+    await _finish_run(callback, state, conn, attempt_buffer, run)
@@ -12,4 +12,4 @@ from psycopg.connection_async import AsyncConnection
 
 logger = logging.getLogger(__name__)
 
-user_main_router = Router()
+user_main_router = Router(name="user_main")
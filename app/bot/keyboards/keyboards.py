@@ -85,9 +85,11 @@ def admin_lab_select() -> InlineKeyboardMarkup:
     button_4 = InlineKeyboardButton(text="Изменить описание", callback_data="lab_update_description_click")
     button_5 = InlineKeyboardButton(text="⏮ Пред", callback_data="prev_lab_click")
     button_6 = InlineKeyboardButton(text="След ⏭", callback_data="next_lab_click")
+    button_7 = InlineKeyboardButton(text="Выгрузить сдачи", callback_data="lab_export_click")
     button_cancel = InlineKeyboardButton(text="Назад", callback_data="cancel_labs_select_click")
 
-    return InlineKeyboardMarkup(inline_keyboard=[[button_1], [button_2], [button_3], [button_4], [button_5, button_6], [button_cancel]])
+    return InlineKeyboardMarkup(inline_keyboard=[[button_1], [button_2], [button_3], [button_4], [button_7],
+                                                 [button_5, button_6], [button_cancel]])
 
 def admin_tests() -> InlineKeyboardMarkup:
     button_1 = InlineKeyboardButton(text="Выбор тестов", callback_data="tests_select_click")
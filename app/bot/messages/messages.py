@@ -0,0 +1,108 @@
+import logging
+import time
+from typing import Any, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from app.bot.enums.enums import BotMessageSlot
+
+logger = logging.getLogger(__name__)
+
+DELETE_MESSAGES_LIMIT = 100
+# Бот может удалять сообщения в личных чатах только в течение 48 часов.
+MESSAGE_TTL = 47 * 60 * 60.0
+MESSAGES_PER_CHAT = 200
+# Ключ в данных FSM, под которым хранится реестр сообщений чата.
+BOT_MESSAGES_KEY = "bot_messages"
+
+
+class MessageRegistry:
+    """
+    Реестр временных сообщений одного чата (инструкции, подтверждения, ответы пользователя
+    в диалогах), которые нужно удалить по завершении сценария. Хранится в данных FSM,
+    поэтому переживает перезапуск и общий для всех воркеров. Кроме общего списка есть
+    именованные слоты (BotMessageSlot) для сообщений, которые сценарий редактирует
+    или удаляет по отдельности. Ограничен по числу сообщений и по времени жизни записи.
+    """
+
+    def __init__(self, ttl: float = MESSAGE_TTL, per_chat: int = MESSAGES_PER_CHAT):
+        self.ttl = ttl
+        self.per_chat = per_chat
+        self._tracked: dict[int, float] = {}
+        self._slots: dict[str, tuple[int, float]] = {}
+
+    @classmethod
+    def load(cls, raw: dict[str, Any] | None, **kwargs: Any) -> "MessageRegistry":
+        registry = cls(**kwargs)
+        if not raw:
+            return registry
+
+        deadline = time.time() - registry.ttl
+        for message_id, tracked_at in raw.get("tracked", ()):
+            if tracked_at >= deadline:
+                registry._tracked[message_id] = tracked_at
+        for slot, (message_id, tracked_at) in raw.get("slots", {}).items():
+            if tracked_at >= deadline:
+                registry._slots[slot] = (message_id, tracked_at)
+        return registry
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "tracked": [[message_id, tracked_at] for message_id, tracked_at in self._tracked.items()],
+            "slots": {slot: [message_id, tracked_at] for slot, (message_id, tracked_at) in self._slots.items()},
+        }
+
+    def track(self, *message_ids: int | None) -> None:
+        now = time.time()
+        for message_id in message_ids:
+            if message_id is not None:
+                self._tracked.pop(message_id, None)
+                self._tracked[message_id] = now
+
+        while len(self._tracked) > self.per_chat:
+            del self._tracked[next(iter(self._tracked))]
+
+    def set(self, slot: BotMessageSlot, message_id: int | None) -> None:
+        if message_id is None:
+            self._slots.pop(slot.value, None)
+        else:
+            self._slots[slot.value] = (message_id, time.time())
+
+    def get(self, slot: BotMessageSlot) -> int | None:
+        entry = self._slots.get(slot.value)
+        return entry[0] if entry else None
+
+    def pop(self, slot: BotMessageSlot) -> int | None:
+        entry = self._slots.pop(slot.value, None)
+        return entry[0] if entry else None
+
+    def pop_all(self, *, tracked: bool = True) -> list[int]:
+        message_ids = [message_id for message_id, _ in self._slots.values()]
+        self._slots.clear()
+        if tracked:
+            message_ids.extend(self._tracked)
+            self._tracked.clear()
+        return message_ids
+
+    def __len__(self) -> int:
+        return len(self._tracked) + len(self._slots)
+
+
+async def delete_messages(bot: Bot, chat_id: int, message_ids: Iterable[int | None]) -> bool:
+    """
+    Удаляет сообщения пачками через deleteMessages (до 100 id за вызов).
+    Уже удалённые и слишком старые сообщения Telegram пропускает сам.
+    """
+    ids = sorted({message_id for message_id in message_ids if message_id})
+    ok = True
+
+    for start in range(0, len(ids), DELETE_MESSAGES_LIMIT):
+        chunk = ids[start:start + DELETE_MESSAGES_LIMIT]
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+        except TelegramAPIError:
+            logger.warning("Failed to delete %d messages in chat %s", len(chunk), chat_id, exc_info=True)
+            ok = False
+
+    return ok
@@ -0,0 +1,78 @@
+import logging
+from typing import Callable
+
+from aiohttp import web
+from psycopg_pool import AsyncConnectionPool
+
+from app.bot.metrics.metrics import metrics_registry
+from config.config import MetricsSettings
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Ключи get_stats() psycopg_pool, которые растут с момента создания пула.
+_POOL_COUNTERS = {
+    "requests_num": ("db_pool_requests_total", "Connection requests to the pool"),
+    "requests_queued": ("db_pool_requests_queued_total", "Connection requests that had to wait"),
+    "requests_errors": ("db_pool_requests_errors_total", "Connection requests that failed or timed out"),
+    "connections_errors": ("db_pool_connection_errors_total", "Failed attempts to open a connection"),
+    "connections_lost": ("db_pool_connections_lost_total", "Connections found broken by the pool check"),
+    "returns_bad": ("db_pool_returns_bad_total", "Connections returned to the pool in a bad state"),
+}
+
+
+def track_pool(pool: AsyncConnectionPool) -> None:
+    connections = metrics_registry.gauge("db_pool_connections", "Pool connections by state", ("state",))
+    waiting = metrics_registry.gauge("db_pool_requests_waiting", "Clients waiting for a connection")
+    wait_seconds = metrics_registry.counter(
+        "db_pool_requests_wait_seconds_total", "Total time clients waited for a connection"
+    )
+    usage_seconds = metrics_registry.counter(
+        "db_pool_usage_seconds_total", "Total time connections were checked out"
+    )
+    counters = {
+        key: metrics_registry.counter(name, documentation)
+        for key, (name, documentation) in _POOL_COUNTERS.items()
+    }
+
+    def collect() -> None:
+        stats = pool.get_stats()
+        connections.set(stats.get("pool_size", 0), "total")
+        connections.set(stats.get("pool_available", 0), "idle")
+        connections.set(stats.get("pool_max", 0), "max")
+        waiting.set(stats.get("requests_waiting", 0))
+        wait_seconds.set_total(stats.get("requests_wait_ms", 0) / 1000)
+        usage_seconds.set_total(stats.get("usage_ms", 0) / 1000)
+        for key, counter in counters.items():
+            counter.set_total(stats.get(key, 0))
+
+    metrics_registry.add_collector(collect)
+
+
+def track_stats(name: str, documentation: str, stats: Callable[[], dict[str, int]]) -> None:
+    """Выгружает dict из метода stats() компонента как gauge с меткой stat."""
+    gauge = metrics_registry.gauge(name, documentation, ("stat",))
+
+    def collect() -> None:
+        for key, value in stats().items():
+            gauge.set(value, key)
+
+    metrics_registry.add_collector(collect)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=metrics_registry.render().encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+async def start_metrics_server(settings: MetricsSettings) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_get(settings.path, _handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.host, port=settings.port)
+    await site.start()
+
+    logger.info("Metrics available at http://%s:%d%s", settings.host, settings.port, settings.path)
+    return runner
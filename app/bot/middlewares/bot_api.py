@@ -0,0 +1,85 @@
+import logging
+import os
+import time
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile
+
+from app.bot.metrics.metrics import SIZE_BUCKETS, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+bot_api_requests = metrics_registry.counter(
+    "bot_api_requests_total", "Bot API calls", ("method",)
+)
+bot_api_errors = metrics_registry.counter(
+    "bot_api_errors_total", "Failed Bot API calls by error type", ("method", "error")
+)
+bot_api_in_flight = metrics_registry.gauge(
+    "bot_api_requests_in_flight", "Bot API calls in progress", ("method",)
+)
+bot_api_duration = metrics_registry.histogram(
+    "bot_api_request_duration_seconds", "Bot API call latency including throttling waits", ("method",)
+)
+bot_api_payload = metrics_registry.histogram(
+    "bot_api_request_payload_bytes", "Approximate Bot API request payload size", ("method",), buckets=SIZE_BUCKETS
+)
+
+
+def _payload_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, BufferedInputFile):
+        return len(value.data)
+    if isinstance(value, FSInputFile):
+        try:
+            return os.path.getsize(value.path)
+        except OSError:
+            return 0
+    if isinstance(value, InputFile):
+        return 0
+    if isinstance(value, dict):
+        return sum(len(str(k)) + _payload_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(v) for v in value)
+    if hasattr(value, "model_dump"):
+        return _payload_size(value.model_dump(exclude_none=True))
+    return len(str(value))
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии Bot API: число вызовов, ошибки по типам, вызовы в процессе,
+    латентность и примерный размер запроса по каждому методу.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        bot_api_requests.inc(name)
+        bot_api_in_flight.inc(name)
+
+        try:
+            bot_api_payload.observe(_payload_size(method), name)
+        except Exception:
+            logger.debug("Failed to estimate payload size of %s", name, exc_info=True)
+
+        started_at = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            bot_api_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            bot_api_duration.observe(time.perf_counter() - started_at, name)
+            bot_api_in_flight.dec(name)
@@ -0,0 +1,78 @@
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import AnswerCallbackQuery, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Update
+
+from app.infrastructure.database.connection import LazyConnection
+
+logger = logging.getLogger(__name__)
+
+# id callback-запросов, на которые уже ответили в рамках текущего апдейта.
+answered_callbacks: ContextVar[set[str] | None] = ContextVar("answered_callbacks", default=None)
+
+
+class CallbackAnswerMiddleware(BaseMiddleware):
+    """
+    Отвечает на callback-запрос до первого ожидания соединения из пула, чтобы у пользователя
+    не висели «часики», пока апдейт стоит в очереди за соединением. Хендлеры, ответившие
+    раньше первого обращения к БД, по-прежнему могут показать свой текст или alert.
+    Должна стоять после DataBaseMiddleware и до FSMContextMiddleware, который уже
+    читает состояние через соединение апдейта.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any],
+    ) -> Any:
+        query = event.callback_query
+        if query is None:
+            return await handler(event, data)
+
+        answered: set[str] = set()
+        token = answered_callbacks.set(answered)
+
+        async def answer_early() -> None:
+            if query.id not in answered:
+                await query.answer()
+
+        connection = data.get("conn")
+        if isinstance(connection, LazyConnection):
+            connection.call_before_checkout(answer_early)
+
+        try:
+            return await handler(event, data)
+        finally:
+            answered_callbacks.reset(token)
+
+
+class CallbackAnswerGuard(BaseRequestMiddleware):
+    """
+    Middleware сессии Bot API: повторный answerCallbackQuery в том же апдейте
+    не отправляется (Telegram всё равно отклонит второй ответ) и считается успешным.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        answered = answered_callbacks.get()
+        if answered is None or not isinstance(method, AnswerCallbackQuery):
+            return await make_request(bot, method)
+
+        if method.callback_query_id in answered:
+            if method.text:
+                logger.debug("Callback query %s already answered, dropped text: %s",
+                             method.callback_query_id, method.text)
+            return Response[TelegramType](ok=True, result=True)
+
+        answered.add(method.callback_query_id)
+        return await make_request(bot, method)
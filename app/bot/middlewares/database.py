@@ -7,10 +7,19 @@ from aiogram import BaseMiddleware
 from aiogram.types import Update
 from psycopg_pool import AsyncConnectionPool
 
+from app.bot.middlewares.profiler import report_query_profile
+from app.infrastructure.database.connection import LazyConnection, current_connection
+from app.infrastructure.database.profiler import QUERY_REPEAT_LIMIT, QueryProfile
+
 logger = logging.getLogger(__name__)
 
 
 class DataBaseMiddleware(BaseMiddleware):
+    def __init__(self, profile_queries: bool = True, repeat_limit: int = QUERY_REPEAT_LIMIT, strict: bool = False):
+        self.profile_queries = profile_queries
+        self.repeat_limit = repeat_limit
+        self.strict = strict
+
     async def __call__(
             self,
             handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
@@ -23,13 +32,23 @@ class DataBaseMiddleware(BaseMiddleware):
             logger.error("Database pool is not provided in middleware data.")
             raise RuntimeError("Missing db_pool in middleware context.")
 
-        async with db_pool.connection() as connection:
-            try:
-                async with connection.transaction():
-                    data["conn"] = connection
-                    result = await handler(event, data)
-            except Exception as e:
+        profile = QueryProfile(self.repeat_limit, self.strict) if self.profile_queries else None
+        connection = LazyConnection(db_pool, profile=profile)
+        data["conn"] = connection
+        token = current_connection.set(connection)
+
+        try:
+            result = await handler(event, data)
+        except BaseException as e:
+            if connection.acquired and isinstance(e, Exception):
                 logger.exception("Transaction rolled back due to error: %s", e)
-                raise
+            await connection.close(type(e), e, e.__traceback__)
+            raise
+        finally:
+            current_connection.reset(token)
+            if profile is not None:
+                report_query_profile(profile)
+
+        await connection.close()
 
         return result
\ No newline at end of file
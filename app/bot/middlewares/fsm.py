@@ -0,0 +1,38 @@
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import TelegramObject
+
+from app.bot.fsm.fsm import BufferedFSMContext
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedFSMMiddleware(BaseMiddleware):
+    """
+    Подменяет FSMContext апдейта на BufferedFSMContext и после хендлера
+    записывает накопленные изменения в хранилище одной операцией на state и data.
+    Должна стоять внутри DataBaseMiddleware: запись идёт через соединение апдейта
+    в той же транзакции, что и изменения хендлера. При исключении в хендлере
+    изменения FSM отбрасываются вместе с транзакцией.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        context: FSMContext | None = data.get("state")
+        if context is None or isinstance(context, BufferedFSMContext):
+            return await handler(event, data)
+
+        buffered = BufferedFSMContext(context.storage, context.key, state=data.get("raw_state"))
+        data["state"] = buffered
+
+        result = await handler(event, data)
+        await buffered.flush()
+
+        return result
@@ -0,0 +1,86 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from app.bot.metrics.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+handler_duration = metrics_registry.histogram(
+    "handler_duration_seconds", "Handler latency", ("router", "handler")
+)
+handler_errors = metrics_registry.counter(
+    "handler_errors_total", "Handlers finished with an exception", ("router", "handler")
+)
+middleware_duration = metrics_registry.histogram(
+    "middleware_duration_seconds", "Time spent in a middleware itself, without the wrapped handler", ("middleware",)
+)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner-middleware, замеряющая время хендлера с меткой роутера и имени функции.
+    Регистрируется на наблюдателях диспетчера и поэтому срабатывает для хендлеров всех вложенных роутеров.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        router = data.get("event_router")
+        labels = (
+            router.name if router is not None else "unknown",
+            getattr(handler_object.callback, "__name__", "unknown") if handler_object is not None else "unknown"
+        )
+
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(*labels)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started_at, *labels)
+
+
+class TimedMiddleware(BaseMiddleware):
+    """Обёртка, замеряющая собственное время middleware (без времени вложенной цепочки)."""
+
+    def __init__(self, middleware: BaseMiddleware, name: str | None = None):
+        self.middleware = middleware
+        self.name = name or type(middleware).__name__
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        downstream = 0.0
+
+        async def timed_handler(event: TelegramObject, data: dict[str, Any]) -> Any:
+            nonlocal downstream
+            started_at = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                downstream += time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            middleware_duration.observe(time.perf_counter() - started_at - downstream, self.name)
+
+
+def setup_handler_metrics(dp: Dispatcher) -> None:
+    middleware = HandlerMetricsMiddleware()
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(middleware)
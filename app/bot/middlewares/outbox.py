@@ -0,0 +1,39 @@
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from app.bot.outbox.outbox import Outbox, OutboxSender
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxMiddleware(BaseMiddleware):
+    """
+    Должен стоять снаружи DataBaseMiddleware: отложенные вызовы Bot API
+    передаются отправителю только после успешного коммита транзакции.
+    """
+
+    def __init__(self, sender: OutboxSender):
+        self.sender = sender
+
+    async def __call__(
+            self,
+            handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any],
+    ) -> Any:
+        outbox = Outbox()
+        data["outbox"] = outbox
+
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            if len(outbox):
+                logger.warning("Dropped %d outbox calls after failed update %s", len(outbox), event.update_id)
+            raise
+
+        self.sender.submit(outbox.drain())
+
+        return result
@@ -0,0 +1,71 @@
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from app.bot.metrics.metrics import metrics_registry
+from app.infrastructure.database.connection import LazyConnection
+from app.infrastructure.database.profiler import QueryProfile
+
+logger = logging.getLogger(__name__)
+
+db_queries_per_update = metrics_registry.histogram(
+    "db_queries_per_update", "Queries executed while handling one update", ("router", "handler"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+db_time_per_update = metrics_registry.histogram(
+    "db_time_per_update_seconds", "Time spent in queries while handling one update", ("router", "handler")
+)
+db_repeated_statements = metrics_registry.counter(
+    "db_repeated_statements_total", "Updates that ran one statement more than the repeat limit", ("router", "handler")
+)
+
+
+class QueryProfilerMiddleware(BaseMiddleware):
+    """Подписывает профиль запросов апдейта именем роутера и хендлера, который его обработал."""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any],
+    ) -> Any:
+        connection = data.get("conn")
+        profile = connection.profile if isinstance(connection, LazyConnection) else None
+
+        if profile is not None:
+            router = data.get("event_router")
+            handler_object = data.get("handler")
+            profile.router = router.name if router is not None else "unknown"
+            profile.handler = getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+
+        return await handler(event, data)
+
+
+def report_query_profile(profile: QueryProfile) -> None:
+    labels = (profile.router, profile.handler)
+    db_queries_per_update.observe(profile.queries, *labels)
+    db_time_per_update.observe(profile.seconds, *labels)
+
+    extra = {"db_queries": profile.queries, "db_rows": profile.rows, "db_time_ms": round(profile.seconds * 1000, 1)}
+    repeated = profile.repeated()
+
+    if repeated:
+        db_repeated_statements.inc(*labels)
+        logger.warning(
+            "%s.%s: %d queries, %d rows, %.1f ms in DB; repeated statements: %s",
+            *labels, profile.queries, profile.rows, profile.seconds * 1000,
+            "; ".join(f"{count}x {statement}" for statement, count in repeated),
+            extra=extra
+        )
+    elif profile.queries:
+        logger.debug("%s.%s: %d queries, %d rows, %.1f ms in DB",
+                     *labels, profile.queries, profile.rows, profile.seconds * 1000, extra=extra)
+
+
+def setup_query_profiler(dp: Dispatcher) -> None:
+    middleware = QueryProfilerMiddleware()
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(middleware)
@@ -5,7 +5,7 @@ from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Update, User
-from app.infrastructure.database.db import get_user_banned_status_by_id
+from app.infrastructure.database.db import get_user_identity
 from psycopg import AsyncConnection
 
 logger = logging.getLogger(__name__)
@@ -28,9 +28,9 @@ class ShadowBanMiddleware(BaseMiddleware):
             logger.error("Db conn not found in middleware data.")
             raise RuntimeError("Missing db conn for shadow ban check.")
 
-        user_banned_status = await get_user_banned_status_by_id(conn, telegram_id=user.id)
+        identity = await get_user_identity(conn, telegram_id=user.id)
 
-        if user_banned_status:
+        if identity is not None and identity.is_banned:
             logger.warning("Shadow-banned user tried to interact: %d", user.id)
             if event.callback_query:
                 await event.callback_query.answer()
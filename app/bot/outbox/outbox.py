@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from aiogram.methods import SendMessage, TelegramMethod
+
+from app.bot.throttling.throttling import bulk_priority
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Буфер исходящих вызовов Bot API в рамках одного апдейта.
+    Хендлер только кладёт сюда вызовы, отправка идёт после коммита транзакции.
+    """
+
+    def __init__(self):
+        self._methods: list[TelegramMethod] = []
+
+    def add(self, method: TelegramMethod) -> None:
+        self._methods.append(method)
+
+    def send_message(self, chat_id: int | str, text: str, **kwargs: Any) -> None:
+        self.add(SendMessage(chat_id=chat_id, text=text, **kwargs))
+
+    def drain(self) -> list[TelegramMethod]:
+        methods, self._methods = self._methods, []
+        return methods
+
+    def __len__(self) -> int:
+        return len(self._methods)
+
+
+class OutboxSender:
+    """
+    Фоновые воркеры, выполняющие вызовы из Outbox вне пути обработки апдейта.
+    """
+
+    def __init__(self, workers: int = 2):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+
+        self.workers = workers
+        self._queue: asyncio.Queue[TelegramMethod] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._bot: Bot | None = None
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"outbox-sender-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("Outbox sender started with %d workers", self.workers)
+
+    def submit(self, methods: list[TelegramMethod]) -> None:
+        for method in methods:
+            self._queue.put_nowait(method)
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox sender stopped with %d unsent calls", self._queue.qsize())
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Outbox sender stopped")
+
+    async def _worker(self) -> None:
+        while True:
+            method = await self._queue.get()
+            try:
+                with bulk_priority():
+                    await self._bot(method)
+            except TelegramForbiddenError:
+                logger.warning("Outbox call %s rejected: bot was blocked by the user", type(method).__name__)
+            except TelegramAPIError:
+                logger.exception("Outbox call %s failed", type(method).__name__)
+            except Exception:
+                logger.exception("Unexpected error in outbox call %s", type(method).__name__)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Awaitable, Callable, Iterable
+
+from aiogram import Bot
+
+from app.bot.messages.messages import delete_messages
+
+logger = logging.getLogger(__name__)
+
+DELETE_DELAY = 1.5
+
+
+@dataclass(order=True, slots=True)
+class DelayedAction:
+    when: float
+    seq: int
+    action: Callable[[], Awaitable[Any]] = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class DelayedScheduler:
+    """
+    Отложенные действия ("удалить сообщение через 1.5 с" и т. п.) на одной фоновой задаче.
+    Таймеры хранятся в куче по времени срабатывания, хендлер только ставит действие
+    и сразу возвращается, отдавая соединение с БД обратно в пул.
+    """
+
+    def __init__(self):
+        self._heap: list[DelayedAction] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._bot: Bot | None = None
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._task = asyncio.create_task(self._run(), name="delayed-scheduler")
+        logger.info("Delayed scheduler started")
+
+    def call_later(self, delay: float, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> DelayedAction:
+        timer = DelayedAction(time.monotonic() + delay, next(self._seq), partial(func, *args, **kwargs))
+        heapq.heappush(self._heap, timer)
+        if self._heap[0] is timer:
+            self._wakeup.set()
+        return timer
+
+    def delete_later(
+            self,
+            chat_id: int,
+            message_ids: Iterable[int | None],
+            delay: float = DELETE_DELAY
+    ) -> DelayedAction | None:
+        message_ids = [message_id for message_id in message_ids if message_id]
+        if not message_ids:
+            return None
+        return self.call_later(delay, delete_messages, self._bot, chat_id, message_ids)
+
+    @property
+    def pending(self) -> int:
+        return sum(not timer.cancelled for timer in self._heap)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Останавливает таймер и сразу выполняет все ещё не сработавшие действия."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        self._fire(float("inf"))
+        if self._running:
+            done, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning("Delayed scheduler stopped with %d unfinished actions", len(pending))
+
+        logger.info("Delayed scheduler stopped")
+
+    def _fire(self, now: float) -> None:
+        while self._heap and self._heap[0].when <= now:
+            timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+
+            task = asyncio.create_task(self._execute(timer))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _execute(timer: DelayedAction) -> None:
+        try:
+            await timer.action()
+        except Exception:
+            logger.exception("Delayed action %r failed", timer.action)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            self._fire(now)
+
+            timeout = self._heap[0].when - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
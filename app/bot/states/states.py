@@ -21,6 +21,9 @@ class EditLabStates(StatesGroup):
     waiting_for_file = State()
     waiting_for_description = State()
 
+class SubmitLabStates(StatesGroup):
+    waiting_for_file = State()
+
 class TestCreationStates(StatesGroup):
     waiting_for_test_name = State()
     editing_test = State()
@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+import aiofiles
+import aiofiles.os
+from aiogram import Bot
+from aiogram.client.telegram import PRODUCTION
+from aiogram.exceptions import TelegramBadRequest
+from aiohttp import ClientTimeout
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+import app.infrastructure.database.db as db_func
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_STORE_ROOT = "media/submissions"
+SUBMISSION_DOWNLOAD_WORKERS = 4
+SUBMISSION_DOWNLOAD_RETRIES = 5
+SUBMISSION_DOWNLOAD_TIMEOUT = 120
+SUBMISSION_PENDING_BATCH_SIZE = 100
+CHUNK_SIZE = 64 * 1024
+# getFile облачного Bot API отдаёт файлы не больше 20 МБ; у локального сервера Bot API этого лимита нет.
+CLOUD_DOWNLOAD_LIMIT = 20 * 1024 * 1024
+
+
+def exceeds_download_limit(bot: Bot, file_size: int | None) -> bool:
+    """Файл нельзя будет скачать через облачный Bot API."""
+    return bool(file_size) and file_size > CLOUD_DOWNLOAD_LIMIT and bot.session.api.base == PRODUCTION.base
+
+
+class SubmissionDownloader:
+    """
+    Фоновая загрузка файлов сдач из Telegram в локальное хранилище, адресуемое по содержимому
+    (media/submissions/<первые 2 символа sha256>/<sha256>).
+    Хендлер только записывает files и submissions и ставит файл в очередь; скачивают
+    несколько воркеров, поэтому поток сдач перед дедлайном не занимает хендлеры и соединения с БД.
+    Недокачанный файл остаётся в .part и при повторной попытке докачивается с того же места.
+    Незавершённые загрузки (sha256 IS NULL) подхватываются из БД при старте. Файлы, которые
+    Telegram отклонил (TelegramBadRequest, например «file is too big»), не повторяются и помечаются
+    в files.download_failed_at, чтобы не ставить их в очередь при каждом запуске.
+    """
+
+    def __init__(
+            self,
+            pool: AsyncConnectionPool,
+            workers: int = SUBMISSION_DOWNLOAD_WORKERS,
+            store_root: str = SUBMISSION_STORE_ROOT,
+            max_retries: int = SUBMISSION_DOWNLOAD_RETRIES
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+
+        self.pool = pool
+        self.workers = workers
+        self.store_root = Path(store_root)
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._queued: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._bot: Bot | None = None
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"submission-downloader-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._load_pending(), name="submission-downloader-loader"))
+        logger.info("Submission downloader started with %d workers", self.workers)
+
+    def submit(self, file: dict[str, Any]) -> None:
+        if file["id"] in self._queued:
+            return
+        self._queued.add(file["id"])
+        self._queue.put_nowait(file)
+
+    def enqueue(self, connection: AsyncConnection, file: dict[str, Any]) -> None:
+        """Ставит файл в очередь после коммита транзакции хендлера."""
+        call_after_commit = getattr(connection, "call_after_commit", None)
+        if call_after_commit is not None:
+            call_after_commit(lambda: self.submit(file))
+        else:
+            self.submit(file)
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Submission downloader stopped, %d files left for the next start", self._queue.qsize())
+
+    async def _load_pending(self) -> None:
+        after_id = 0
+        while True:
+            async with self.pool.connection() as connection:
+                files = await db_func.get_pending_submission_files(
+                    connection, after_id=after_id, limit=SUBMISSION_PENDING_BATCH_SIZE
+                )
+            for file in files:
+                self.submit(file)
+            if len(files) < SUBMISSION_PENDING_BATCH_SIZE:
+                break
+            after_id = files[-1]["id"]
+
+    async def _worker(self) -> None:
+        while True:
+            file = await self._queue.get()
+            try:
+                await self._process(file)
+            finally:
+                self._queued.discard(file["id"])
+                self._queue.task_done()
+
+    async def _process(self, file: dict[str, Any]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                path, sha256, size = await self._download(file)
+                async with self.pool.connection() as connection:
+                    await db_func.set_file_stored(
+                        connection, file_id=file["id"], path=str(path), sha256=sha256, file_size=size
+                    )
+                return
+            except asyncio.CancelledError:
+                raise
+            except TelegramBadRequest as e:
+                logger.error("Telegram refused file id=%s: %s", file["id"], e.message)
+                async with self.pool.connection() as connection:
+                    await db_func.set_file_download_failed(connection, file_id=file["id"])
+                return
+            except Exception:
+                delay = min(2 ** attempt, 60)
+                logger.warning("Download of file id=%s failed (attempt %d/%d), retry in %ds",
+                               file["id"], attempt, self.max_retries, delay, exc_info=True)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(delay)
+
+        logger.error("Giving up on file id=%s until the next start", file["id"])
+
+    async def _download(self, file: dict[str, Any]) -> tuple[Path, str, int]:
+        tmp_dir = self.store_root / "tmp"
+        await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+        part = tmp_dir / f"{file['file_unique_id'] or file['id']}.part"
+
+        tg_file = await self._bot.get_file(file["telegram_file_id"])
+        api = self._bot.session.api
+
+        if api.is_local:
+            source = api.wrap_local_file.to_local(tg_file.file_path)
+            sha256, size = await self._copy_local(Path(source), part)
+        else:
+            url = api.file_url(self._bot.token, tg_file.file_path)
+            sha256, size = await self._fetch(url, part)
+
+        target = self.store_root / sha256[:2] / sha256
+        await aiofiles.os.makedirs(target.parent, exist_ok=True)
+        if await aiofiles.os.path.exists(target):
+            await aiofiles.os.remove(part)
+        else:
+            await aiofiles.os.replace(part, target)
+
+        return target, sha256, size
+
+    async def _fetch(self, url: str, part: Path) -> tuple[str, int]:
+        hasher = hashlib.sha256()
+        offset = 0
+
+        if await aiofiles.os.path.exists(part):
+            async with aiofiles.open(part, "rb") as f:
+                while chunk := await f.read(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    offset += len(chunk)
+
+        session = await self._bot.session.create_session()
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        async with session.get(url, headers=headers, timeout=ClientTimeout(total=SUBMISSION_DOWNLOAD_TIMEOUT)) as resp:
+            if resp.status == 416:
+                return hasher.hexdigest(), offset
+
+            resp.raise_for_status()
+            if offset and resp.status != 206:
+                hasher = hashlib.sha256()
+                offset = 0
+
+            async with aiofiles.open(part, "ab" if offset else "wb") as f:
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    await f.write(chunk)
+                    hasher.update(chunk)
+                    offset += len(chunk)
+
+        return hasher.hexdigest(), offset
+
+    @staticmethod
+    async def _copy_local(source: Path, part: Path) -> tuple[str, int]:
+        hasher = hashlib.sha256()
+        size = 0
+
+        async with aiofiles.open(source, "rb") as src, aiofiles.open(part, "wb") as dst:
+            while chunk := await src.read(CHUNK_SIZE):
+                await dst.write(chunk)
+                hasher.update(chunk)
+                size += len(chunk)
+
+        return hasher.hexdigest(), size
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from app.bot.enums.enums import SendPriority
+from app.bot.metrics.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30.0
+PRIVATE_CHAT_RATE = 1.0
+PRIVATE_CHAT_BURST = 3.0
+GROUP_CHAT_RATE = 20 / 60
+BULK_RESERVE = 5.0
+MAX_RETRIES = 3
+CHAT_BUCKETS_MAX_SIZE = 10_000
+# Лимит на чат у Telegram касается новых сообщений; правки и удаления меряются только общим ведром.
+CHAT_METERED_PREFIXES = ("send", "forward", "copy")
+
+bot_api_retry_after = metrics_registry.counter(
+    "bot_api_retry_after_total", "Bot API 429 responses, including retried ones", ("method",)
+)
+
+send_priority: ContextVar[SendPriority] = ContextVar("send_priority", default=SendPriority.INTERACTIVE)
+
+
+@contextmanager
+def bulk_priority() -> Iterator[None]:
+    """Вызовы Bot API внутри блока помечаются как массовые (рассылки, уведомления) и не берут резерв общего ведра."""
+    token = send_priority.set(SendPriority.BULK)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now: float, reserve: float = 0.0) -> float:
+        """Сколько ждать, пока в ведре будет 1 токен сверх reserve."""
+        self._refill(now)
+        missing = 1 + reserve - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class SendScheduler:
+    """
+    Ограничитель исходящих вызовов Bot API: общее ведро на бота и отдельное на каждый чат
+    (только для вызовов, которые отправляют новое сообщение).
+    «Приоритет» здесь — лишь резерв: массовые отправки (SendPriority.BULK) не берут последние
+    bulk_reserve токенов общего ведра, и эти токены достаются обычным вызовам. Очереди
+    с приоритетами нет: если резерв исчерпан, обычный вызов ждёт так же, как массовый.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = GLOBAL_RATE,
+            private_chat_rate: float = PRIVATE_CHAT_RATE,
+            private_chat_burst: float = PRIVATE_CHAT_BURST,
+            group_chat_rate: float = GROUP_CHAT_RATE,
+            bulk_reserve: float = BULK_RESERVE
+    ):
+        self.private_chat_rate = private_chat_rate
+        self.private_chat_burst = private_chat_burst
+        self.group_chat_rate = group_chat_rate
+        self.bulk_reserve = bulk_reserve
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self._paused_until = 0.0
+        self._chat_paused_until: dict[int | str, float] = {}
+        self._waiting = {priority: 0 for priority in SendPriority}
+        self._throttled = 0
+        self._retry_after = 0
+
+    def _chat_bucket(self, chat_id: int | str, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.private_chat_rate, self.private_chat_burst)
+            else:
+                bucket = TokenBucket(self.group_chat_rate, 1)
+            self._chats[chat_id] = bucket
+
+            if len(self._chats) > CHAT_BUCKETS_MAX_SIZE:
+                self._forget_idle_chats(now)
+
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _forget_idle_chats(self, now: float) -> None:
+        for chat_id in list(self._chats):
+            if len(self._chats) <= CHAT_BUCKETS_MAX_SIZE // 2:
+                break
+            if self._chats[chat_id].is_full(now):
+                del self._chats[chat_id]
+
+    async def acquire(self, chat_id: int | str | None, priority: SendPriority, per_chat: bool = True) -> None:
+        """Ждёт токен общего ведра и, если per_chat, ведра чата; паузы после 429 соблюдаются всегда."""
+        reserve = self.bulk_reserve if priority == SendPriority.BULK else 0.0
+        self._waiting[priority] += 1
+        throttled = False
+
+        try:
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if chat_id is not None:
+                    wait = max(wait, self._chat_paused_until.get(chat_id, 0.0) - now)
+
+                if wait <= 0:
+                    chat_bucket = self._chat_bucket(chat_id, now) if chat_id is not None and per_chat else None
+                    wait = self._global.wait_time(now, reserve)
+                    if chat_bucket is not None:
+                        wait = max(wait, chat_bucket.wait_time(now))
+
+                    if wait <= 0:
+                        self._global.consume()
+                        if chat_bucket is not None:
+                            chat_bucket.consume()
+                        return
+
+                if not throttled:
+                    throttled = True
+                    self._throttled += 1
+
+                await asyncio.sleep(wait)
+        finally:
+            self._waiting[priority] -= 1
+
+    def pause(self, chat_id: int | str | None, retry_after: float) -> None:
+        self._retry_after += 1
+        until = time.monotonic() + retry_after
+        if chat_id is None:
+            self._paused_until = max(self._paused_until, until)
+        else:
+            self._chat_paused_until[chat_id] = max(self._chat_paused_until.get(chat_id, 0.0), until)
+
+        now = time.monotonic()
+        self._chat_paused_until = {k: v for k, v in self._chat_paused_until.items() if v > now}
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "waiting_interactive": self._waiting[SendPriority.INTERACTIVE],
+            "waiting_bulk": self._waiting[SendPriority.BULK],
+            "throttled_total": self._throttled,
+            "retry_after_total": self._retry_after,
+            "chat_buckets": len(self._chats),
+        }
+
+
+def _is_limited(method: TelegramMethod) -> bool:
+    return not method.__api_method__.startswith("get") and getattr(method, "chat_id", None) is not None
+
+
+def _is_chat_metered(method: TelegramMethod) -> bool:
+    name = method.__api_method__
+    return name.startswith(CHAT_METERED_PREFIXES) and name != "sendChatAction"
+
+
+class ThrottledSession(AiohttpSession):
+    """
+    Сессия Bot API, пропускающая все вызовы в чаты через SendScheduler (ведро чата —
+    только для отправки новых сообщений) и повторяющая вызов после ответа 429 с учётом retry_after.
+    """
+
+    def __init__(self, scheduler: SendScheduler | None = None, max_retries: int = MAX_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler or SendScheduler()
+        self.max_retries = max_retries
+
+    async def make_request(
+            self,
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+            timeout: int | None = None
+    ) -> TelegramType:
+        if not _is_limited(method):
+            return await super().make_request(bot, method, timeout)
+
+        chat_id = getattr(method, "chat_id")
+        priority = send_priority.get()
+        per_chat = _is_chat_metered(method)
+
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(chat_id, priority, per_chat)
+            try:
+                return await super().make_request(bot, method, timeout)
+            except TelegramRetryAfter as e:
+                bot_api_retry_after.inc(method.__api_method__)
+                self.scheduler.pause(chat_id, e.retry_after)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("Flood control on %s in chat %s, retry in %ss",
+                               method.__api_method__, chat_id, e.retry_after)
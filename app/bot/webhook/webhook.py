@@ -0,0 +1,48 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config.config import WebhookSettings
+
+logger = logging.getLogger(__name__)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: WebhookSettings) -> None:
+    """
+    Принимает апдейты через вебхук на встроенном aiohttp-сервере.
+    Telegram сразу получает 200, обработка апдейта идёт в фоновой задаче.
+    Вебхук при остановке не удаляется: за балансировщиком могут работать другие процессы.
+    """
+    app = web.Application()
+
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=settings.secret
+    ).register(app, path=settings.path)
+    setup_application(app, dp, bot=bot)
+
+    allowed_updates = dp.resolve_used_update_types()
+    await bot.set_webhook(
+        url=settings.url.rstrip("/") + settings.path,
+        secret_token=settings.secret,
+        allowed_updates=allowed_updates,
+        max_connections=settings.max_connections
+    )
+    logger.info("Webhook set to %s%s, allowed updates: %s", settings.url, settings.path, ", ".join(allowed_updates))
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.host, port=settings.port)
+    await site.start()
+    logger.info("Webhook server listening on %s:%d", settings.host, settings.port)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        logger.info("Webhook server stopped")
@@ -0,0 +1,79 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from types import MappingProxyType
+from typing import Any, Mapping
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL = 30.0
+
+
+class CatalogKind(str, Enum):
+    LECTURES = 'lectures'
+    LABS = 'labs'
+    TESTS = 'tests'
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    version: int
+    items: tuple[Mapping[str, Any], ...]
+    by_id: Mapping[int, Mapping[str, Any]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class CatalogCache:
+    """
+    Неизменяемые снимки списков лекций, лабораторных и тестов.
+    Любая запись в соответствующие таблицы увеличивает версию, и при следующем чтении
+    снимок перезагружается из БД. Версия живёт только в памяти процесса, поэтому снимок
+    ещё и устаревает через ttl секунд: так другие процессы бота видят чужие изменения.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self._versions: dict[CatalogKind, int] = {kind: 0 for kind in CatalogKind}
+        self._snapshots: dict[CatalogKind, tuple[float, CatalogSnapshot]] = {}
+
+    def version(self, kind: CatalogKind) -> int:
+        return self._versions[kind]
+
+    def bump(self, *kinds: CatalogKind) -> None:
+        for kind in kinds:
+            self._versions[kind] += 1
+            self._snapshots.pop(kind, None)
+            logger.debug("Catalog %s version bumped to %d", kind.value, self._versions[kind])
+
+    def get(self, kind: CatalogKind) -> CatalogSnapshot | None:
+        entry = self._snapshots.get(kind)
+        if entry is None:
+            return None
+
+        expires_at, snapshot = entry
+        if snapshot.version != self._versions[kind] or expires_at < time.monotonic():
+            del self._snapshots[kind]
+            return None
+
+        return snapshot
+
+    def put(self, kind: CatalogKind, version: int, rows: list[dict[str, Any]]) -> CatalogSnapshot:
+        items = tuple(MappingProxyType(row) for row in rows)
+        snapshot = CatalogSnapshot(
+            version=version,
+            items=items,
+            by_id=MappingProxyType({item["id"]: item for item in items})
+        )
+
+        # Если во время загрузки кто-то записал в таблицу, снимок уже устарел — не кэшируем его.
+        if version == self._versions[kind]:
+            self._snapshots[kind] = (time.monotonic() + self.ttl, snapshot)
+            logger.debug("Catalog %s snapshot v%d cached with %d items", kind.value, version, len(items))
+
+        return snapshot
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,101 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Mapping
+
+logger = logging.getLogger(__name__)
+
+TEST_BUNDLE_CACHE_MAX_SIZE = 256
+TEST_BUNDLE_CACHE_TTL = 10.0
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerView:
+    id: int
+    question_id: int
+    text: str
+    is_right: bool
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionView:
+    id: int
+    text: str
+    max_points: int | None
+    answers: tuple[AnswerView, ...]
+
+    def get_answer(self, answer_id: int) -> AnswerView | None:
+        return next((a for a in self.answers if a.id == answer_id), None)
+
+
+@dataclass(frozen=True, slots=True)
+class TestBundle:
+    """Тест целиком: вопросы в порядке прохождения и варианты ответов с отметкой правильных."""
+    id: int
+    name: str
+    lecture_id: int | None
+    version: int
+    questions: tuple[QuestionView, ...]
+    by_question_id: Mapping[int, QuestionView] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+class TestBundleCache:
+    """
+    LRU-кэш неизменяемых бандлов тестов по test_id.
+    Любая запись в вопросы или ответы теста увеличивает его версию, и бандл перезагружается.
+    Правки из других процессов бота версию не трогают, поэтому бандл живёт не дольше ttl секунд.
+    """
+
+    def __init__(self, max_size: int = TEST_BUNDLE_CACHE_MAX_SIZE, ttl: float = TEST_BUNDLE_CACHE_TTL):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._versions: dict[int, int] = {}
+        self._bundles: OrderedDict[int, tuple[float, TestBundle]] = OrderedDict()
+
+    def version(self, test_id: int) -> int:
+        return self._versions.get(test_id, 0)
+
+    def bump(self, *test_ids: int) -> None:
+        for test_id in test_ids:
+            self._versions[test_id] = self.version(test_id) + 1
+            self._bundles.pop(test_id, None)
+            logger.debug("Test bundle %s version bumped to %d", test_id, self._versions[test_id])
+
+    def get(self, test_id: int) -> TestBundle | None:
+        entry = self._bundles.get(test_id)
+        if entry is None:
+            return None
+
+        expires_at, bundle = entry
+        if bundle.version != self.version(test_id) or expires_at < time.monotonic():
+            del self._bundles[test_id]
+            return None
+
+        self._bundles.move_to_end(test_id)
+        return bundle
+
+    def put(self, bundle: TestBundle) -> None:
+        # Если во время загрузки тест изменили, бандл уже устарел — не кэшируем его.
+        if bundle.version != self.version(bundle.id):
+            return
+
+        self._bundles[bundle.id] = (time.monotonic() + self.ttl, bundle)
+        self._bundles.move_to_end(bundle.id)
+
+        while len(self._bundles) > self.max_size:
+            self._bundles.popitem(last=False)
+
+        logger.debug("Test bundle %s v%d cached with %d questions", bundle.id, bundle.version, len(bundle))
+
+    def __len__(self) -> int:
+        return len(self._bundles)
+
+
+test_bundle_cache = TestBundleCache()
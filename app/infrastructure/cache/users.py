@@ -0,0 +1,69 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.bot.enums.enums import UserRole
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_MAX_SIZE = 10_000
+USER_CACHE_TTL = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class UserIdentity:
+    id: int
+    telegram_id: int
+    role: UserRole
+    is_alive: bool
+    is_banned: bool
+
+
+class UserIdentityCache:
+    """
+    Ограниченный по размеру LRU-кэш с TTL для идентичности пользователя (роль, бан, id).
+    Отсутствующие в БД пользователи тоже кэшируются (значение None).
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, UserIdentity | None]] = OrderedDict()
+
+    def get(self, telegram_id: int) -> tuple[bool, UserIdentity | None]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return False, None
+
+        expires_at, identity = entry
+        if expires_at < time.monotonic():
+            del self._entries[telegram_id]
+            return False, None
+
+        self._entries.move_to_end(telegram_id)
+        return True, identity
+
+    def put(self, telegram_id: int, identity: UserIdentity | None) -> None:
+        self._entries[telegram_id] = (time.monotonic() + self.ttl, identity)
+        self._entries.move_to_end(telegram_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        if self._entries.pop(telegram_id, None) is not None:
+            logger.debug("User identity cache invalidated for telegram_id=%s", telegram_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        logger.debug("User identity cache cleared")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_identity_cache = UserIdentityCache()
@@ -1,15 +1,25 @@
+import asyncio
 import logging
+import time
 
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from types import TracebackType
+from typing import Awaitable, Callable
 from urllib.parse import quote
-from psycopg import AsyncConnection
+from psycopg import AsyncConnection, AsyncCursor
 from psycopg_pool import AsyncConnectionPool
 
+from app.infrastructure.database.profiler import ProfiledCursor, QueryProfile
 from config.config import Config, load_config
 
 config: Config = load_config()
 
 logger = logging.getLogger(__name__)
 
+# LazyConnection апдейта, который сейчас обрабатывается (выставляет DataBaseMiddleware).
+current_connection: ContextVar["LazyConnection | None"] = ContextVar("current_connection", default=None)
+
 def build_psql_conn_info(
                 name: str,
                 host: str,
@@ -100,3 +110,117 @@ async def get_psql_pool(
         except Exception:
             logger.exception("Error while closing failed pool")
         raise
+
+
+class _LazyCursor:
+    def __init__(self, lazy_connection: "LazyConnection", args: tuple, kwargs: dict):
+        self._lazy_connection = lazy_connection
+        self._args = args
+        self._kwargs = kwargs
+        self._cursor: AsyncCursor | None = None
+
+    async def __aenter__(self) -> AsyncCursor | ProfiledCursor:
+        connection = await self._lazy_connection.get()
+        self._cursor = connection.cursor(*self._args, **self._kwargs)
+        cursor = await self._cursor.__aenter__()
+
+        profile = self._lazy_connection.profile
+        return ProfiledCursor(cursor, profile) if profile is not None else cursor
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._cursor is not None:
+            await self._cursor.__aexit__(exc_type, exc, tb)
+
+
+class LazyConnection:
+    """
+    Заменитель AsyncConnection для data["conn"]: соединение берётся из пула
+    и транзакция открывается только при первом обращении к БД.
+    Апдейты, которые не ходят в БД, не занимают соединение вовсе.
+    Если передан profile, все запросы через соединение записываются в него.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool, profile: QueryProfile | None = None):
+        self._pool = pool
+        self.profile = profile
+        self._stack = AsyncExitStack()
+        self._connection: AsyncConnection | None = None
+        self._lock = asyncio.Lock()
+        self._after_commit: list[Callable[[], None]] = []
+        self._after_rollback: list[Callable[[], None]] = []
+        self._before_checkout: list[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def acquired(self) -> bool:
+        return self._connection is not None
+
+    async def get(self) -> AsyncConnection:
+        if self._connection is not None:
+            return self._connection
+
+        async with self._lock:
+            if self._connection is None:
+                callbacks, self._before_checkout = self._before_checkout, []
+                for callback in callbacks:
+                    try:
+                        await callback()
+                    except Exception:
+                        logger.exception("Before-checkout callback failed")
+
+                connection = await self._stack.enter_async_context(self._pool.connection())
+                await self._stack.enter_async_context(connection.transaction())
+                self._connection = connection
+                logger.debug("Lazy connection checked out from pool")
+
+        return self._connection
+
+    def call_after_commit(self, callback: Callable[[], None]) -> None:
+        self._after_commit.append(callback)
+
+    def call_after_rollback(self, callback: Callable[[], None]) -> None:
+        """Функция, которая выполнится, если транзакция апдейта не закоммитилась."""
+        self._after_rollback.append(callback)
+
+    def call_before_checkout(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Корутина, которая выполнится перед тем, как ждать соединение из пула (один раз)."""
+        self._before_checkout.append(callback)
+
+    def cursor(self, *args, **kwargs) -> _LazyCursor:
+        return _LazyCursor(self, args, kwargs)
+
+    async def execute(self, query, params=None, **kwargs) -> AsyncCursor:
+        connection = await self.get()
+        if self.profile is None:
+            return await connection.execute(query, params, **kwargs)
+
+        started_at = time.perf_counter()
+        cursor = None
+        try:
+            cursor = await connection.execute(query, params, **kwargs)
+            return cursor
+        finally:
+            self.profile.record(query, time.perf_counter() - started_at, cursor.rowcount if cursor else 0)
+
+    async def close(
+            self,
+            exc_type: type[BaseException] | None = None,
+            exc: BaseException | None = None,
+            tb: TracebackType | None = None) -> None:
+        """
+        Коммитит (или откатывает при исключении) транзакцию и возвращает соединение в пул.
+        После этого выполняет колбэки call_after_commit либо, если коммита не было, call_after_rollback.
+        """
+        committed = False
+        try:
+            if self._connection is not None:
+                await self._stack.__aexit__(exc_type, exc, tb)
+                committed = exc_type is None
+        finally:
+            self._connection = None
+            callbacks = self._after_commit if committed else self._after_rollback
+            self._after_commit, self._after_rollback = [], []
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception:
+                    logger.exception("After-%s callback failed", "commit" if committed else "rollback")
@@ -1,14 +1,149 @@
 import logging
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Sequence
 from pathlib import Path
+from types import MappingProxyType
 
-from app.bot.enums.enums import UserRole, FileType, SubmissionStatus
+from app.bot.enums.enums import UserRole, FileType, SubmissionStatus, SeekDirection
+from app.infrastructure.cache.catalog import CatalogKind, CatalogSnapshot, catalog_cache
+from app.infrastructure.cache.tests import AnswerView, QuestionView, TestBundle, test_bundle_cache
+from app.infrastructure.cache.users import UserIdentity, user_identity_cache
 from psycopg import AsyncConnection
 
 logger = logging.getLogger(__name__)
 
 
+def _invalidate_catalog(connection: AsyncConnection, *kinds: CatalogKind) -> None:
+    """
+    Сбрасывает снимки каталога сразу и ещё раз после коммита,
+    чтобы параллельное чтение до коммита не закэшировало старые данные.
+    """
+    catalog_cache.bump(*kinds)
+
+    call_after_commit = getattr(connection, "call_after_commit", None)
+    if call_after_commit is not None:
+        call_after_commit(lambda: catalog_cache.bump(*kinds))
+
+def _invalidate_test_bundle(connection: AsyncConnection, *test_ids: int | None) -> None:
+    test_ids = tuple(test_id for test_id in test_ids if test_id is not None)
+    if not test_ids:
+        return
+
+    test_bundle_cache.bump(*test_ids)
+
+    call_after_commit = getattr(connection, "call_after_commit", None)
+    if call_after_commit is not None:
+        call_after_commit(lambda: test_bundle_cache.bump(*test_ids))
+
+def _invalidate_user_identity(connection: AsyncConnection, *telegram_ids: int) -> None:
+    """
+    Сбрасывает кэш user_identity_cache сразу и ещё раз после коммита,
+    чтобы параллельный апдейт не закэшировал старую роль или бан до коммита.
+    """
+    def invalidate() -> None:
+        for telegram_id in telegram_ids:
+            user_identity_cache.invalidate(telegram_id)
+
+    invalidate()
+
+    call_after_commit = getattr(connection, "call_after_commit", None)
+    if call_after_commit is not None:
+        call_after_commit(invalidate)
+
+def _clear_user_identities(connection: AsyncConnection) -> None:
+    user_identity_cache.clear()
+
+    call_after_commit = getattr(connection, "call_after_commit", None)
+    if call_after_commit is not None:
+        call_after_commit(user_identity_cache.clear)
+
+async def _load_catalog(
+        connection: AsyncConnection,
+        kind: CatalogKind,
+        query: str
+) -> CatalogSnapshot:
+    snapshot = catalog_cache.get(kind)
+    if snapshot is not None:
+        return snapshot
+
+    version = catalog_cache.version(kind)
+
+    async with connection.cursor() as cursor:
+        data = await cursor.execute(query)
+        rows = await data.fetchall()
+        columns = [desc.name for desc in cursor.description]
+
+    snapshot = catalog_cache.put(kind, version, [dict(zip(columns, row)) for row in rows])
+    logger.info("Loaded %s catalog snapshot v%d with %d items", kind.value, version, len(snapshot))
+
+    return snapshot
+
+async def _seek(
+        connection: AsyncConnection,
+        *,
+        select: str,
+        id_column: str = "id",
+        where: str = "TRUE",
+        params: tuple = (),
+        current_id: int | None = None,
+        direction: SeekDirection = SeekDirection.FIRST,
+        limit: int = 1
+) -> list[dict[str, Any]]:
+    """
+    Keyset-пагинация по первичному ключу: вместо загрузки всей таблицы и индексации
+    по смещению берём LIMIT строк относительно текущего id.
+    NEAREST — строка с id >= current_id, а если её нет, то ближайшая предыдущая
+    (нужно после удаления текущей записи).
+    """
+    if direction != SeekDirection.FIRST and current_id is None:
+        direction = SeekDirection.FIRST
+
+    if direction == SeekDirection.FIRST:
+        query = f"{select} WHERE {where} ORDER BY {id_column} LIMIT %s"
+        query_params = (*params, limit)
+    elif direction == SeekDirection.NEXT:
+        query = f"{select} WHERE {where} AND {id_column} > %s ORDER BY {id_column} LIMIT %s"
+        query_params = (*params, current_id, limit)
+    elif direction == SeekDirection.PREV:
+        query = f"{select} WHERE {where} AND {id_column} < %s ORDER BY {id_column} DESC LIMIT %s"
+        query_params = (*params, current_id, limit)
+    elif direction == SeekDirection.CURRENT:
+        query = f"{select} WHERE {where} AND {id_column} = %s"
+        query_params = (*params, current_id)
+    else:
+        query = f"""
+            (({select} WHERE {where} AND {id_column} >= %s ORDER BY {id_column} LIMIT 1)
+            UNION ALL
+            ({select} WHERE {where} AND {id_column} < %s ORDER BY {id_column} DESC LIMIT 1))
+            LIMIT 1
+        """
+        query_params = (*params, current_id, *params, current_id)
+
+    async with connection.cursor() as cursor:
+        data = await cursor.execute(query, query_params)
+        rows = await data.fetchall()
+        columns = [desc.name for desc in cursor.description]
+
+    result = [dict(zip(columns, row)) for row in rows]
+    if direction == SeekDirection.PREV:
+        result.reverse()
+
+    return result
+
+async def _count(
+        connection: AsyncConnection,
+        *,
+        table: str,
+        where: str = "TRUE",
+        params: tuple = ()
+) -> int:
+    async with connection.cursor() as cursor:
+        data = await cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)
+        row = await data.fetchone()
+
+    return row[0] if row else 0
+
+
 async def add_user(
         connection: AsyncConnection,
         *,
@@ -33,6 +168,8 @@ async def add_user(
             params=(telegram_id, username, name, surname, patronymic, role_value, is_alive, is_banned)
         )
 
+    _invalidate_user_identity(connection, telegram_id)
+
     logger.info(
         "New user added.\n "
         "Table=`%s`, telegram_id=%d, username=%s, name=%s, surname=%s, patronymic=%s, role=%s, is_alive=%s, is_banned=%s",
@@ -63,6 +200,42 @@ async def get_users(
         logger.info("Fetched %d users from table 'users'", len(users))
         return users
 
+async def seek_user(
+        connection: AsyncConnection,
+        *,
+        current_id: int | None = None,
+        direction: SeekDirection = SeekDirection.FIRST,
+        exclude_telegram_id: int | None = None
+) -> dict[str, Any] | None:
+    """
+    Один пользователь относительно users.id текущего (для карусели бана).
+    """
+    rows = await _seek(
+        connection,
+        select="""
+            SELECT id, telegram_id, username, name, surname, patronymic, role, is_alive, is_banned, created_at
+            FROM users
+        """,
+        where="telegram_id <> %s" if exclude_telegram_id is not None else "TRUE",
+        params=(exclude_telegram_id,) if exclude_telegram_id is not None else (),
+        current_id=current_id,
+        direction=direction
+    )
+
+    return rows[0] if rows else None
+
+async def count_users(
+        connection: AsyncConnection,
+        *,
+        exclude_telegram_id: int | None = None
+) -> int:
+    return await _count(
+        connection,
+        table="users",
+        where="telegram_id <> %s" if exclude_telegram_id is not None else "TRUE",
+        params=(exclude_telegram_id,) if exclude_telegram_id is not None else ()
+    )
+
 async def get_user(
         connection: AsyncConnection,
         *,
@@ -151,6 +324,45 @@ async def get_user_role(
 
     return UserRole(row[0]) if row else None
 
+async def get_user_identity(
+    conn: AsyncConnection,
+    *,
+    telegram_id: int,
+) -> UserIdentity | None:
+    """
+    Роль, бан и внутренний id пользователя через кэш user_identity_cache.
+    В БД идём только при промахе кэша.
+    """
+    hit, identity = user_identity_cache.get(telegram_id)
+    if hit:
+        return identity
+
+    async with conn.cursor() as cursor:
+        data = await cursor.execute(
+            query="""
+                SELECT id, role, is_alive, is_banned FROM users WHERE telegram_id = %s;
+            """,
+            params=(telegram_id,),
+        )
+        row = await data.fetchone()
+
+    identity = None
+    if row:
+        user_id, role, is_alive, is_banned = row
+        identity = UserIdentity(
+            id=user_id,
+            telegram_id=telegram_id,
+            role=UserRole(role),
+            is_alive=is_alive,
+            is_banned=is_banned
+        )
+        logger.info("User identity loaded for telegram_id=%s: %s", telegram_id, identity)
+    else:
+        logger.warning("User with telegram_id=%s not found", telegram_id)
+
+    user_identity_cache.put(telegram_id, identity)
+    return identity
+
 async def update_user(
         connection: AsyncConnection,
         *,
@@ -202,6 +414,8 @@ async def update_user(
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _invalidate_user_identity(connection, telegram_id)
+
     logger.info("User %d updated: %s", telegram_id, ", ".join(fields))
 
 async def update_user_by_user_name(
@@ -251,6 +465,8 @@ connection: AsyncConnection,
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _clear_user_identities(connection)
+
     logger.info("User %s updated: %s", username, ", ".join(fields))
 
 async def ban_user(
@@ -267,33 +483,214 @@ async def unban_user(
 ) -> None:
     await update_user(connection, telegram_id=telegram_id, is_banned=False)
 
+async def get_broadcast_recipients(
+        connection: AsyncConnection,
+        *,
+        after_user_id: int = 0,
+        limit: int = 100
+) -> list[dict[str, Any]]:
+    """
+    Следующая пачка получателей рассылки (живые незабаненные студенты) по возрастанию users.id.
+    """
+    rows = await _seek(
+        connection,
+        select="SELECT id, telegram_id FROM users",
+        where="role = %s AND is_alive AND NOT is_banned",
+        params=(UserRole.STUDENT.value,),
+        current_id=after_user_id,
+        direction=SeekDirection.NEXT,
+        limit=limit
+    )
 
-async def add_file(
+    return rows
+
+async def count_broadcast_recipients(
+        connection: AsyncConnection,
+        *,
+        after_user_id: int = 0
+) -> int:
+    return await _count(
+        connection,
+        table="users",
+        where="role = %s AND is_alive AND NOT is_banned AND id > %s",
+        params=(UserRole.STUDENT.value, after_user_id)
+    )
+
+async def mark_users_not_alive(
+        connection: AsyncConnection,
+        *,
+        telegram_ids: list[int]
+) -> None:
+    if not telegram_ids:
+        return
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                UPDATE users SET is_alive = FALSE
+                WHERE telegram_id = ANY(%s) AND is_alive;
+            """,
+            params=(telegram_ids,),
+        )
+
+    _invalidate_user_identity(connection, *telegram_ids)
+
+    logger.info("Marked %d users as not alive", len(telegram_ids))
+
+
+async def upsert_file(
     connection: AsyncConnection,
     *,
     file_type: str,
     telegram_file_id: str,
+    file_unique_id: str | None = None,
+    file_size: int | None = None,
+    mime_type: str | None = None,
     path: str | None = None,
-) -> int | None:
+) -> dict[str, Any] | None:
+    """
+    Сохраняет файл и возвращает {"id", "inserted", "sha256"}. Повторная загрузка того же файла
+    (тот же file_unique_id и тип) не создаёт новую запись: inserted=False и sha256 уже скачанного файла.
+    """
     effective_path = path if path is not None else telegram_file_id
 
     async with connection.cursor() as cursor:
         await cursor.execute(
             query="""
-                INSERT INTO files(type, telegram_file_id, path)
-                VALUES (%s, %s, %s)
-                RETURNING id;
+                INSERT INTO files(type, telegram_file_id, file_unique_id, file_size, mime_type, path)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (file_unique_id, type) DO UPDATE
+                    SET telegram_file_id = EXCLUDED.telegram_file_id,
+                        file_size = COALESCE(EXCLUDED.file_size, files.file_size),
+                        mime_type = COALESCE(EXCLUDED.mime_type, files.mime_type)
+                RETURNING id, xmax = 0 AS inserted, sha256;
             """,
-            params=(file_type, telegram_file_id, effective_path),
+            params=(file_type, telegram_file_id, file_unique_id, file_size, mime_type, effective_path),
         )
         row = await cursor.fetchone()
 
-    file_id = row[0] if row else None
-    logger.info(
-        "New file record. Table=`%s`, id=%s, file_type=%s, telegram_file_id=%s, path=%s",
-        "files", file_id, file_type, telegram_file_id, effective_path
+    if row is None:
+        return None
+
+    file_id, inserted, sha256 = row
+    if inserted:
+        logger.info(
+            "New file record. Table=`%s`, id=%s, file_type=%s, telegram_file_id=%s, path=%s",
+            "files", file_id, file_type, telegram_file_id, effective_path
+        )
+    else:
+        _invalidate_catalog(connection, CatalogKind.LECTURES, CatalogKind.LABS)
+        logger.info("File file_unique_id=%s already stored as id=%s", file_unique_id, file_id)
+
+    return {"id": file_id, "inserted": inserted, "sha256": sha256}
+
+async def add_file(
+    connection: AsyncConnection,
+    *,
+    file_type: str,
+    telegram_file_id: str,
+    file_unique_id: str | None = None,
+    file_size: int | None = None,
+    mime_type: str | None = None,
+    path: str | None = None,
+) -> int | None:
+    """
+    Сохраняет файл и возвращает id записи (см. upsert_file).
+    """
+    stored = await upsert_file(
+        connection,
+        file_type=file_type,
+        telegram_file_id=telegram_file_id,
+        file_unique_id=file_unique_id,
+        file_size=file_size,
+        mime_type=mime_type,
+        path=path
     )
-    return file_id
+    return stored["id"] if stored else None
+
+async def get_file_by_unique_id(
+        connection: AsyncConnection,
+        *,
+        file_unique_id: str,
+        file_type: str
+) -> dict | None:
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                SELECT id, type, telegram_file_id, file_unique_id, file_size, mime_type, sha256, path
+                FROM files
+                WHERE file_unique_id = %s AND type = %s;
+            """,
+            params=(file_unique_id, file_type),
+        )
+
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+
+        columns = [desc.name for desc in cursor.description]
+        return dict(zip(columns, row))
+
+async def get_pending_submission_files(
+        connection: AsyncConnection,
+        *,
+        after_id: int = 0,
+        limit: int = 100
+) -> list[dict[str, Any]]:
+    """Файлы сдач, ещё не скачанные в локальное хранилище (sha256 IS NULL) и не отбракованные."""
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                SELECT id, telegram_file_id, file_unique_id, file_size
+                FROM files
+                WHERE type = 'submission' AND sha256 IS NULL AND download_failed_at IS NULL AND id > %s
+                ORDER BY id
+                LIMIT %s;
+            """,
+            params=(after_id, limit),
+        )
+
+        rows = await cursor.fetchall()
+        columns = [desc.name for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+async def set_file_stored(
+        connection: AsyncConnection,
+        *,
+        file_id: int,
+        path: str,
+        sha256: str,
+        file_size: int
+) -> None:
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                UPDATE files
+                SET path = %s, sha256 = %s, file_size = %s
+                WHERE id = %s;
+            """,
+            params=(path, sha256, file_size, file_id),
+        )
+
+    logger.info("File id=%s stored at %s (sha256=%s, %d bytes)", file_id, path, sha256, file_size)
+
+async def set_file_download_failed(
+        connection: AsyncConnection,
+        *,
+        file_id: int,
+) -> None:
+    """Отмечает файл, который Telegram отказался отдавать; при старте он больше не ставится в очередь."""
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                UPDATE files
+                SET download_failed_at = NOW()
+                WHERE id = %s;
+            """,
+            params=(file_id,),
+        )
+
+    logger.warning("File id=%s marked as permanently failed to download", file_id)
 
 async def get_file(
         connection: AsyncConnection,
@@ -386,6 +783,8 @@ async def update_file(
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _invalidate_catalog(connection, CatalogKind.LECTURES, CatalogKind.LABS)
+
     logger.info("File %s updated: %s", file_id, ", ".join(fields))
 
 async def delete_file(
@@ -401,8 +800,58 @@ async def delete_file(
             """,
             params=(file_id,),
         )
+
+    _invalidate_catalog(connection, CatalogKind.LECTURES, CatalogKind.LABS)
+
     logger.info("Deleted file id=%s", file_id)
 
+async def delete_orphaned_files(
+        connection: AsyncConnection,
+        *,
+        limit: int
+) -> list[dict[str, Any]]:
+    """
+    Удаляет до limit записей files, на которые не ссылаются лекции, лабораторные и сдачи.
+    Строки, заблокированные другими транзакциями (например, вставкой ссылки на файл), пропускаются.
+    path_shared = TRUE, если тот же путь остаётся у другой записи и локальный файл удалять нельзя.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                WITH orphaned AS (
+                    SELECT f.id
+                    FROM files f
+                    WHERE NOT EXISTS (SELECT 1 FROM lectures l WHERE l.file_id = f.id)
+                      AND NOT EXISTS (SELECT 1 FROM lab_works w WHERE w.file_id = f.id)
+                      AND NOT EXISTS (SELECT 1 FROM submissions s WHERE s.submission_file_id = f.id)
+                    ORDER BY f.id
+                    LIMIT %s
+                    FOR UPDATE OF f SKIP LOCKED
+                ), deleted AS (
+                    DELETE FROM files f
+                    USING orphaned o
+                    WHERE f.id = o.id
+                    RETURNING f.id, f.type, f.path, f.file_size
+                )
+                SELECT d.id, d.type, d.path, d.file_size,
+                       EXISTS (
+                           SELECT 1 FROM files f
+                           WHERE f.path = d.path AND f.id NOT IN (SELECT id FROM deleted)
+                       ) AS path_shared
+                FROM deleted d
+                ORDER BY d.id;
+            """,
+            params=(limit,),
+        )
+
+        rows = await cursor.fetchall()
+        columns = [desc.name for desc in cursor.description]
+        files = [dict(zip(columns, row)) for row in rows]
+
+    if files:
+        logger.info("Deleted %d orphaned files: %s", len(files), [f["id"] for f in files])
+    return files
+
 
 async def add_lecture_with_file(
     connection: AsyncConnection,
@@ -456,28 +905,33 @@ async def add_lecture(
         )
         row = await cursor.fetchone()
     lecture_id = row[0] if row else None
+
+    _invalidate_catalog(connection, CatalogKind.LECTURES)
+
     logger.info("New lecture added. Table=`%s`, id=%s, name=%s, file_id=%s", "lectures", lecture_id, name, file_id)
 
     return lecture_id
 
 async def get_lectures_with_file_ids(connection: AsyncConnection) -> list[dict[str, Any]] | None:
-    lectures = await get_lectures(connection)
-    if not lectures:
-        return None
-
-
-    files = await get_files_by_type(connection, file_type="lecture") or []
-
-
-    files_dict = {f["id"]: f for f in files}
-
+    """
+    Лекции с telegram_file_id из снимка каталога; в БД идём только после изменений.
+    """
+    snapshot = await _load_catalog(
+        connection,
+        CatalogKind.LECTURES,
+        query="""
+            SELECT l.id, l.name, l.file_id, f.telegram_file_id, f.path AS file_path
+            FROM lectures l
+            LEFT JOIN files f ON f.id = l.file_id
+            ORDER BY l.id;
+        """
+    )
 
-    for lecture in lectures:
-        file_id = lecture.get("file_id")
-        lecture_file = files_dict.get(file_id)
-        lecture["telegram_file_id"] = lecture_file["telegram_file_id"] if lecture_file else None
+    if not snapshot.items:
+        logger.warning("No lectures found in table 'lectures'")
+        return None
 
-    return lectures
+    return list(snapshot.items)
 
 async def get_lectures(connection: AsyncConnection) -> list[dict[str, Any]] | None:
     async with connection.cursor() as cursor:
@@ -527,6 +981,65 @@ async def get_lecture(
         logger.info("Fetched lecture: %s", lecture)
         return lecture
 
+async def seek_lecture(
+    connection: AsyncConnection,
+    *,
+    current_id: int | None = None,
+    direction: SeekDirection = SeekDirection.FIRST,
+) -> dict[str, Any] | None:
+    rows = await _seek(
+        connection,
+        select="""
+            SELECT l.id, l.name, l.file_id, f.telegram_file_id, f.path AS file_path
+            FROM lectures l
+            LEFT JOIN files f ON f.id = l.file_id
+        """,
+        id_column="l.id",
+        current_id=current_id,
+        direction=direction
+    )
+
+    return rows[0] if rows else None
+
+async def count_lectures(connection: AsyncConnection) -> int:
+    return await _count(connection, table="lectures")
+
+async def get_lecture_with_file(
+    connection: AsyncConnection,
+    *,
+    lecture_id: int,
+) -> dict[str, Any] | None:
+    """
+    Одна лекция вместе с telegram_file_id и путём к файлу.
+    Берётся из снимка каталога, если он актуален, иначе одним JOIN-запросом.
+    """
+    snapshot = catalog_cache.get(CatalogKind.LECTURES)
+    if snapshot is not None:
+        lecture = snapshot.by_id.get(lecture_id)
+        return dict(lecture) if lecture else None
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT l.id, l.name, l.file_id, f.telegram_file_id, f.path AS file_path
+            FROM lectures l
+            LEFT JOIN files f ON f.id = l.file_id
+            WHERE l.id = %s;
+            """,
+            (lecture_id,),
+        )
+        row = await cursor.fetchone()
+
+        if not row:
+            logger.warning("No lecture found with id=%s", lecture_id)
+            return None
+
+        columns = [desc.name for desc in cursor.description]
+        lecture = dict(zip(columns, row))
+
+        logger.info("Fetched lecture with file: %s", lecture)
+        return lecture
+
 async def get_lectures_by_file(
     connection: AsyncConnection,
     *,
@@ -558,42 +1071,23 @@ async def update_lecture_file(
     *,
     lecture_id: int,
     telegram_file_id: str,
+    file_unique_id: str | None = None,
+    file_size: int | None = None,
+    mime_type: str | None = None,
     file_type: str = "lecture",
 ) -> None:
     """
-    Обновляет файл лекции: создаёт или обновляет запись в таблице files
+    Обновляет файл лекции: находит или создаёт запись в таблице files
     и обновляет ссылку на file_id в таблице lectures.
     """
-
-    files = await get_files_by_type(connection, file_type=file_type)
-    file_id = None
-
-    if files:
-
-        for f in files:
-            if f.get("id") == lecture_id:
-                file_id = f["id"]
-                query = """
-                    UPDATE files
-                    SET telegram_file_id = %s
-                    WHERE id = %s
-                """
-                async with connection.cursor() as cursor:
-                    await cursor.execute(query, (telegram_file_id, file_id))
-                break
-
-    if file_id is None:
-
-        query = """
-            INSERT INTO files (type, telegram_file_id)
-            VALUES (%s, %s)
-            RETURNING id
-        """
-        async with connection.cursor() as cursor:
-            await cursor.execute(query, (file_type, telegram_file_id))
-            row = await cursor.fetchone()
-            file_id = row[0]
-
+    file_id = await add_file(
+        connection,
+        file_type=file_type,
+        telegram_file_id=telegram_file_id,
+        file_unique_id=file_unique_id,
+        file_size=file_size,
+        mime_type=mime_type
+    )
 
     await update_lecture(connection, lecture_id=lecture_id, file_id=file_id)
 
@@ -626,6 +1120,8 @@ async def update_lecture(
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _invalidate_catalog(connection, CatalogKind.LECTURES)
+
     logger.info("Lecture %s updated: %s", lecture_id, ", ".join(fields))
 
 async def delete_lecture(
@@ -640,6 +1136,9 @@ async def delete_lecture(
             """,
             params=(lecture_id,),
         )
+
+    _invalidate_catalog(connection, CatalogKind.LECTURES, CatalogKind.TESTS)
+
     logger.info("Deleted lecture id=%s", lecture_id)
 
 
@@ -661,6 +1160,9 @@ async def add_test(
         )
         row = await cursor.fetchone()
     test_id = row[0] if row else None
+
+    _invalidate_catalog(connection, CatalogKind.TESTS)
+
     logger.info("New test added. Table=`%s`, id=%s, name=%s, lecture_id=%s", "tests", test_id, name, lecture_id)
     return test_id
 
@@ -684,11 +1186,49 @@ async def get_test(
             logger.warning("No test found with test_id=%s", test_id)
             return None
 
-        columns = [desc.name for desc in cursor.description]
-        test = dict(zip(columns, row))
+        columns = [desc.name for desc in cursor.description]
+        test = dict(zip(columns, row))
+
+        logger.info("Fetched test: %s", test)
+        return test
+
+async def get_tests(connection: AsyncConnection) -> list[dict[str, Any]] | None:
+    """
+    Все тесты из снимка каталога.
+    """
+    snapshot = await _load_catalog(
+        connection,
+        CatalogKind.TESTS,
+        query="""
+            SELECT id, name, lecture_id
+            FROM tests
+            ORDER BY id;
+        """
+    )
+
+    if not snapshot.items:
+        logger.warning("No tests found in table 'tests'")
+        return None
+
+    return list(snapshot.items)
+
+async def seek_test(
+    connection: AsyncConnection,
+    *,
+    current_id: int | None = None,
+    direction: SeekDirection = SeekDirection.FIRST,
+) -> dict[str, Any] | None:
+    rows = await _seek(
+        connection,
+        select="SELECT id, name, lecture_id FROM tests",
+        current_id=current_id,
+        direction=direction
+    )
 
-        logger.info("Fetched test: %s", test)
-        return test
+    return rows[0] if rows else None
+
+async def count_tests(connection: AsyncConnection) -> int:
+    return await _count(connection, table="tests")
 
 async def get_tests_by_lecture(
     connection: AsyncConnection,
@@ -745,6 +1285,9 @@ async def update_test(
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _invalidate_catalog(connection, CatalogKind.TESTS)
+    _invalidate_test_bundle(connection, test_id)
+
     logger.info("Test %s updated: %s", test_id, ", ".join(fields))
 
 async def delete_test(
@@ -759,6 +1302,10 @@ async def delete_test(
             """,
             params=(test_id,),
         )
+
+    _invalidate_catalog(connection, CatalogKind.TESTS)
+    _invalidate_test_bundle(connection, test_id)
+
     logger.info("Deleted test id=%s", test_id)
 
 
@@ -781,6 +1328,7 @@ async def add_question(
         )
         row = await cursor.fetchone()
     question_id = row[0] if row else None
+    _invalidate_test_bundle(connection, test_id)
     logger.info("New question added. Table=`%s`, id=%s, test_id=%s", "questions", question_id, test_id)
     return question_id
 
@@ -820,7 +1368,8 @@ async def get_questions_by_test(
             """
             SELECT id, test_id, text, max_points
             FROM questions
-            WHERE test_id = %s;
+            WHERE test_id = %s
+            ORDER BY id;
             """,
             (test_id,),
         )
@@ -860,10 +1409,14 @@ async def update_question(
         UPDATE questions
         SET {', '.join(fields)}
         WHERE id = %s
+        RETURNING test_id
     """
 
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
+        row = await cursor.fetchone()
+
+    _invalidate_test_bundle(connection, row[0] if row else None)
 
     logger.info("Question %s updated: %s", question_id, ", ".join(fields))
 
@@ -875,10 +1428,14 @@ async def delete_question(
     async with connection.cursor() as cursor:
         await cursor.execute(
             query="""
-                DELETE FROM questions WHERE id = %s;
+                DELETE FROM questions WHERE id = %s
+                RETURNING test_id;
             """,
             params=(question_id,),
         )
+        row = await cursor.fetchone()
+
+    _invalidate_test_bundle(connection, row[0] if row else None)
     logger.info("Deleted question id=%s", question_id)
 
 
@@ -895,12 +1452,13 @@ async def add_answer(
             query="""
                 INSERT INTO answers(question_id, text, is_right)
                 VALUES (%s, %s, %s)
-                RETURNING id;
+                RETURNING id, (SELECT test_id FROM questions WHERE id = answers.question_id);
             """,
             params=(question_id, text, is_right),
         )
         row = await cursor.fetchone()
     answer_id = row[0] if row else None
+    _invalidate_test_bundle(connection, row[1] if row else None)
     logger.info("New answer added. Table=`%s`, id=%s, question_id=%s", "answers", answer_id, question_id)
     return answer_id
 
@@ -940,7 +1498,8 @@ async def get_answers_by_question(
             """
             SELECT id, question_id, text, is_right
             FROM answers
-            WHERE question_id = %s;
+            WHERE question_id = %s
+            ORDER BY id;
             """,
             (question_id,),
         )
@@ -980,10 +1539,14 @@ async def update_answer(
         UPDATE answers
         SET {', '.join(fields)}
         WHERE id = %s
+        RETURNING (SELECT test_id FROM questions WHERE id = answers.question_id)
     """
 
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
+        row = await cursor.fetchone()
+
+    _invalidate_test_bundle(connection, row[0] if row else None)
 
     logger.info("Answer %s updated: %s", answer_id, ", ".join(fields))
 
@@ -995,12 +1558,144 @@ async def delete_answer(
     async with connection.cursor() as cursor:
         await cursor.execute(
             query="""
-                DELETE FROM answers WHERE id = %s;
+                DELETE FROM answers WHERE id = %s
+                RETURNING (SELECT test_id FROM questions WHERE id = answers.question_id);
             """,
             params=(answer_id,),
         )
+        row = await cursor.fetchone()
+
+    _invalidate_test_bundle(connection, row[0] if row else None)
     logger.info("Deleted answer id=%s", answer_id)
 
+async def get_test_bundle(
+    connection: AsyncConnection,
+    *,
+    test_id: int,
+) -> TestBundle | None:
+    """
+    Тест с вопросами и вариантами ответов одним запросом.
+    Результат кэшируется до первого изменения вопросов или ответов этого теста, но не дольше TTL кэша.
+    """
+    bundle = test_bundle_cache.get(test_id)
+    if bundle is not None:
+        return bundle
+
+    version = test_bundle_cache.version(test_id)
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT t.id AS test_id, t.name AS test_name, t.lecture_id,
+                   q.id AS question_id, q.text AS question_text, q.max_points,
+                   a.id AS answer_id, a.text AS answer_text, a.is_right
+            FROM tests t
+            LEFT JOIN questions q ON q.test_id = t.id
+            LEFT JOIN answers a ON a.question_id = q.id
+            WHERE t.id = %s
+            ORDER BY q.id, a.id;
+            """,
+            (test_id,),
+        )
+        rows = await cursor.fetchall()
+        columns = [desc.name for desc in cursor.description]
+
+    if not rows:
+        logger.warning("No test found with test_id=%s", test_id)
+        return None
+
+    rows = [dict(zip(columns, row)) for row in rows]
+
+    questions: dict[int, tuple[dict[str, Any], list[AnswerView]]] = {}
+    for row in rows:
+        if row["question_id"] is None:
+            continue
+
+        _, answers = questions.setdefault(row["question_id"], (row, []))
+        if row["answer_id"] is not None:
+            answers.append(AnswerView(
+                id=row["answer_id"],
+                question_id=row["question_id"],
+                text=row["answer_text"],
+                is_right=bool(row["is_right"])
+            ))
+
+    question_views = tuple(
+        QuestionView(id=question_id, text=row["question_text"], max_points=row["max_points"], answers=tuple(answers))
+        for question_id, (row, answers) in questions.items()
+    )
+
+    bundle = TestBundle(
+        id=rows[0]["test_id"],
+        name=rows[0]["test_name"],
+        lecture_id=rows[0]["lecture_id"],
+        version=version,
+        questions=question_views,
+        by_question_id=MappingProxyType({q.id: q for q in question_views})
+    )
+    test_bundle_cache.put(bundle)
+
+    logger.info("Loaded test bundle id=%s v%d with %d questions", test_id, version, len(bundle))
+    return bundle
+
+
+
+async def get_test_question(
+    connection: AsyncConnection,
+    *,
+    test_id: int,
+    number: int,
+) -> QuestionView | None:
+    """
+    Вопрос теста по порядковому номеру (с 1) вместе с вариантами ответов, одним запросом.
+    """
+    if number < 1:
+        return None
+
+    bundle = test_bundle_cache.get(test_id)
+    if bundle is not None:
+        return bundle.questions[number - 1] if number <= len(bundle.questions) else None
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT q.id, q.text, q.max_points,
+                   COALESCE(
+                       json_agg(
+                           json_build_object('id', a.id, 'text', a.text, 'is_right', a.is_right)
+                           ORDER BY a.id
+                       ) FILTER (WHERE a.id IS NOT NULL),
+                       '[]'
+                   ) AS answers
+            FROM (
+                SELECT id, text, max_points
+                FROM questions
+                WHERE test_id = %s
+                ORDER BY id
+                OFFSET %s LIMIT 1
+            ) q
+            LEFT JOIN answers a ON a.question_id = q.id
+            GROUP BY q.id, q.text, q.max_points;
+            """,
+            (test_id, number - 1),
+        )
+        row = await cursor.fetchone()
+
+    if not row:
+        logger.warning("No question #%s found for test_id=%s", number, test_id)
+        return None
+
+    question_id, text, max_points, answers = row
+    return QuestionView(
+        id=question_id,
+        text=text,
+        max_points=max_points,
+        answers=tuple(
+            AnswerView(id=a["id"], question_id=question_id, text=a["text"], is_right=bool(a["is_right"]))
+            for a in answers
+        )
+    )
+
 
 
 async def add_lab_work(
@@ -1023,6 +1718,9 @@ async def add_lab_work(
         )
         row = await cursor.fetchone()
     lab_id = row[0] if row else None
+
+    _invalidate_catalog(connection, CatalogKind.LABS)
+
     logger.info("New lab_work added. Table=`%s`, id=%s, name=%s", "lab_works", lab_id, name)
     return lab_id
 
@@ -1052,6 +1750,67 @@ async def get_lab_work(
         return lab_work
 
 
+async def seek_lab_work(
+    connection: AsyncConnection,
+    *,
+    current_id: int | None = None,
+    direction: SeekDirection = SeekDirection.FIRST,
+) -> dict[str, Any] | None:
+    rows = await _seek(
+        connection,
+        select="""
+            SELECT lw.id, lw.name, lw.file_id, lw.description, lw.deadline, lw.allow_late,
+                   f.telegram_file_id, f.path AS file_path
+            FROM lab_works lw
+            LEFT JOIN files f ON f.id = lw.file_id
+        """,
+        id_column="lw.id",
+        current_id=current_id,
+        direction=direction
+    )
+
+    return rows[0] if rows else None
+
+async def count_lab_works(connection: AsyncConnection) -> int:
+    return await _count(connection, table="lab_works")
+
+async def get_lab_work_with_file(
+    connection: AsyncConnection,
+    *,
+    lab_id: int,
+) -> dict[str, Any] | None:
+    """
+    Одна лабораторная вместе с telegram_file_id и путём к файлу.
+    Берётся из снимка каталога, если он актуален, иначе одним JOIN-запросом.
+    """
+    snapshot = catalog_cache.get(CatalogKind.LABS)
+    if snapshot is not None:
+        lab_work = snapshot.by_id.get(lab_id)
+        return dict(lab_work) if lab_work else None
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT lw.id, lw.name, lw.file_id, lw.description, lw.deadline, lw.allow_late,
+                   f.telegram_file_id, f.path AS file_path
+            FROM lab_works lw
+            LEFT JOIN files f ON f.id = lw.file_id
+            WHERE lw.id = %s;
+            """,
+            (lab_id,),
+        )
+        row = await cursor.fetchone()
+
+        if not row:
+            logger.warning("No lab work found with id=%s", lab_id)
+            return None
+
+        columns = [desc.name for desc in cursor.description]
+        lab_work = dict(zip(columns, row))
+        logger.info("Fetched lab work with file: %s", lab_work)
+        return lab_work
+
+
 async def get_lab_works_by_file(
     connection: AsyncConnection,
     *,
@@ -1108,25 +1867,25 @@ async def get_lab_works_with_file_ids(connection: AsyncConnection) -> list[dict[
     """
     Возвращает lab_works с подклеенным telegram_file_id (и path) из таблицы files.
     Если у лабораторной нет файла — telegram_file_id будет None.
+    Данные берутся из снимка каталога; в БД идём только после изменений.
     """
-    labs = await get_lab_works(connection)
-    if not labs:
-        return None
-
-
-    files = await get_files_by_type(connection, file_type="lab") or []
-
-
-    files_dict = {f["id"]: f for f in files}
-
-    for lab in labs:
-        file_id = lab.get("file_id")
-        lab_file = files_dict.get(file_id)
-        lab["telegram_file_id"] = lab_file["telegram_file_id"] if lab_file else None
-        lab["file_path"] = lab_file["path"] if lab_file else None
+    snapshot = await _load_catalog(
+        connection,
+        CatalogKind.LABS,
+        query="""
+            SELECT lw.id, lw.name, lw.file_id, lw.description, lw.deadline, lw.allow_late,
+                   f.telegram_file_id, f.path AS file_path
+            FROM lab_works lw
+            LEFT JOIN files f ON f.id = lw.file_id
+            ORDER BY lw.id;
+        """
+    )
 
-    return labs
+    if not snapshot.items:
+        logger.warning("No lab works found in table 'lab_works'")
+        return None
 
+    return list(snapshot.items)
 
 
 async def update_lab_work(
@@ -1170,6 +1929,8 @@ async def update_lab_work(
     async with connection.cursor() as cursor:
         await cursor.execute(query, params)
 
+    _invalidate_catalog(connection, CatalogKind.LABS)
+
     logger.info("Lab work %s updated: %s", lab_id, ", ".join(fields))
 
 async def delete_lab_work(
@@ -1184,6 +1945,9 @@ async def delete_lab_work(
             """,
             params=(lab_id,),
         )
+
+    _invalidate_catalog(connection, CatalogKind.LABS)
+
     logger.info("Deleted lab_work id=%s", lab_id)
 
 
@@ -1257,6 +2021,146 @@ async def delete_test_stat(
     logger.info("Deleted test_stat user_id=%s test_id=%s", user_id, test_id)
 
 
+async def add_attempt(
+    connection: AsyncConnection,
+    *,
+    user_id: int,
+    test_id: int,
+) -> int | None:
+    """
+    Начинает попытку прохождения теста. Если незавершённая попытка уже есть, возвращает её id.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                WITH inserted AS (
+                    INSERT INTO attempts(user_id, test_id)
+                    VALUES (%s, %s)
+                    ON CONFLICT (user_id, test_id) WHERE finished_at IS NULL DO NOTHING
+                    RETURNING id
+                )
+                SELECT id FROM inserted
+                UNION ALL
+                SELECT id FROM attempts
+                WHERE user_id = %s AND test_id = %s AND finished_at IS NULL
+                LIMIT 1;
+            """,
+            params=(user_id, test_id, user_id, test_id),
+        )
+        row = await cursor.fetchone()
+    attempt_id = row[0] if row else None
+    logger.info("Attempt started. Table=`%s`, id=%s, user_id=%s, test_id=%s", "attempts", attempt_id, user_id, test_id)
+    return attempt_id
+
+async def get_active_attempt(
+    connection: AsyncConnection,
+    *,
+    user_id: int,
+    test_id: int | None = None,
+) -> dict[str, Any] | None:
+    """
+    Последняя незавершённая попытка пользователя вместе с id отвеченных вопросов и текущим счётом.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT a.id, a.user_id, a.test_id, a.started_at,
+                   COALESCE(
+                       array_agg(aa.question_id ORDER BY aa.question_id) FILTER (WHERE aa.question_id IS NOT NULL),
+                       '{}'
+                   ) AS answered_question_ids,
+                   COUNT(*) FILTER (WHERE aa.is_right) AS score
+            FROM attempts a
+            LEFT JOIN attempt_answers aa ON aa.attempt_id = a.id
+            WHERE a.user_id = %s AND a.finished_at IS NULL AND (%s::int IS NULL OR a.test_id = %s)
+            GROUP BY a.id
+            ORDER BY a.started_at DESC
+            LIMIT 1;
+            """,
+            (user_id, test_id, test_id),
+        )
+        row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        columns = [desc.name for desc in cursor.description]
+        return dict(zip(columns, row))
+
+async def add_attempt_answers(
+    connection: AsyncConnection,
+    *,
+    answers: Sequence[tuple[int, int, int | None, bool, datetime]],
+) -> None:
+    """
+    Пакетная запись ответов (attempt_id, question_id, answer_id, is_right, answered_at) одним запросом.
+    Ответы на удалённые или уже завершённые попытки и на удалённые вопросы отбрасываются,
+    повторные ответы на вопрос игнорируются.
+    """
+    if not answers:
+        return
+
+    attempt_ids, question_ids, answer_ids, flags, answered_at = (list(column) for column in zip(*answers))
+
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                INSERT INTO attempt_answers(attempt_id, question_id, answer_id, is_right, answered_at)
+                SELECT v.attempt_id, v.question_id, an.id, v.is_right, v.answered_at
+                FROM unnest(%s::int[], %s::int[], %s::int[], %s::boolean[], %s::timestamptz[])
+                    AS v(attempt_id, question_id, answer_id, is_right, answered_at)
+                JOIN attempts a ON a.id = v.attempt_id AND a.finished_at IS NULL
+                JOIN questions q ON q.id = v.question_id
+                LEFT JOIN answers an ON an.id = v.answer_id
+                ON CONFLICT (attempt_id, question_id) DO NOTHING;
+            """,
+            params=(attempt_ids, question_ids, answer_ids, flags, answered_at),
+        )
+    logger.info("Saved %d attempt answers", len(answers))
+
+async def finish_attempt(
+    connection: AsyncConnection,
+    *,
+    attempt_id: int,
+) -> int | None:
+    """
+    Завершает попытку: считает балл по attempt_answers и обновляет test_stats,
+    увеличивая attempts_count на стороне БД. Возвращает итоговый балл.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                WITH finished AS (
+                    UPDATE attempts
+                    SET finished_at = NOW(),
+                        score = (
+                            SELECT COUNT(*) FROM attempt_answers
+                            WHERE attempt_id = attempts.id AND is_right
+                        )
+                    WHERE id = %s AND finished_at IS NULL
+                    RETURNING user_id, test_id, score, finished_at
+                )
+                INSERT INTO test_stats(user_id, test_id, last_score, last_submission_time, attempts_count)
+                SELECT user_id, test_id, score, finished_at, 1 FROM finished
+                ON CONFLICT (user_id, test_id) DO UPDATE
+                SET
+                    last_score = EXCLUDED.last_score,
+                    last_submission_time = EXCLUDED.last_submission_time,
+                    attempts_count = COALESCE(test_stats.attempts_count, 0) + 1
+                RETURNING last_score;
+            """,
+            params=(attempt_id,),
+        )
+        row = await cursor.fetchone()
+
+    if not row:
+        logger.warning("Attempt id=%s not found or already finished", attempt_id)
+        return None
+
+    logger.info("Finished attempt id=%s with score=%s", attempt_id, row[0])
+    return row[0]
+
+
 
 async def add_submission(
     connection: AsyncConnection,
@@ -1264,26 +2168,33 @@ async def add_submission(
     user_id: int,
     lab_id: int,
     submission_file_id: int,
-    submitted_at: datetime | None = None,
-    is_late: bool = False,
-    status: SubmissionStatus = SubmissionStatus.UPLOADED,
-    score: int | None = None,
-) -> int | None:
+) -> dict[str, Any] | None:
+    """
+    Добавляет сдачу лабораторной. is_late считается по lab_works.deadline в момент вставки.
+    Если срок прошёл и опоздания запрещены (allow_late = FALSE) или лабораторной нет, возвращает None.
+    """
     async with connection.cursor() as cursor:
         await cursor.execute(
             query="""
-                INSERT INTO submissions(
-                    user_id, lab_id, submission_file_id, submitted_at, is_late, status, score
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id;
+                INSERT INTO submissions(user_id, lab_id, submission_file_id, submitted_at, is_late)
+                SELECT %s, w.id, %s, NOW(), COALESCE(NOW() > w.deadline, FALSE)
+                FROM lab_works w
+                WHERE w.id = %s
+                  AND (w.deadline IS NULL OR NOW() <= w.deadline OR COALESCE(w.allow_late, TRUE))
+                RETURNING id, is_late;
             """,
-            params=(user_id, lab_id, submission_file_id, submitted_at, is_late, status, score),
+            params=(user_id, submission_file_id, lab_id),
         )
         row = await cursor.fetchone()
-    submission_id = row[0] if row else None
-    logger.info("New submission added. Table=`%s`, id=%s, user_id=%s, lab_id=%s", "submissions", submission_id, user_id, lab_id)
-    return submission_id
+
+    if row is None:
+        logger.info("Submission rejected: lab_id=%s not found or closed, user_id=%s", lab_id, user_id)
+        return None
+
+    submission_id, is_late = row
+    logger.info("New submission added. Table=`%s`, id=%s, user_id=%s, lab_id=%s, is_late=%s",
+                "submissions", submission_id, user_id, lab_id, is_late)
+    return {"id": submission_id, "is_late": is_late}
 
 async def get_submission(
     connection: AsyncConnection,
@@ -1335,6 +2246,29 @@ async def get_submissions_by_user(
         logger.info("Fetched submissions: %s", submissions)
         return submissions
 
+async def get_lab_submissions_for_export(
+    connection: AsyncConnection,
+    *,
+    lab_id: int,
+) -> list[dict[str, Any]]:
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT s.id, s.submitted_at, s.is_late, u.surname, u.name,
+                   f.path, f.sha256, f.mime_type, f.file_size
+            FROM submissions s
+            JOIN users u ON u.id = s.user_id
+            JOIN files f ON f.id = s.submission_file_id
+            WHERE s.lab_id = %s
+            ORDER BY u.surname, u.name, s.submitted_at;
+            """,
+            (lab_id,),
+        )
+        rows = await cursor.fetchall()
+
+        columns = [desc.name for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
 async def update_submission(
     connection: AsyncConnection,
     *,
@@ -1474,6 +2408,27 @@ async def get_access_requests(
         return results
 
 
+async def seek_access_request(
+    connection: AsyncConnection,
+    *,
+    current_id: int | None = None,
+    direction: SeekDirection = SeekDirection.FIRST,
+) -> dict[str, Any] | None:
+    rows = await _seek(
+        connection,
+        select="""
+            SELECT id, telegram_id, username, name, surname, patronymic, requested_at
+            FROM access_requests
+        """,
+        current_id=current_id,
+        direction=direction
+    )
+
+    return rows[0] if rows else None
+
+async def count_access_requests(connection: AsyncConnection) -> int:
+    return await _count(connection, table="access_requests")
+
 async def get_access_request(
     connection: AsyncConnection,
     *,
@@ -1499,6 +2454,102 @@ async def get_access_request(
         logger.info("Fetched access requests: %s", results)
         return results
 
+async def add_broadcast(
+    connection: AsyncConnection,
+    *,
+    text: str,
+    admin_chat_id: int | None = None,
+) -> int | None:
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                INSERT INTO broadcasts(text, admin_chat_id)
+                VALUES (%s, %s)
+                RETURNING id;
+            """,
+            params=(text, admin_chat_id),
+        )
+        row = await cursor.fetchone()
+    broadcast_id = row[0] if row else None
+    logger.info("New broadcast added. Table=`%s`, id=%s", "broadcasts", broadcast_id)
+    return broadcast_id
+
+async def claim_broadcast(
+    connection: AsyncConnection,
+    *,
+    owner: str,
+    lease: float,
+) -> dict[str, Any] | None:
+    """
+    Захватывает самую старую незавершённую рассылку, у которой нет владельца или истекла аренда.
+    Параллельные воркеры пропускают заблокированные строки, поэтому одну рассылку
+    не возьмут двое. None, если брать нечего.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                UPDATE broadcasts
+                SET claimed_by = %s,
+                    lease_until = NOW() + %s * INTERVAL '1 second'
+                WHERE id = (
+                    SELECT id
+                    FROM broadcasts
+                    WHERE finished_at IS NULL
+                      AND (lease_until IS NULL OR lease_until < NOW() OR claimed_by = %s)
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, text, admin_chat_id, progress_message_id, last_user_id, total,
+                          sent, blocked, failed, created_at;
+            """,
+            params=(owner, lease, owner),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        columns = [desc.name for desc in cursor.description]
+
+    return dict(zip(columns, row))
+
+async def update_broadcast_progress(
+    connection: AsyncConnection,
+    *,
+    broadcast_id: int,
+    owner: str,
+    lease: float,
+    last_user_id: int | None = None,
+    total: int | None = None,
+    progress_message_id: int | None = None,
+    sent: int = 0,
+    blocked: int = 0,
+    failed: int = 0,
+    finished: bool = False,
+) -> bool:
+    """
+    Чекпоинт рассылки: счётчики увеличиваются на переданные значения, остальные поля
+    обновляются только если переданы, аренда продлевается (или снимается по завершении).
+    Пишет только владелец аренды; False, если рассылку уже перехватил другой воркер.
+    """
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query="""
+                UPDATE broadcasts
+                SET last_user_id = COALESCE(%s, last_user_id),
+                    total = COALESCE(%s, total),
+                    progress_message_id = COALESCE(%s, progress_message_id),
+                    sent = sent + %s,
+                    blocked = blocked + %s,
+                    failed = failed + %s,
+                    finished_at = CASE WHEN %s THEN NOW() ELSE finished_at END,
+                    lease_until = CASE WHEN %s THEN NULL ELSE NOW() + %s * INTERVAL '1 second' END
+                WHERE id = %s AND claimed_by = %s AND finished_at IS NULL;
+            """,
+            params=(last_user_id, total, progress_message_id, sent, blocked, failed, finished,
+                    finished, lease, broadcast_id, owner),
+        )
+        return cursor.rowcount == 1
+
 async def delete_access_request(
     connection: AsyncConnection,
     *,
@@ -0,0 +1,76 @@
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any
+
+from psycopg import AsyncCursor
+
+logger = logging.getLogger(__name__)
+
+QUERY_REPEAT_LIMIT = 5
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    """Один и тот же запрос выполнен за апдейт больше repeat_limit раз (строгий режим профайлера)."""
+
+
+def _normalize(query: Any) -> str:
+    text = query.as_string(None) if hasattr(query, "as_string") else str(query)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryProfile:
+    """
+    Счётчики запросов одного апдейта: число запросов, строк и время в БД.
+    Запрос, повторённый больше repeat_limit раз, считается признаком N+1;
+    в строгом режиме (для тестов) на нём сразу бросается RepeatedQueryError.
+    """
+
+    def __init__(self, repeat_limit: int = QUERY_REPEAT_LIMIT, strict: bool = False):
+        self.repeat_limit = repeat_limit
+        self.strict = strict
+        self.queries = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+        self.router = "unknown"
+        self.handler = "unhandled"
+
+    def record(self, query: Any, seconds: float, rows: int) -> None:
+        statement = _normalize(query)
+        self.queries += 1
+        self.rows += max(rows, 0)
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+        if self.strict and self.repeat_limit and self.statements[statement] > self.repeat_limit:
+            raise RepeatedQueryError(
+                f"Statement executed {self.statements[statement]} times in {self.router}.{self.handler}: {statement}"
+            )
+
+    def repeated(self) -> list[tuple[str, int]]:
+        if not self.repeat_limit:
+            return []
+        return [(statement, count) for statement, count in self.statements.most_common() if count > self.repeat_limit]
+
+
+class ProfiledCursor:
+    """Обёртка над AsyncCursor, записывающая каждый execute в QueryProfile."""
+
+    def __init__(self, cursor: AsyncCursor, profile: QueryProfile):
+        self._cursor = cursor
+        self._profile = profile
+
+    async def execute(self, query: Any, params: Any = None, **kwargs: Any) -> "ProfiledCursor":
+        started_at = time.perf_counter()
+        try:
+            await self._cursor.execute(query, params, **kwargs)
+        finally:
+            self._profile.record(query, time.perf_counter() - started_at, self._cursor.rowcount)
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+FSM_SESSION_TTL = 6 * 60 * 60.0
+FSM_MEMORY_BUDGET = 64 * 1024 * 1024
+FSM_SWEEP_INTERVAL = 60.0
+
+_ENTRY_OVERHEAD = 256
+
+
+@dataclass(slots=True)
+class _Session:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    size: int = _ENTRY_OVERHEAD
+    touched_at: float = 0.0
+
+
+def _estimate_size(state: str | None, data: dict[str, Any]) -> int:
+    try:
+        payload = len(json.dumps(data, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        payload = len(repr(data))
+    return _ENTRY_OVERHEAD + len(state or "") + payload
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    FSM-хранилище в памяти процесса с ограничениями:
+    сессии, к которым не обращались дольше session_ttl, удаляет периодический sweeper,
+    а при превышении memory_budget (оценка в байтах) вытесняются самые давно использованные.
+    Пустые сессии (без состояния и данных) не хранятся вовсе.
+    """
+
+    def __init__(
+            self,
+            session_ttl: float = FSM_SESSION_TTL,
+            memory_budget: int = FSM_MEMORY_BUDGET,
+            sweep_interval: float = FSM_SWEEP_INTERVAL
+    ):
+        if memory_budget < _ENTRY_OVERHEAD:
+            raise ValueError(f"memory_budget must be >= {_ENTRY_OVERHEAD}")
+
+        self.session_ttl = session_ttl
+        self.memory_budget = memory_budget
+        self.sweep_interval = sweep_interval
+        self._sessions: OrderedDict[StorageKey, _Session] = OrderedDict()
+        self._bytes = 0
+        self._evicted_ttl = 0
+        self._evicted_budget = 0
+        self._sweeper: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._sweeper = asyncio.create_task(self._sweep_forever(), name="fsm-session-sweeper")
+        logger.info("FSM session sweeper started (ttl=%.0fs, budget=%d bytes)", self.session_ttl, self.memory_budget)
+
+    def _get(self, key: StorageKey) -> _Session | None:
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+
+        now = time.monotonic()
+        if now - session.touched_at > self.session_ttl:
+            self._drop(key)
+            self._evicted_ttl += 1
+            return None
+
+        session.touched_at = now
+        self._sessions.move_to_end(key)
+        return session
+
+    def _put(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        self._drop(key)
+        if state is None and not data:
+            return
+
+        size = _estimate_size(state, data)
+        self._sessions[key] = _Session(state=state, data=data, size=size, touched_at=time.monotonic())
+        self._bytes += size
+
+        while self._bytes > self.memory_budget and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            self._drop(oldest)
+            self._evicted_budget += 1
+
+    def _drop(self, key: StorageKey) -> None:
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            self._bytes -= session.size
+
+    def sweep(self) -> int:
+        deadline = time.monotonic() - self.session_ttl
+        expired = [key for key, session in self._sessions.items() if session.touched_at < deadline]
+        for key in expired:
+            self._drop(key)
+
+        self._evicted_ttl += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "memory_budget": self.memory_budget,
+            "evicted_ttl": self._evicted_ttl,
+            "evicted_budget": self._evicted_budget,
+        }
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        session = self._get(key)
+        state = state.state if isinstance(state, State) else state
+        self._put(key, state, session.data if session else {})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        session = self._get(key)
+        return session.state if session else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        session = self._get(key)
+        self._put(key, session.state if session else None, data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        session = self._get(key)
+        return session.data.copy() if session else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any | None = None) -> Any | None:
+        session = self._get(storage_key)
+        return copy(session.data.get(dict_key, default)) if session else default
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+        logger.info("FSM memory storage closed: %s", self.stats())
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                expired = self.sweep()
+                logger.debug("FSM sweep removed %d idle sessions: %s", expired, self.stats())
+            except Exception:
+                logger.exception("Unexpected error in FSM session sweeper")
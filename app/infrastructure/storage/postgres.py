@@ -0,0 +1,198 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from copy import deepcopy
+from typing import Any, AsyncIterator
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from psycopg import AsyncConnection
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+
+from app.infrastructure.database.connection import LazyConnection, current_connection
+
+logger = logging.getLogger(__name__)
+
+FSM_CACHE_MAX_SIZE = 10_000
+FSM_CACHE_TTL = 0.0
+
+_KEY_CONDITION = """
+    bot_id = %s AND chat_id = %s AND user_id = %s
+    AND thread_id = %s AND business_connection_id = %s AND destiny = %s
+"""
+
+
+def _key_params(key: StorageKey) -> tuple:
+    return (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id or 0,
+        key.business_connection_id or "",
+        key.destiny
+    )
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_storage: одна строка (state, data JSONB) на ключ бот/чат/пользователь.
+    Внутри DataBaseMiddleware запросы идут через соединение апдейта (current_connection),
+    а не берут из того же пула второе, иначе под нагрузкой апдейты ждут друг друга до PoolTimeout.
+    Запись тогда попадает в транзакцию апдейта и откатывается вместе с ней.
+    По умолчанию кэш чтений выключен (cache_ttl=0): при нескольких процессах бота
+    кэш отдал бы устаревшее состояние, записанное другим процессом. Включать его
+    (LRU с TTL) имеет смысл только при единственном процессе.
+    """
+
+    def __init__(
+            self,
+            pool: AsyncConnectionPool,
+            cache_max_size: int = FSM_CACHE_MAX_SIZE,
+            cache_ttl: float = FSM_CACHE_TTL
+    ):
+        self.pool = pool
+        self.cache_max_size = cache_max_size
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[StorageKey, tuple[float, str | None, dict[str, Any]]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def _cached(self, key: StorageKey) -> tuple[str | None, dict[str, Any]] | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, state, data = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return state, data
+
+    def _remember(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        if self.cache_ttl <= 0:
+            return
+
+        self._cache[key] = (time.monotonic() + self.cache_ttl, state, data)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self.cache_max_size:
+            self._cache.popitem(last=False)
+
+    def _forget_on_rollback(self, connection: AsyncConnection | LazyConnection, key: StorageKey) -> None:
+        call_after_rollback = getattr(connection, "call_after_rollback", None)
+        if call_after_rollback is not None and self.cache_ttl > 0:
+            call_after_rollback(lambda: self._cache.pop(key, None))
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[AsyncConnection | LazyConnection]:
+        connection = current_connection.get()
+        if connection is not None:
+            yield connection
+            return
+
+        async with self.pool.connection() as connection:
+            yield connection
+
+    async def _load(self, key: StorageKey) -> tuple[str | None, dict[str, Any]]:
+        cached = self._cached(key)
+        if cached is not None:
+            self._hits += 1
+            return cached
+
+        self._misses += 1
+
+        async with self._connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    f"SELECT state, data FROM fsm_storage WHERE {_KEY_CONDITION};",
+                    _key_params(key),
+                )
+                row = await cursor.fetchone()
+
+        state, data = (row[0], row[1] or {}) if row else (None, {})
+        self._remember(key, state, data)
+
+        return state, data
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+
+        async with self._connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                    INSERT INTO fsm_storage(bot_id, chat_id, user_id, thread_id, business_connection_id, destiny, state)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny) DO UPDATE
+                    SET state = EXCLUDED.state, updated_at = NOW()
+                    RETURNING data;
+                    """,
+                    (*_key_params(key), state),
+                )
+                row = await cursor.fetchone()
+            self._forget_on_rollback(connection, key)
+
+        self._remember(key, state, row[0] if row and row[0] else {})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        data = deepcopy(data)
+
+        async with self._connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                    INSERT INTO fsm_storage(bot_id, chat_id, user_id, thread_id, business_connection_id, destiny, data)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny) DO UPDATE
+                    SET data = EXCLUDED.data, updated_at = NOW()
+                    RETURNING state;
+                    """,
+                    (*_key_params(key), Jsonb(data)),
+                )
+                row = await cursor.fetchone()
+            self._forget_on_rollback(connection, key)
+
+        self._remember(key, row[0] if row else None, data)
+
+    async def set_state_and_data(self, key: StorageKey, state: StateType, data: dict[str, Any]) -> None:
+        """state и data одним upsert'ом (используется BufferedFSMContext.flush)."""
+        state = state.state if isinstance(state, State) else state
+        data = deepcopy(data)
+
+        async with self._connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                    INSERT INTO fsm_storage(bot_id, chat_id, user_id, thread_id, business_connection_id, destiny, state, data)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny) DO UPDATE
+                    SET state = EXCLUDED.state, data = EXCLUDED.data, updated_at = NOW();
+                    """,
+                    (*_key_params(key), state, Jsonb(data)),
+                )
+            self._forget_on_rollback(connection, key)
+
+        self._remember(key, state, data)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(key)
+        return deepcopy(data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "cached_sessions": len(self._cache),
+            "cache_hits": self._hits,
+            "cache_misses": self._misses,
+        }
+
+    async def close(self) -> None:
+        self._cache.clear()
+        logger.info("Postgres FSM storage closed")
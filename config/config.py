@@ -7,6 +7,16 @@ logger = logging.getLogger(__name__)
 class BotSettings(BaseModel):
     token: str
     super_admin_ids: list[int]
+    mode: str
+    api_url: str | None = None
+
+class WebhookSettings(BaseModel):
+    url: str
+    path: str
+    secret: str
+    host: str
+    port: int
+    max_connections: int
 
 class DataBaseSettings(BaseModel):
     name: str
@@ -14,6 +24,19 @@ class DataBaseSettings(BaseModel):
     port: int
     user: str
     password: str
+    query_repeat_limit: int
+    strict_queries: bool
+
+class FsmSettings(BaseModel):
+    storage: str
+    cache_ttl: float
+    session_ttl: float
+    memory_budget: int
+
+class MetricsSettings(BaseModel):
+    host: str
+    port: int
+    path: str
 
 class LoggingSetting(BaseModel):
     level: str
@@ -22,6 +45,9 @@ class LoggingSetting(BaseModel):
 class Config(BaseModel):
     bot: BotSettings
     db: DataBaseSettings
+    webhook: WebhookSettings | None = None
+    fsm: FsmSettings
+    metrics: MetricsSettings | None = None
     log: LoggingSetting
 
 def load_config(path: str | None = None) -> Config:
@@ -40,19 +66,66 @@ def load_config(path: str | None = None) -> Config:
     except ValueError as err:
         raise ValueError(f"SUPER_ADMIN_IDS must be the list of integers, got {raw_ids} insted") from err
 
+    mode: str = env("BOT_MODE", default="polling").lower()
+
+    if mode not in ("polling", "webhook"):
+        raise ValueError(f"BOT_MODE must be 'polling' or 'webhook', got {mode} instead")
+
     bot = BotSettings(
         token = token,
-        super_admin_ids = super_admin_ids
+        super_admin_ids = super_admin_ids,
+        mode = mode,
+        api_url = env("BOT_API_URL", default=None) or None
     )
 
+    webhook = None
+    if mode == "webhook":
+        secret: str = env("WEBHOOK_SECRET", default="")
+
+        if not secret:
+            raise ValueError("WEBHOOK_SECRET must not be empty in webhook mode")
+
+        webhook = WebhookSettings(
+            url = env("WEBHOOK_URL"),
+            path = env("WEBHOOK_PATH", default="/webhook"),
+            secret = secret,
+            host = env("WEBHOOK_HOST", default="0.0.0.0"),
+            port = env.int("WEBHOOK_PORT", default=8080),
+            max_connections = env.int("WEBHOOK_MAX_CONNECTIONS", default=40)
+        )
+
     db = DataBaseSettings(
         name = env("POSTGRES_DB"),
         host = env("POSTGRES_HOST"),
         port = env.int("POSTGRES_PORT"),
         user = env("POSTGRES_USER"),
-        password = env("POSTGRES_PASSWORD")
+        password = env("POSTGRES_PASSWORD"),
+        query_repeat_limit = env.int("DB_QUERY_REPEAT_LIMIT", default=5),
+        strict_queries = env.bool("DB_QUERY_STRICT", default=False)
     )
 
+    fsm_storage: str = env("FSM_STORAGE", default="memory").lower()
+
+    if fsm_storage not in ("memory", "postgres"):
+        raise ValueError(f"FSM_STORAGE must be 'memory' or 'postgres', got {fsm_storage} instead")
+
+    fsm = FsmSettings(
+        storage = fsm_storage,
+        cache_ttl = env.float("FSM_CACHE_TTL", default=0.0),
+        session_ttl = env.float("FSM_SESSION_TTL", default=6 * 60 * 60.0),
+        memory_budget = env.int("FSM_MEMORY_BUDGET", default=64 * 1024 * 1024)
+    )
+
+    metrics = None
+    metrics_port: int = env.int("METRICS_PORT", default=0)
+
+    if metrics_port:
+        metrics = MetricsSettings(
+            host = env("METRICS_HOST", default="127.0.0.1"),
+            port = metrics_port,
+            path = env("METRICS_PATH", default="/metrics")
+        )
+
     log = LoggingSetting(
         level = env("LOG_LEVEL"),
         format = env("LOG_FORMAT")
@@ -63,5 +136,8 @@ def load_config(path: str | None = None) -> Config:
     return Config(
         bot = bot,
         db = db,
+        webhook = webhook,
+        fsm = fsm,
+        metrics = metrics,
         log = log
     )
\ No newline at end of file
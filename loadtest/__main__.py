@@ -0,0 +1,4 @@
+from loadtest.loadtest import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+FAKE_BOT_ID = 100500
+
+# Методы, которые в ответ возвращают отправленное или изменённое сообщение.
+MESSAGE_METHODS = frozenset({
+    "sendMessage", "sendDocument", "sendPhoto", "sendVideo", "sendAudio", "sendAnimation", "sendVoice",
+    "sendSticker", "forwardMessage", "editMessageText", "editMessageCaption", "editMessageMedia",
+    "editMessageReplyMarkup",
+})
+
+
+@dataclass
+class FakeMessage:
+    message_id: int
+    text: str
+    buttons: list[tuple[str, str]]
+
+    def as_dict(self, chat_id: int) -> dict[str, Any]:
+        return {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "loadtest"},
+            "text": self.text,
+        }
+
+
+@dataclass
+class FakeChat:
+    """Что «видит» пользователь в чате: последние сообщения бота и их inline-кнопки."""
+    chat_id: int
+    last_message_id: int = 0
+    messages: dict[int, FakeMessage] = field(default_factory=dict)
+
+    def next_message_id(self) -> int:
+        self.last_message_id += 1
+        return self.last_message_id
+
+    def find_buttons(self, prefix: str) -> tuple[FakeMessage, list[str]] | None:
+        """Самое свежее сообщение с кнопками, callback_data которых начинается с prefix."""
+        for message_id in sorted(self.messages, reverse=True):
+            message = self.messages[message_id]
+            matching = [data for _, data in message.buttons if data.startswith(prefix)]
+            if matching:
+                return message, matching
+        return None
+
+
+def _inline_buttons(reply_markup: str | None) -> list[tuple[str, str]]:
+    if not reply_markup:
+        return []
+    markup = json.loads(reply_markup)
+    return [
+        (button.get("text", ""), button["callback_data"])
+        for row in markup.get("inline_keyboard", [])
+        for button in row
+        if "callback_data" in button
+    ]
+
+
+class FakeBotApi:
+    """
+    Локальный заменитель Bot API для нагрузочного стенда: отвечает на любые методы
+    с заданной задержкой и запоминает сообщения с клавиатурами, чтобы виртуальные
+    пользователи могли «нажимать» настоящие кнопки бота.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, max_messages_per_chat: int = 20):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_messages_per_chat = max_messages_per_chat
+        self.chats: dict[int, FakeChat] = {}
+        self.calls: Counter[str] = Counter()
+        self._runner: web.AppRunner | None = None
+
+    def chat(self, chat_id: int) -> FakeChat:
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = FakeChat(chat_id)
+        return chat
+
+    async def start(self, host: str, port: int) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+
+        url = f"http://{host}:{port}"
+        logger.info("Fake Bot API listening at %s (latency %.0f±%.0f ms)", url, self.latency * 1000, self.jitter * 1000)
+        return url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "loadtest", "username": "loadtest_bot"}
+
+        chat_id = params.get("chat_id")
+        if chat_id is None or not str(chat_id).lstrip("-").isdigit():
+            return True
+        chat = self.chat(int(chat_id))
+
+        if method == "deleteMessage":
+            chat.messages.pop(int(params.get("message_id", 0)), None)
+            return True
+
+        if method not in MESSAGE_METHODS:
+            return True
+
+        text = str(params.get("text") or params.get("caption") or "")
+        buttons = _inline_buttons(params.get("reply_markup"))
+
+        if method.startswith("edit"):
+            message_id = int(params.get("message_id", 0))
+            message = chat.messages.get(message_id) or FakeMessage(message_id, text, [])
+            message.text = text or message.text
+            message.buttons = buttons
+        else:
+            message = FakeMessage(chat.next_message_id(), text, buttons)
+
+        chat.messages[message.message_id] = message
+        while len(chat.messages) > self.max_messages_per_chat:
+            chat.messages.pop(min(chat.messages))
+
+        return message.as_dict(chat.chat_id)
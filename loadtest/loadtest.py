@@ -0,0 +1,354 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.enums import ParseMode
+from aiogram.types import Update
+from psycopg_pool import AsyncConnectionPool
+
+from app.bot.attempts.attempts import AttemptAnswerBuffer
+from app.bot.bot import create_storage, setup_dispatcher
+from app.bot.broadcast.broadcast import Broadcaster
+from app.bot.export.export import SubmissionExporter
+from app.bot.middlewares.bot_api import BotApiMetricsMiddleware
+from app.bot.middlewares.callback_answer import CallbackAnswerGuard
+from app.bot.outbox.outbox import OutboxSender
+from app.bot.scheduler.scheduler import DelayedScheduler
+from app.bot.submissions.submissions import SubmissionDownloader
+from app.bot.throttling.throttling import SendScheduler, ThrottledSession
+from app.infrastructure.database.connection import get_psql_pool
+from config.config import Config, load_config
+from loadtest.fake_api import FAKE_BOT_ID, FakeBotApi
+from loadtest.scenarios import VirtualUser, browse_lectures, page_carousels, take_test
+from loadtest.seed import admin_ids, seed, student_ids
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ("lectures", "tests", "carousels")
+RESULTS_DIR = os.path.join("loadtest", "results")
+UNLIMITED_RATE = 1e9
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit.stdout.strip() + ("-dirty" if status.stdout.strip() else "")
+
+
+class ScenarioRecorder:
+    """Латентность каждого апдейта сценария (от feed_update до возврата) и исходы обработки."""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.unhandled = 0
+
+    def summary(self, duration: float, pool_stats: dict[str, int], api_calls: dict[str, int]) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        requests = pool_stats.get("requests_num", 0)
+        wait_ms = pool_stats.get("requests_wait_ms", 0)
+
+        return {
+            "updates": len(latencies),
+            "errors": self.errors,
+            "unhandled": self.unhandled,
+            "duration_s": round(duration, 3),
+            "updates_per_s": round(len(latencies) / duration, 2) if duration else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+                "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+            "pool": {
+                "requests": requests,
+                "queued": pool_stats.get("requests_queued", 0),
+                "errors": pool_stats.get("requests_errors", 0),
+                "wait_ms_total": wait_ms,
+                "wait_ms_mean": round(wait_ms / requests, 3) if requests else 0.0,
+                "usage_ms_total": pool_stats.get("usage_ms", 0),
+            },
+            "bot_api_calls": dict(sorted(api_calls.items())),
+        }
+
+
+class Harness:
+    """Настоящий диспетчер бота, которому апдейты подаются напрямую через feed_update."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, api: FakeBotApi):
+        self.dp = dp
+        self.bot = bot
+        self.api = api
+        self.recorders: dict[str, ScenarioRecorder] = {}
+        self._update_id = 0
+
+    def next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    async def feed(self, scenario: str, payload: dict[str, Any]) -> None:
+        recorder = self.recorders.setdefault(scenario, ScenarioRecorder())
+        update = Update.model_validate({"update_id": self.next_update_id(), **payload}, context={"bot": self.bot})
+
+        started_at = time.perf_counter()
+        try:
+            result = await self.dp.feed_update(self.bot, update)
+        except Exception:
+            recorder.errors += 1
+            logger.exception("Update %d failed in scenario %s", update.update_id, scenario)
+        else:
+            if result is UNHANDLED:
+                recorder.unhandled += 1
+        finally:
+            recorder.latencies.append(time.perf_counter() - started_at)
+
+
+def _scenario_runs(harness: Harness, options: argparse.Namespace) -> dict[str, Callable[[], Awaitable[Any]]]:
+    def users(name: str, telegram_ids: list[int]) -> list[VirtualUser]:
+        return [VirtualUser(harness, telegram_id, name) for telegram_id in telegram_ids]
+
+    return {
+        "lectures": lambda: asyncio.gather(*(
+            browse_lectures(user, rounds=options.rounds, downloads=options.downloads, think=options.think)
+            for user in users("lectures", student_ids(options.students))
+        )),
+        "tests": lambda: asyncio.gather(*(
+            take_test(user, think=options.test_think)
+            for user in users("tests", student_ids(options.students))
+        )),
+        "carousels": lambda: asyncio.gather(*(
+            page_carousels(user, pages=options.pages, think=options.think)
+            for user in users("carousels", admin_ids(options.admins))
+        )),
+    }
+
+
+async def run(options: argparse.Namespace, config: Config) -> dict[str, Any]:
+    api = FakeBotApi(latency=options.api_latency, jitter=options.api_jitter)
+    api_url = await api.start(options.api_host, options.api_port)
+
+    db_pool: AsyncConnectionPool = await get_psql_pool(
+        name=config.db.name,
+        host=config.db.host,
+        port=config.db.port,
+        user=config.db.user,
+        password=config.db.password,
+        max_size=options.pool_size,
+    )
+
+    await seed(
+        db_pool,
+        students=options.students,
+        admins=options.admins,
+        lectures=options.lectures,
+        labs=options.labs,
+        tests=options.tests,
+        questions=options.questions,
+        answers=options.answers
+    )
+
+    storage = create_storage(config, db_pool)
+
+    if options.no_throttle:
+        session = ThrottledSession(scheduler=SendScheduler(
+            global_rate=UNLIMITED_RATE,
+            private_chat_rate=UNLIMITED_RATE,
+            private_chat_burst=UNLIMITED_RATE,
+            group_chat_rate=UNLIMITED_RATE
+        ))
+    else:
+        session = ThrottledSession()
+    session.api = TelegramAPIServer.from_base(api_url)
+    session.middleware(BotApiMetricsMiddleware())
+    session.middleware(CallbackAnswerGuard())
+
+    bot = Bot(token=f"{FAKE_BOT_ID}:loadtest", session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+    outbox_sender = OutboxSender()
+    outbox_sender.start(bot)
+
+    dp = setup_dispatcher(config, storage, outbox_sender)
+
+    attempt_buffer = AttemptAnswerBuffer(db_pool)
+    attempt_buffer.start()
+
+    scheduler = DelayedScheduler()
+    scheduler.start(bot)
+
+    submission_exporter = SubmissionExporter()
+
+    # Рассыльщик и загрузчик сдач в сценариях не участвуют и не запускаются,
+    # чтобы их фоновые запросы не попадали в статистику пула.
+    dp.workflow_data.update(
+        db_pool=db_pool,
+        attempt_buffer=attempt_buffer,
+        broadcaster=Broadcaster(db_pool),
+        scheduler=scheduler,
+        submission_downloader=SubmissionDownloader(db_pool),
+        submission_exporter=submission_exporter,
+        admin_ids=config.bot.super_admin_ids
+    )
+
+    harness = Harness(dp, bot, api)
+    runs = _scenario_runs(harness, options)
+    selected = SCENARIOS if options.scenario == "all" else (options.scenario,)
+    results: dict[str, Any] = {}
+
+    try:
+        for name in selected:
+            logger.info("Running scenario %s...", name)
+            db_pool.pop_stats()
+            api.calls.clear()
+
+            started_at = time.perf_counter()
+            await runs[name]()
+            duration = time.perf_counter() - started_at
+
+            results[name] = harness.recorders.setdefault(name, ScenarioRecorder()).summary(
+                duration, db_pool.pop_stats(), dict(api.calls)
+            )
+    finally:
+        await submission_exporter.close()
+        await scheduler.stop()
+        await outbox_sender.stop()
+        await attempt_buffer.stop()
+        await storage.close()
+        await bot.session.close()
+        await db_pool.close()
+        await api.stop()
+
+    return {
+        "commit": _git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fsm_storage": config.fsm.storage,
+        "options": vars(options),
+        "scenarios": results,
+    }
+
+
+def save_report(report: dict[str, Any], path: str | None = None) -> str:
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{report['commit']}.json")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return path
+
+
+def _delta(result: dict[str, Any], previous: dict[str, Any] | None, *path: str) -> str:
+    """Изменение метрики по пути path относительно прошлого прогона, например « (+12.5%)»."""
+    if previous is None:
+        return ""
+
+    current_value, previous_value = result, previous
+    for key in path:
+        current_value, previous_value = current_value[key], previous_value.get(key, {})
+    if not previous_value:
+        return ""
+
+    return f" ({(current_value - previous_value) / previous_value * 100:+.1f}%)"
+
+
+def format_report(report: dict[str, Any], baseline: dict[str, Any] | None = None) -> str:
+    lines = [f"Commit {report['commit']}, FSM storage {report['fsm_storage']}"]
+    if baseline is not None:
+        lines.append(f"Baseline {baseline['commit']} from {baseline['started_at']}")
+
+    for name, result in report["scenarios"].items():
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        latency = result["latency_ms"]
+        pool = result["pool"]
+
+        lines.append(
+            f"\n[{name}] {result['updates']} updates in {result['duration_s']:.1f}s, "
+            f"errors {result['errors']}, unhandled {result['unhandled']}"
+        )
+        lines.append(f"  throughput  {result['updates_per_s']:.1f} updates/s"
+                     f"{_delta(result, previous, 'updates_per_s')}")
+        for q in ("p50", "p95", "p99"):
+            lines.append(f"  latency {q} {latency[q]:.1f} ms{_delta(result, previous, 'latency_ms', q)}")
+        lines.append(
+            f"  pool wait   {pool['wait_ms_mean']:.2f} ms/request, {pool['wait_ms_total']} ms total, "
+            f"{pool['queued']}/{pool['requests']} queued{_delta(result, previous, 'pool', 'wait_ms_mean')}"
+        )
+        lines.append("  bot api     " + ", ".join(f"{m}={c}" for m, c in result["bot_api_calls"].items()))
+
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Нагрузочный стенд: настоящий Dispatcher бота, локальный фейковый Bot API и локальный Postgres."
+    )
+    parser.add_argument("--scenario", choices=(*SCENARIOS, "all"), default="all")
+    parser.add_argument("--students", type=int, default=200, help="виртуальных студентов")
+    parser.add_argument("--admins", type=int, default=10, help="виртуальных преподавателей")
+    parser.add_argument("--rounds", type=int, default=3, help="раз открыть список лекций (lectures)")
+    parser.add_argument("--downloads", type=int, default=3, help="скачиваний за раз (lectures)")
+    parser.add_argument("--pages", type=int, default=15, help="перелистываний каждой карусели (carousels)")
+    parser.add_argument("--think", type=float, default=1.0, help="макс. пауза пользователя между действиями, с")
+    parser.add_argument("--test-think", type=float, default=0.2, help="макс. пауза между ответами в тесте, с")
+    parser.add_argument("--lectures", type=int, default=30)
+    parser.add_argument("--labs", type=int, default=15)
+    parser.add_argument("--tests", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=10, help="вопросов в тесте")
+    parser.add_argument("--answers", type=int, default=4, help="вариантов в вопросе")
+    parser.add_argument("--pool-size", type=int, default=10, help="max_size пула соединений, как у бота")
+    parser.add_argument("--api-host", default="127.0.0.1")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="задержка ответа фейкового Bot API, с")
+    parser.add_argument("--api-jitter", type=float, default=0.02, help="разброс задержки, с")
+    parser.add_argument("--no-throttle", action="store_true",
+                        help="не ограничивать отправки лимитами Telegram (замер только хендлеров и БД)")
+    parser.add_argument("--output", help="куда сохранить JSON с результатами (по умолчанию loadtest/results/)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    options = parse_args(argv)
+    config = load_config()
+
+    logging.basicConfig(
+        level=logging.getLevelName(level=config.log.level),
+        format=config.log.format
+    )
+    # aiogram пишет строку на каждый апдейт; на тысячах апдейтов это шум и лишняя нагрузка.
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = asyncio.run(run(options, config))
+    path = save_report(report, options.output)
+
+    print(format_report(report, baseline))
+    print(f"\nResults saved to {path}")
@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, Any
+
+from loadtest.fake_api import FakeChat
+
+if TYPE_CHECKING:
+    from loadtest.loadtest import Harness
+
+# (кнопка меню, кнопка выбора, элемент карусели) для каруселей в «Редактирование материала».
+MEDIA_CAROUSELS = (
+    ("lectures_click", "lectures_select_click", "lecture"),
+    ("labs_click", "labs_select_click", "lab"),
+    ("tests_click", "tests_select_click", "test"),
+)
+
+
+def _direction() -> str:
+    """Листают чаще вперёд, иногда возвращаясь назад."""
+    return random.choices(("next", "prev"), weights=(3, 1))[0]
+
+
+class VirtualUser:
+    """Пользователь Telegram, который пишет боту и нажимает кнопки из его последних сообщений."""
+
+    def __init__(self, harness: "Harness", telegram_id: int, scenario: str):
+        self.harness = harness
+        self.telegram_id = telegram_id
+        self.scenario = scenario
+        self.chat: FakeChat = harness.api.chat(telegram_id)
+
+    def _user(self) -> dict[str, Any]:
+        return {"id": self.telegram_id, "is_bot": False, "first_name": "Нагрузка", "username": f"lt{self.telegram_id}"}
+
+    def _chat(self) -> dict[str, Any]:
+        return {"id": self.telegram_id, "type": "private"}
+
+    async def send_text(self, text: str) -> None:
+        await self.harness.feed(self.scenario, {
+            "message": {
+                "message_id": self.chat.next_message_id(),
+                "date": int(time.time()),
+                "chat": self._chat(),
+                "from": self._user(),
+                "text": text,
+            }
+        })
+
+    async def click(self, prefix: str) -> bool:
+        """Нажимает случайную кнопку с callback_data, начинающейся с prefix. False, если такой кнопки нет."""
+        found = self.chat.find_buttons(prefix)
+        if found is None:
+            return False
+
+        message, matching = found
+        await self.harness.feed(self.scenario, {
+            "callback_query": {
+                "id": str(self.harness.next_update_id()),
+                "from": self._user(),
+                "chat_instance": str(self.telegram_id),
+                "data": random.choice(matching),
+                "message": message.as_dict(self.telegram_id),
+            }
+        })
+        return True
+
+    async def pause(self, think: float) -> None:
+        if think > 0:
+            await asyncio.sleep(random.uniform(0, think))
+
+
+async def browse_lectures(user: VirtualUser, *, rounds: int, downloads: int, think: float) -> None:
+    """Студент открывает список лекций и скачивает несколько случайных."""
+    await user.pause(think)
+    for _ in range(rounds):
+        await user.send_text("Лекции")
+        for _ in range(downloads):
+            await user.pause(think)
+            if not await user.click("download_lecture:"):
+                break
+        await user.pause(think)
+
+
+async def take_test(user: VirtualUser, *, think: float) -> None:
+    """Студент сразу открывает тесты и проходит случайный до конца; все студенты стартуют одновременно."""
+    await user.send_text("Тесты")
+    if not await user.click("start_test:"):
+        return
+
+    while True:
+        await user.pause(think)
+        if not await user.click("answer:"):
+            break
+
+
+async def page_carousels(user: VirtualUser, *, pages: int, think: float) -> None:
+    """Преподаватель листает карусели лекций, лабораторных, тестов и пользователей."""
+    for section, select, item in MEDIA_CAROUSELS:
+        await user.send_text("Редактирование материала")
+        await user.pause(think)
+        if not await user.click(section) or not await user.click(select):
+            continue
+
+        for _ in range(pages):
+            await user.pause(think)
+            await user.click(f"{_direction()}_{item}_click")
+
+    await user.send_text("Контроль активности студентов")
+    await user.pause(think)
+    if await user.click("ban_user_click"):
+        for _ in range(pages):
+            await user.pause(think)
+            await user.click(f"{_direction()}_ban_click")
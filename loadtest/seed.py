@@ -0,0 +1,94 @@
+import logging
+
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+import app.infrastructure.database.db as db_func
+from app.bot.enums.enums import UserRole
+
+logger = logging.getLogger(__name__)
+
+STUDENT_ID_BASE = 7_000_000_000
+ADMIN_ID_BASE = 7_100_000_000
+SEED_PREFIX = "[loadtest]"
+
+
+def student_ids(count: int) -> list[int]:
+    return [STUDENT_ID_BASE + i for i in range(count)]
+
+
+def admin_ids(count: int) -> list[int]:
+    return [ADMIN_ID_BASE + i for i in range(count)]
+
+
+async def _count_seeded(connection: AsyncConnection, table: str) -> int:
+    async with connection.cursor() as cursor:
+        await cursor.execute(
+            query=f"SELECT COUNT(*) FROM {table} WHERE name LIKE %s;",
+            params=(f"{SEED_PREFIX}%",)
+        )
+        row = await cursor.fetchone()
+    return row[0]
+
+
+async def _seed_users(connection: AsyncConnection, telegram_ids: list[int], role: UserRole) -> None:
+    async with connection.cursor() as cursor:
+        await cursor.executemany(
+            query="""
+                INSERT INTO users(telegram_id, username, name, surname, role)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (telegram_id) DO UPDATE
+                    SET role = EXCLUDED.role, is_banned = FALSE, is_alive = TRUE;
+            """,
+            params_seq=[
+                (telegram_id, f"lt_{role.value}_{i}", "Нагрузка", f"{role.value.capitalize()}{i}", role.value)
+                for i, telegram_id in enumerate(telegram_ids)
+            ]
+        )
+
+
+async def seed(
+        pool: AsyncConnectionPool,
+        *,
+        students: int,
+        admins: int,
+        lectures: int,
+        labs: int,
+        tests: int,
+        questions: int,
+        answers: int
+) -> None:
+    """
+    Наполняет базу стенда: пользователи из зарезервированных диапазонов telegram_id
+    и недостающие до нужного числа лекции, лабораторные и тесты с префиксом SEED_PREFIX.
+    Повторный запуск ничего не дублирует.
+    """
+    async with pool.connection() as connection:
+        await _seed_users(connection, student_ids(students), UserRole.STUDENT)
+        await _seed_users(connection, admin_ids(admins), UserRole.ADMIN)
+
+        for i in range(await _count_seeded(connection, "lectures"), lectures):
+            file_id = await db_func.add_file(
+                connection, file_type="lecture", telegram_file_id=f"loadtest-lecture-{i}",
+                file_unique_id=f"loadtest-lecture-{i}", file_size=1024, mime_type="application/pdf"
+            )
+            await db_func.add_lecture(connection, name=f"{SEED_PREFIX} Лекция {i + 1}", file_id=file_id)
+
+        for i in range(await _count_seeded(connection, "lab_works"), labs):
+            file_id = await db_func.add_file(
+                connection, file_type="lab", telegram_file_id=f"loadtest-lab-{i}",
+                file_unique_id=f"loadtest-lab-{i}", file_size=1024, mime_type="application/pdf"
+            )
+            await db_func.add_lab_work(connection, file_id=file_id, name=f"{SEED_PREFIX} Лабораторная {i + 1}",
+                                       description="Создано нагрузочным стендом")
+
+        for i in range(await _count_seeded(connection, "tests"), tests):
+            test_id = await db_func.add_test(connection, name=f"{SEED_PREFIX} Тест {i + 1}")
+            for q in range(questions):
+                question_id = await db_func.add_question(connection, test_id=test_id, text=f"Вопрос {q + 1}")
+                for a in range(answers):
+                    await db_func.add_answer(connection, question_id=question_id, text=f"Вариант {a + 1}",
+                                             is_right=a == 0)
+
+    logger.info("Seeded %d students, %d admins, %d lectures, %d labs, %d tests",
+                students, admins, lectures, labs, tests)
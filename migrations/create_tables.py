@@ -50,10 +50,33 @@ async def main():
                                     type VARCHAR(20) NOT NULL
                                         CONSTRAINT type_check CHECK (type in ('lecture', 'lab', 'submission')),
                                     telegram_file_id VARCHAR NOT NULL,
+                                    file_unique_id VARCHAR,
+                                    file_size BIGINT,
+                                    mime_type VARCHAR,
+                                    sha256 VARCHAR(64),
+                                    download_failed_at TIMESTAMPTZ,
                                     path VARCHAR
                                 );
                             """
                     )
+                    await cursor.execute(
+                        query=
+                        """
+                            ALTER TABLE files
+                                ADD COLUMN IF NOT EXISTS file_unique_id VARCHAR,
+                                ADD COLUMN IF NOT EXISTS file_size BIGINT,
+                                ADD COLUMN IF NOT EXISTS mime_type VARCHAR,
+                                ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64),
+                                ADD COLUMN IF NOT EXISTS download_failed_at TIMESTAMPTZ;
+
+                            CREATE UNIQUE INDEX IF NOT EXISTS idx_files_unique_id_type
+                                ON files (file_unique_id, type);
+
+                            DROP INDEX IF EXISTS idx_files_pending_submissions;
+                            CREATE INDEX idx_files_pending_submissions
+                                ON files (id) WHERE type = 'submission' AND sha256 IS NULL AND download_failed_at IS NULL;
+                        """
+                    )
                     await cursor.execute(
                         query=
                         """
@@ -62,6 +85,9 @@ async def main():
                                 name VARCHAR NOT NULL,
                                 file_id INT NOT NULL REFERENCES files(id) ON DELETE RESTRICT
                             );
+
+                            CREATE INDEX IF NOT EXISTS idx_lectures_file_id
+                                ON lectures (file_id);
                         """
                     )
                     await cursor.execute(
@@ -108,6 +134,9 @@ async def main():
                                 deadline TIMESTAMPTZ,
                                 allow_late BOOLEAN DEFAULT TRUE
                             );
+
+                            CREATE INDEX IF NOT EXISTS idx_lab_works_file_id
+                                ON lab_works (file_id);
                         """
                     )
                     await cursor.execute(
@@ -127,6 +156,37 @@ async def main():
                                 ON test_stats (user_id, test_id);
                         """
                     )
+                    await cursor.execute(
+                        query=
+                        """
+                            CREATE TABLE IF NOT EXISTS attempts(
+                                id SERIAL PRIMARY KEY,
+                                user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                                test_id INT NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+                                started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                                finished_at TIMESTAMPTZ,
+                                score INT
+                                    CONSTRAINT attempt_score_non_neg CHECK (score IS NULL OR score >= 0)
+                            );
+
+                            CREATE UNIQUE INDEX IF NOT EXISTS idx_attempts_active_user_test
+                                ON attempts (user_id, test_id) WHERE finished_at IS NULL;
+                        """
+                    )
+                    await cursor.execute(
+                        query=
+                        """
+                            CREATE TABLE IF NOT EXISTS attempt_answers(
+                                attempt_id INT NOT NULL REFERENCES attempts(id) ON DELETE CASCADE,
+                                question_id INT NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+                                answer_id INT REFERENCES answers(id) ON DELETE SET NULL,
+                                is_right BOOLEAN NOT NULL DEFAULT FALSE,
+                                answered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+                                PRIMARY KEY (attempt_id, question_id)
+                            );
+                        """
+                    )
                     await cursor.execute(
                         query=
                         """
@@ -142,6 +202,12 @@ async def main():
                                 score INT
                                     CONSTRAINT score_non_neg CHECK (score IS NULL OR score >= 0)
                             );
+
+                            CREATE INDEX IF NOT EXISTS idx_submissions_file_id
+                                ON submissions (submission_file_id);
+
+                            CREATE INDEX IF NOT EXISTS idx_submissions_lab_id
+                                ON submissions (lab_id);
                         """
                     )
                     await cursor.execute(
@@ -160,6 +226,48 @@ async def main():
                             );
                         """
                     )
+                    await cursor.execute(
+                        query=
+                        """
+                            CREATE TABLE IF NOT EXISTS fsm_storage(
+                                bot_id BIGINT NOT NULL,
+                                chat_id BIGINT NOT NULL,
+                                user_id BIGINT NOT NULL,
+                                thread_id BIGINT NOT NULL DEFAULT 0,
+                                business_connection_id VARCHAR NOT NULL DEFAULT '',
+                                destiny VARCHAR NOT NULL DEFAULT 'default',
+                                state VARCHAR,
+                                data JSONB NOT NULL DEFAULT '{}',
+                                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+                                PRIMARY KEY (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+                            );
+                        """
+                    )
+                    await cursor.execute(
+                        query=
+                        """
+                            CREATE TABLE IF NOT EXISTS broadcasts(
+                                id SERIAL PRIMARY KEY,
+                                text VARCHAR NOT NULL,
+                                admin_chat_id BIGINT,
+                                progress_message_id BIGINT,
+                                last_user_id INT NOT NULL DEFAULT 0,
+                                total INT,
+                                sent INT NOT NULL DEFAULT 0,
+                                blocked INT NOT NULL DEFAULT 0,
+                                failed INT NOT NULL DEFAULT 0,
+                                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                                finished_at TIMESTAMPTZ,
+                                claimed_by VARCHAR,
+                                lease_until TIMESTAMPTZ
+                            );
+
+                            ALTER TABLE broadcasts
+                                ADD COLUMN IF NOT EXISTS claimed_by VARCHAR,
+                                ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+                        """
+                    )
                     logger.info("All tables were successfully created")
     except Error:
         logger.exception("Database-specific error during initialization")
@@ -16,15 +16,29 @@ CREATE TABLE IF NOT EXISTS files(
     type VARCHAR(20) NOT NULL
         CONSTRAINT type_check CHECK (type in ('lecture', 'lab', 'submission')),
     telegram_file_id VARCHAR NOT NULL,
+    file_unique_id VARCHAR,
+    file_size BIGINT,
+    mime_type VARCHAR,
+    sha256 VARCHAR(64),
+    download_failed_at TIMESTAMPTZ,
     path VARCHAR NOT NULL
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_files_unique_id_type
+    ON files (file_unique_id, type);
+
+CREATE INDEX IF NOT EXISTS idx_files_pending_submissions
+    ON files (id) WHERE type = 'submission' AND sha256 IS NULL AND download_failed_at IS NULL;
+
 CREATE TABLE IF NOT EXISTS lectures(
     id SERIAL PRIMARY KEY,
     name VARCHAR NOT NULL,
     file_id INT NOT NULL REFERENCES files(id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_lectures_file_id
+    ON lectures (file_id);
+
 CREATE TABLE IF NOT EXISTS tests(
     id SERIAL PRIMARY KEY,
     name VARCHAR NOT NULL,
@@ -54,6 +68,9 @@ CREATE TABLE IF NOT EXISTS lab_works(
     allow_late BOOLEAN DEFAULT TRUE
 );
 
+CREATE INDEX IF NOT EXISTS idx_lab_works_file_id
+    ON lab_works (file_id);
+
 CREATE TABLE IF NOT EXISTS test_stats(
     id SERIAL PRIMARY KEY,
     user_id INT NOT NULL REFERENCES users(id),
@@ -66,6 +83,28 @@ CREATE TABLE IF NOT EXISTS test_stats(
 CREATE UNIQUE INDEX IF NOT EXISTS idx_test_stats_user_test
     ON test_stats (user_id, test_id);
 
+CREATE TABLE IF NOT EXISTS attempts(
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id),
+    test_id INT NOT NULL REFERENCES tests(id),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    score INT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attempts_active_user_test
+    ON attempts (user_id, test_id) WHERE finished_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS attempt_answers(
+    attempt_id INT NOT NULL REFERENCES attempts(id),
+    question_id INT NOT NULL REFERENCES questions(id),
+    answer_id INT REFERENCES answers(id),
+    is_right BOOLEAN NOT NULL DEFAULT FALSE,
+    answered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (attempt_id, question_id)
+);
+
 CREATE TABLE IF NOT EXISTS submissions(
     id SERIAL PRIMARY KEY,
     user_id INT NOT NULL REFERENCES users(id),
@@ -78,6 +117,12 @@ CREATE TABLE IF NOT EXISTS submissions(
     score INT
 );
 
+CREATE INDEX IF NOT EXISTS idx_submissions_file_id
+    ON submissions (submission_file_id);
+
+CREATE INDEX IF NOT EXISTS idx_submissions_lab_id
+    ON submissions (lab_id);
+
 CREATE TABLE IF NOT EXISTS access_requests(
     id SERIAL PRIMARY KEY,
     telegram_id BIGINT,
@@ -89,3 +134,33 @@ CREATE TABLE IF NOT EXISTS access_requests(
 
     CONSTRAINT contact_required CHECK (telegram_id IS NOT NULL OR username IS NOT NULL)
 );
+
+CREATE TABLE IF NOT EXISTS fsm_storage(
+    bot_id BIGINT NOT NULL,
+    chat_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    thread_id BIGINT NOT NULL DEFAULT 0,
+    business_connection_id VARCHAR NOT NULL DEFAULT '',
+    destiny VARCHAR NOT NULL DEFAULT 'default',
+    state VARCHAR,
+    data JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny)
+);
+
+CREATE TABLE IF NOT EXISTS broadcasts(
+    id SERIAL PRIMARY KEY,
+    text VARCHAR NOT NULL,
+    admin_chat_id BIGINT,
+    progress_message_id BIGINT,
+    last_user_id INT NOT NULL DEFAULT 0,
+    total INT,
+    sent INT NOT NULL DEFAULT 0,
+    blocked INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    claimed_by VARCHAR,
+    lease_until TIMESTAMPTZ
+);